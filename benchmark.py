@@ -0,0 +1,244 @@
+import argparse
+from collections import namedtuple
+import json
+import os
+import sys
+
+import profiler
+
+
+"""
+Performance regression benchmarks: profile every algorithm and compare to saved baselines.
+
+Statement counts are deterministic for a given seed and python version, so they are
+compared to baselines recorded under the same python version. Timings depend on the
+machine and are only compared when measured.
+"""
+
+
+BENCHMARK_SEED = 0
+BENCHMARK_NUM_RUNS = 4
+BENCHMARK_STEP_SIZE = 64  # profile input sizes 64, 128, 192 and 256
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), 'benchmark_baselines.json')
+
+# fail if a measure exceeds its baseline by more than this fraction
+DEFAULT_STATEMENT_TOLERANCE = 0.05
+DEFAULT_TIME_TOLERANCE = 0.25
+
+ALL_SORT_ORDERS = ('ascending', 'descending', 'random')
+
+# (module name, function name, sort orders to profile)
+BENCHMARKS = (
+    ('insertion_sort', 'insertion_sort', ALL_SORT_ORDERS),
+    ('insertion_sort', 'binary_insertion_sort', ALL_SORT_ORDERS),
+    ('insertion_sort', 'adaptive_insertion_sort', ALL_SORT_ORDERS),
+    ('merge_sort', 'merge_sort', ALL_SORT_ORDERS),
+    ('merge_sort', 'merge_sort_bottom_up', ALL_SORT_ORDERS),
+    ('radix_sort', 'radix_sort', ALL_SORT_ORDERS),
+    ('max_delta', 'max_delta', ALL_SORT_ORDERS),
+    ('max_subarray', 'max_subarray', ALL_SORT_ORDERS),
+    ('randomize_list_in_place', 'randomize_list_in_place', ('random',)),
+    ('randomize_list_sort', 'randomize_list_sort', ('random',)),
+    ('hire_candidate', 'hire_candidate', ('random',)),
+)
+
+# measure name to ProfileResult field compared against the baseline
+COMPARED_FIELDS = {
+    'statements': profiler.COMPLEXITY_MEASURE_NAME,
+    'time': profiler.WALL_TIME_MEASURE_NAME,
+}
+
+Regression = namedtuple(
+    'Regression', ('benchmark', 'input_size', 'field', 'baseline', 'value'))
+
+
+def _python_version():
+    return '{}.{}'.format(*sys.version_info[:2])
+
+
+def benchmark_name(module_name, function_name, sort_order):
+    return '{}.{}:{}'.format(module_name, function_name, sort_order)
+
+
+def run_benchmarks(measures=('statements',), executor='serial', benchmarks=BENCHMARKS):
+    """
+    Profile every benchmark with a fixed seed and fixed input sizes.
+
+    :param measures: str[] - any of profiler.MEASURES
+    :param executor: str - ["serial"|"process"]: threads would make seeds unreproducible
+    :param benchmarks: (str, str, str[])[]
+    :return: dict - benchmark name to ProfileResult[]
+    """
+    results = {}
+    for module_name, function_name, sort_orders in benchmarks:
+        func = profiler._get_function_from_module(module_name, function_name)
+        for sort_order in sort_orders:
+            name = benchmark_name(module_name, function_name, sort_order)
+            results[name] = profiler.profile(
+                func, BENCHMARK_NUM_RUNS, BENCHMARK_STEP_SIZE, sort_order, executor,
+                measures=measures, seed=BENCHMARK_SEED)
+
+    return results
+
+
+def load_baselines(path=DEFAULT_BASELINE_PATH):
+    """
+    Load baselines recorded under the running python version.
+
+    :param path: str
+    :return: dict - benchmark name to {input size: {field: value}}
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as baseline_file:
+        baselines = json.load(baseline_file).get(_python_version(), {})
+
+    return dict(
+        (name, dict((int(size), fields) for size, fields in sizes.items()))
+        for name, sizes in baselines.items())
+
+
+def save_baselines(results, path=DEFAULT_BASELINE_PATH):
+    """
+    Record {results} as the baselines for the running python version.
+
+    Baselines for other python versions in {path} are kept.
+
+    :param results: dict - benchmark name to ProfileResult[]
+    :param path: str
+    """
+    all_baselines = {}
+    if os.path.exists(path):
+        with open(path) as baseline_file:
+            all_baselines = json.load(baseline_file)
+
+    baselines = {}
+    for name, profile_results in results.items():
+        baselines[name] = {}
+        for result in profile_results:
+            fields = dict(
+                (field, getattr(result, field)) for field in COMPARED_FIELDS.values()
+                if getattr(result, field) is not None)
+            baselines[name][str(result.input_size)] = fields
+
+    all_baselines[_python_version()] = baselines
+    with open(path, 'w') as baseline_file:
+        json.dump(
+            all_baselines, baseline_file, indent=2, separators=(',', ': '),
+            sort_keys=True)
+        baseline_file.write('\n')
+
+
+def find_regressions(
+        results, baselines, statement_tolerance=DEFAULT_STATEMENT_TOLERANCE,
+        time_tolerance=DEFAULT_TIME_TOLERANCE):
+    """
+    Compare {results} to {baselines} and return measures that grew beyond tolerance.
+
+    Measures missing from either side are not compared.
+
+    :param results: dict - benchmark name to ProfileResult[]
+    :param baselines: dict - as returned by load_baselines
+    :param statement_tolerance: float - allowed fractional increase in statement counts
+    :param time_tolerance: float - allowed fractional increase in median wall time
+    :return: Regression[]
+    """
+    tolerances = {
+        COMPARED_FIELDS['statements']: statement_tolerance,
+        COMPARED_FIELDS['time']: time_tolerance,
+    }
+
+    regressions = []
+    for name in sorted(results):
+        for result in results[name]:
+            baseline = baselines.get(name, {}).get(result.input_size, {})
+            for field, tolerance in sorted(tolerances.items()):
+                value = getattr(result, field)
+                if value is None or field not in baseline:
+                    continue
+                if value > baseline[field] * (1 + tolerance):
+                    regressions.append(Regression(
+                        name, result.input_size, field, baseline[field], value))
+
+    return regressions
+
+
+class Tests(object):
+
+    def test_find_regressions(self):
+        baselines = {'a:random': {8: {'num_executed_statements': 100}}}
+        ok = {'a:random': [profiler.ProfileResult(8, 104)]}
+        slow = {'a:random': [profiler.ProfileResult(8, 106)]}
+        unknown = {'b:random': [profiler.ProfileResult(8, 999)]}
+
+        assert find_regressions(ok, baselines) == []
+        assert find_regressions(unknown, baselines) == []
+        assert find_regressions(slow, baselines) == [
+            Regression('a:random', 8, 'num_executed_statements', 100, 106)]
+
+    def test_benchmarks__statement_counts(self):
+        """Assert no algorithm executes more statements than its recorded baseline."""
+        import pytest
+        baselines = load_baselines()
+        if not baselines:
+            pytest.skip('no baselines recorded for python {}: record them with '
+                        'benchmark.py --update'.format(_python_version()))
+
+        regressions = find_regressions(run_benchmarks(), baselines)
+        assert regressions == [], regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Profile all algorithms and compare to baseline performance.')
+    parser.add_argument(
+        '--update', '-u',
+        action='store_true',
+        help='record results as the new baselines instead of comparing')
+    parser.add_argument(
+        '--time', '-t',
+        action='store_true',
+        help='also measure (and compare) median wall time')
+    parser.add_argument(
+        '--baselines', '-b',
+        default=DEFAULT_BASELINE_PATH,
+        help='path to baseline json file')
+    parser.add_argument(
+        '--executor', '-e',
+        choices=('serial', 'process'),
+        default='serial',
+        help='profile in this process or in child processes')
+    parser.add_argument(
+        '--statement_tolerance',
+        type=float,
+        default=DEFAULT_STATEMENT_TOLERANCE,
+        help='allowed fractional increase in executed statements')
+    parser.add_argument(
+        '--time_tolerance',
+        type=float,
+        default=DEFAULT_TIME_TOLERANCE,
+        help='allowed fractional increase in median wall time')
+    args = parser.parse_args()
+
+    measures = ('statements', 'time') if args.time else ('statements',)
+    results = run_benchmarks(measures, args.executor)
+
+    if args.update:
+        save_baselines(results, args.baselines)
+        print 'baselines saved to {}'.format(args.baselines)
+        sys.exit(0)
+
+    regressions = find_regressions(
+        results, load_baselines(args.baselines), args.statement_tolerance,
+        args.time_tolerance)
+    for regression in regressions:
+        print '{} n={}: {} {} -> {} ({:+.1%})'.format(
+            regression.benchmark, regression.input_size, regression.field,
+            regression.baseline, regression.value,
+            float(regression.value) / regression.baseline - 1)
+
+    if regressions:
+        sys.exit(1)
+    print 'no regressions in {} benchmarks'.format(len(results))
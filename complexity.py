@@ -0,0 +1,275 @@
+import argparse
+from collections import namedtuple
+import math
+import re
+import sys
+
+import input_provider
+import profiler
+
+
+"""
+Complexity fitter: find the complexity class that best explains a ProfileResult series.
+
+Each candidate model f(n) = coefficient * g(n) + constant is fit by least squares, so the
+growth rate is checked without rendering a plot.
+"""
+
+
+# candidate complexity classes, simplest first, written as in algorithm docstrings
+COMPLEXITY_CLASSES = ('O(1)', 'O(lgn)', 'O(n)', 'O(nlgn)', 'O(n^2)', 'O(n^3)', 'O(2^n)')
+
+# fits within this fraction of the best residual are considered ties: simplest class wins
+TIE_TOLERANCE = 1e-9
+
+DOCSTRING_COMPLEXITY_PATTERN = re.compile(r'Runtime:\s*f\(n\)\s*=\s*(O\([^)]*\))')
+
+ComplexityFit = namedtuple(
+    'ComplexityFit', ('complexity', 'coefficient', 'constant', 'r_squared', 'residual'))
+
+
+def _lg(n):
+    return math.log(n, 2) if n > 0 else 0.0
+
+
+# growth function g(n) of each complexity class
+GROWTH_FUNCTIONS = {
+    'O(1)': lambda n: 0.0,
+    'O(lgn)': _lg,
+    'O(n)': lambda n: float(n),
+    'O(nlgn)': lambda n: n * _lg(n),
+    'O(n^2)': lambda n: float(n) ** 2,
+    'O(n^3)': lambda n: float(n) ** 3,
+    'O(2^n)': lambda n: 2.0 ** n,
+}
+
+
+def _get_series(profile_results, measure):
+    """
+    Return input sizes and measurements from {profile_results}, skipping missing measures.
+
+    :param profile_results: ProfileResult[]
+    :param measure: str - name of ProfileResult field to fit
+    :return: (int[], float[])
+    """
+    input_sizes = []
+    values = []
+    for result in profile_results:
+        value = getattr(result, measure)
+        if value is not None:
+            input_sizes.append(getattr(result, profiler.INPUT_MEASURE_NAME))
+            values.append(float(value))
+
+    if len(values) < 2:
+        raise ValueError('need at least two results with "{}" to fit'.format(measure))
+
+    return input_sizes, values
+
+
+def _fit_model(complexity, input_sizes, values):
+    """
+    Fit values = coefficient * g(input_size) + constant by ordinary least squares.
+
+    :param complexity: str - one of COMPLEXITY_CLASSES
+    :param input_sizes: int[]
+    :param values: float[]
+    :return: ComplexityFit|None - None if the fit overflows a float
+    """
+    growth_function = GROWTH_FUNCTIONS[complexity]
+    try:
+        growths = [growth_function(n) for n in input_sizes]
+
+        num_values = float(len(values))
+        mean_growth = sum(growths) / num_values
+        mean_value = sum(values) / num_values
+
+        covariance = sum(
+            (g - mean_growth) * (v - mean_value) for g, v in zip(growths, values))
+        variance = sum((g - mean_growth) ** 2 for g in growths)
+
+        # a constant growth function (or a single distinct input size) only fits the mean
+        coefficient = covariance / variance if variance else 0.0
+        constant = mean_value - coefficient * mean_growth
+
+        residual = sum(
+            (v - (coefficient * g + constant)) ** 2 for g, v in zip(growths, values))
+    except OverflowError:
+        return None
+
+    if math.isinf(residual) or math.isnan(residual):
+        return None
+
+    total = sum((v - mean_value) ** 2 for v in values)
+    r_squared = 1 - residual / total if total else 1.0
+
+    return ComplexityFit(complexity, coefficient, constant, r_squared, residual)
+
+
+def fit_complexities(profile_results, measure=profiler.COMPLEXITY_MEASURE_NAME):
+    """
+    Fit every candidate complexity class to {profile_results}, best fit first.
+
+    :param profile_results: ProfileResult[]
+    :param measure: str - name of ProfileResult field to fit
+    :return: ComplexityFit[]
+    """
+    input_sizes, values = _get_series(profile_results, measure)
+
+    fits = []
+    for complexity in COMPLEXITY_CLASSES:
+        fit = _fit_model(complexity, input_sizes, values)
+        if fit is not None:
+            fits.append(fit)
+
+    # sort by residual, treating near-equal residuals as ties so simpler classes win
+    best_residual = min(fit.residual for fit in fits)
+    tolerance = best_residual * TIE_TOLERANCE + 1e-12
+    simplicity = dict((name, idx) for idx, name in enumerate(COMPLEXITY_CLASSES))
+    return sorted(fits, key=lambda fit: (
+        fit.residual > best_residual + tolerance,
+        fit.residual,
+        simplicity[fit.complexity]))
+
+
+def fit_complexity(profile_results, measure=profiler.COMPLEXITY_MEASURE_NAME):
+    """
+    Return the complexity class that best fits {profile_results}.
+
+    :param profile_results: ProfileResult[]
+    :param measure: str - name of ProfileResult field to fit
+    :return: ComplexityFit
+    """
+    return fit_complexities(profile_results, measure)[0]
+
+
+def predict(fit, input_size):
+    """
+    Return the value {fit} predicts for an input of length {input_size}.
+
+    :param fit: ComplexityFit
+    :param input_size: int
+    :return: float
+    """
+    return fit.coefficient * GROWTH_FUNCTIONS[fit.complexity](input_size) + fit.constant
+
+
+def residuals(fit, profile_results, measure=profiler.COMPLEXITY_MEASURE_NAME):
+    """
+    Return (input_size, measured - predicted) for each of {profile_results}.
+
+    :param fit: ComplexityFit
+    :param profile_results: ProfileResult[]
+    :param measure: str - name of ProfileResult field that was fit
+    :return: (int, float)[]
+    """
+    input_sizes, values = _get_series(profile_results, measure)
+    return [(n, value - predict(fit, n)) for n, value in zip(input_sizes, values)]
+
+
+def docstring_complexity(func):
+    """
+    Return the complexity documented by "Runtime: f(n) = O(...)" in {func}'s docstring.
+
+    :param func: function
+    :return: str|None - e.g. "O(nlgn)", or None if not documented
+    """
+    match = DOCSTRING_COMPLEXITY_PATTERN.search(func.__doc__ or '')
+    if match is None:
+        return None
+    return re.sub(r'\s+', '', match.group(1))
+
+
+def check_docstring_complexity(
+        func, profile_results, measure=profiler.COMPLEXITY_MEASURE_NAME):
+    """
+    Fit {profile_results} and compare the best fit to the complexity documented by {func}.
+
+    :param func: function
+    :param profile_results: ProfileResult[]
+    :param measure: str - name of ProfileResult field to fit
+    :return: (bool, str, ComplexityFit) - whether the fit matches, documented class, fit
+    """
+    documented = docstring_complexity(func)
+    if documented is None:
+        raise ValueError('{} does not document its runtime'.format(func.__name__))
+
+    fit = fit_complexity(profile_results, measure)
+    return fit.complexity == documented, documented, fit
+
+
+class Tests(object):
+
+    def _results(self, growth_function, input_sizes=range(1, 60, 4)):
+        return [profiler.ProfileResult(n, 3 * growth_function(n) + 7)
+                for n in input_sizes]
+
+    def test_fit_complexity__exact_models(self):
+        """Assert each class is recovered, with its constants, from noiseless data."""
+        for complexity in COMPLEXITY_CLASSES:
+            fit = fit_complexity(self._results(GROWTH_FUNCTIONS[complexity]))
+            assert fit.complexity == complexity
+            assert fit.r_squared > 0.999999
+            if complexity != 'O(1)':
+                assert abs(fit.coefficient - 3) < 1e-6
+
+    def test_fit_complexity__skips_overflowing_models(self):
+        for input_sizes in (range(10, 5000, 500), range(25, 1001, 25)):
+            fits = fit_complexities(self._results(lambda n: n, input_sizes))
+
+            assert fits[0].complexity == 'O(n)'
+            assert 'O(2^n)' not in [fit.complexity for fit in fits]
+
+    def test_fit_complexity__profiled_sorts(self):
+        """Assert profiled statement counts fit the runtime each sort documents."""
+        insertion_sort = profiler._get_function_from_module('insertion_sort')
+        results = profiler.profile(insertion_sort, 15, 10, 'descending', 'serial')
+        is_match, documented, fit = check_docstring_complexity(insertion_sort, results)
+
+        assert documented == 'O(n^2)'
+        assert is_match, fit
+
+    def test_docstring_complexity(self):
+        def func():
+            """
+            Runtime: f(n) = O(n lg n)
+            """
+        assert docstring_complexity(func) == 'O(nlgn)'
+        assert docstring_complexity(lambda: None) is None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Check that {function} in {module} scales as its docstring says.')
+    parser.add_argument(
+        'module',
+        help='name of module to import')
+    parser.add_argument(
+        '--function', '-f',
+        help='name of function to profile, if not same as module')
+    parser.add_argument(
+        '--path', '-p',
+        help='path to directory of module, if not same as script')
+    parser.add_argument(
+        '--num_runs', '-n',
+        type=int,
+        default=profiler.DEFAULT_NUM_RUNS,
+        help='run profiler {n} times')
+    parser.add_argument(
+        '--step', '-s',
+        type=int,
+        default=profiler.DEFAULT_STEP_SIZE,
+        help='increase input size by {s} each run')
+    parser.add_argument(
+        '--sort_order', '-o',
+        choices=input_provider.INPUT_ORDERS,
+        default='random',
+        help='order of profiler input')
+    args = parser.parse_args()
+
+    func = profiler._get_function_from_module(args.module, args.function, args.path)
+    results = profiler.profile(func, args.num_runs, args.step, args.sort_order, 'process')
+    is_match, documented, fit = check_docstring_complexity(func, results)
+
+    print '{}: documented {}, fit {} (r^2 = {:.4f})'.format(
+        func.__name__, documented, fit.complexity, fit.r_squared)
+    sys.exit(0 if is_match else 1)
@@ -0,0 +1,333 @@
+import argparse
+from array import array
+from collections import namedtuple
+import heapq
+import mmap
+import os
+import shutil
+import tempfile
+
+
+"""
+External merge sort: sort a binary file of int64s that is larger than memory.
+
+The input is read in chunks that are sorted in memory and spilled to disk as sorted runs.
+Runs are then k-way merged with a heap, {fan_in} at a time, reading each run through a
+memory map and writing through a buffer, until one run remains. Memory is bounded by
+{chunk_size} items while sorting and {fan_in} + 1 buffers while merging.
+
+Chunks are sorted with the builtin sort by default: a chunk of 1M items takes about 0.7s,
+where merge_sort.merge_sort_bottom_up takes about 5.4s. Merging costs O(lg {fan_in})
+comparisons per item per pass, in heapq.merge rather than the two-way merge of merge_sort.
+"""
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # items sorted in memory at once: 8 MB
+DEFAULT_FAN_IN = 64  # runs merged at once
+DEFAULT_BUFFER_SIZE = 1 << 13  # items read or written at once per run: 64 KB
+
+ITEM_SIZE = 8  # bytes per int64
+
+IOStats = namedtuple(
+    'IOStats', ('bytes_read', 'bytes_written', 'num_runs', 'num_merge_passes'))
+
+
+def _get_int64_typecode():
+    """
+    Return the array typecode of a signed 64 bit integer: "q" is python 3 only.
+
+    :return: str
+    """
+    for typecode in ('q', 'l'):
+        try:
+            if array(typecode).itemsize == ITEM_SIZE:
+                return typecode
+        except ValueError:
+            continue
+    raise RuntimeError('no array typecode for 64 bit integers on this platform')
+
+
+INT64_TYPECODE = _get_int64_typecode()
+
+
+def _extend_from_bytes(values, data):
+    # array.fromstring was renamed frombytes in python 3
+    getattr(values, 'frombytes', getattr(values, 'fromstring', None))(data)
+
+
+def write_int64_file(path, int_iterable, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Write integers to {path} as native-endian int64s.
+
+    :param path: str
+    :param int_iterable: iterable
+    :param buffer_size: int - items written at once
+    :return: int - bytes written
+    """
+    with open(path, 'wb') as output_file:
+        writer = _BufferedWriter(output_file, buffer_size)
+        for value in int_iterable:
+            writer.write(value)
+        writer.flush()
+    return writer.bytes_written
+
+
+def iter_int64_file(path, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Yield the integers of a file of native-endian int64s, read through a memory map.
+
+    :param path: str
+    :param buffer_size: int - items unpacked at once
+    :return: generator - ints
+    """
+    reader = _RunReader(path, buffer_size)
+    for value in reader:
+        yield value
+
+
+class _BufferedWriter(object):
+    """
+    Append int64s to a file, writing {buffer_size} items at a time.
+    """
+
+    def __init__(self, output_file, buffer_size):
+        self.output_file = output_file
+        self.buffer_size = buffer_size
+        self.buffer = array(INT64_TYPECODE)
+        self.bytes_written = 0
+
+    def write(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.buffer.tofile(self.output_file)
+        self.bytes_written += len(self.buffer) * ITEM_SIZE
+        del self.buffer[:]
+
+
+class _RunReader(object):
+    """
+    Iterate over the int64s of a file through a read-only memory map, unpacking
+    {buffer_size} items at a time.
+    """
+
+    def __init__(self, path, buffer_size):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.bytes_read = 0
+
+    def __iter__(self):
+        if os.path.getsize(self.path) == 0:
+            return  # empty files cannot be memory mapped
+
+        with open(self.path, 'rb') as run_file:
+            run_map = mmap.mmap(run_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                block_size = self.buffer_size * ITEM_SIZE
+                for offset in xrange(0, len(run_map), block_size):
+                    block = array(INT64_TYPECODE)
+                    _extend_from_bytes(block, run_map[offset:offset + block_size])
+                    self.bytes_read += len(block) * ITEM_SIZE
+                    for value in block:
+                        yield value
+            finally:
+                run_map.close()
+
+
+def _spill_runs(input_path, temp_dir, chunk_size, sort_algorithm):
+    """
+    Sort {input_path} in chunks of {chunk_size} items, writing each chunk to its own run.
+
+    :return: (str[], int, int) - run paths, bytes read and bytes written
+    """
+    run_paths = []
+    bytes_read = 0
+    bytes_written = 0
+
+    with open(input_path, 'rb') as input_file:
+        while True:
+            data = input_file.read(chunk_size * ITEM_SIZE)
+            if not data:
+                break
+            if len(data) % ITEM_SIZE:
+                raise ValueError('{} is not a whole number of int64s'.format(input_path))
+            bytes_read += len(data)
+
+            chunk = array(INT64_TYPECODE)
+            _extend_from_bytes(chunk, data)
+            sorted_chunk = sort_algorithm(chunk.tolist())
+
+            run_path = os.path.join(temp_dir, 'run_0_{}.bin'.format(len(run_paths)))
+            with open(run_path, 'wb') as run_file:
+                array(INT64_TYPECODE, sorted_chunk).tofile(run_file)
+            bytes_written += len(data)
+            run_paths.append(run_path)
+
+    return run_paths, bytes_read, bytes_written
+
+
+def _merge_runs(run_paths, output_path, buffer_size):
+    """
+    Merge sorted runs into one sorted file with a heap of the next item of each run.
+
+    :return: (int, int) - bytes read and bytes written
+    """
+    readers = [_RunReader(run_path, buffer_size) for run_path in run_paths]
+
+    with open(output_path, 'wb') as output_file:
+        writer = _BufferedWriter(output_file, buffer_size)
+        for value in heapq.merge(*readers):
+            writer.write(value)
+        writer.flush()
+
+    return sum(reader.bytes_read for reader in readers), writer.bytes_written
+
+
+def external_merge_sort(
+        input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, fan_in=DEFAULT_FAN_IN,
+        buffer_size=DEFAULT_BUFFER_SIZE, temp_dir=None,
+        sort_algorithm=sorted):
+    """
+    Sort a file of native-endian int64s into {output_path}, using bounded memory.
+
+    Chunks are sorted, then every pass merges groups of {fan_in} runs until one is left,
+    so the data is read and written 1 + ceil(log_{fan_in}(n / {chunk_size})) times.
+
+    :param input_path: str
+    :param output_path: str - may be {input_path}
+    :param chunk_size: int - items sorted in memory at once
+    :param fan_in: int - runs merged at once, at least 2
+    :param buffer_size: int - items read or written at once per run
+    :param temp_dir: str|None - directory for runs, if None the system temp directory
+    :param sort_algorithm: function - returns a list of integers sorted, e.g.
+        merge_sort.merge_sort_bottom_up
+    :return: IOStats
+    """
+    if fan_in < 2:
+        raise ValueError('fan_in must be at least 2')
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+    run_dir = tempfile.mkdtemp(prefix='external_merge_sort_', dir=temp_dir)
+    try:
+        run_paths, bytes_read, bytes_written = _spill_runs(
+            input_path, run_dir, chunk_size, sort_algorithm)
+        num_runs = len(run_paths)
+
+        num_merge_passes = 0
+        while len(run_paths) > fan_in:
+            num_merge_passes += 1
+            merged_paths = []
+            for group_idx in xrange(0, len(run_paths), fan_in):
+                merged_path = os.path.join(run_dir, 'run_{}_{}.bin'.format(
+                    num_merge_passes, len(merged_paths)))
+                pass_read, pass_written = _merge_runs(
+                    run_paths[group_idx:group_idx + fan_in], merged_path, buffer_size)
+                bytes_read += pass_read
+                bytes_written += pass_written
+                merged_paths.append(merged_path)
+
+            # runs of the previous pass are no longer needed: free the disk space
+            for run_path in run_paths:
+                os.remove(run_path)
+            run_paths = merged_paths
+
+        # a single run is already sorted and an empty input has no runs, else merge the
+        # rest: either way the output is moved into place last, so the input can be the
+        # output
+        final_path = os.path.join(run_dir, 'output.bin')
+        if len(run_paths) > 1:
+            num_merge_passes += 1
+            pass_read, pass_written = _merge_runs(run_paths, final_path, buffer_size)
+            bytes_read += pass_read
+            bytes_written += pass_written
+        elif run_paths:
+            final_path = run_paths[0]
+        else:
+            open(final_path, 'wb').close()
+        shutil.move(final_path, output_path)
+
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    return IOStats(bytes_read, bytes_written, num_runs, num_merge_passes)
+
+
+class Tests(object):
+
+    def _path(self):
+        file_descriptor, path = tempfile.mkstemp('.bin')
+        os.close(file_descriptor)
+        return path
+
+    def test_external_merge_sort(self):
+        import random
+        int_list = [random.randint(-2 ** 63, 2 ** 63 - 1) for _ in xrange(1000)]
+        int_list += [0, -1, 1] * 50
+        input_path = self._path()
+        output_path = self._path()
+        write_int64_file(input_path, int_list)
+
+        # 12 runs merged 3 at a time take 3 passes: 12 -> 4 -> 2 -> 1
+        stats = external_merge_sort(
+            input_path, output_path, chunk_size=100, fan_in=3, buffer_size=7)
+
+        assert list(iter_int64_file(output_path)) == sorted(int_list)
+        assert list(iter_int64_file(input_path)) == int_list
+        num_bytes = len(int_list) * ITEM_SIZE
+        assert stats == IOStats(4 * num_bytes, 4 * num_bytes, 12, 3)
+
+        os.remove(input_path)
+        os.remove(output_path)
+
+    def test_external_merge_sort__in_place(self):
+        path = self._path()
+        write_int64_file(path, [3, 1, 2])
+        stats = external_merge_sort(path, path)
+
+        assert list(iter_int64_file(path)) == [1, 2, 3]
+        assert stats == IOStats(24, 24, 1, 0)
+        os.remove(path)
+
+    def test_external_merge_sort__empty(self):
+        input_path = self._path()
+        output_path = self._path()
+        stats = external_merge_sort(input_path, output_path)
+
+        assert list(iter_int64_file(output_path)) == []
+        assert stats == IOStats(0, 0, 0, 0)
+        os.remove(input_path)
+        os.remove(output_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Sort a binary file of native-endian int64s larger than memory.')
+    parser.add_argument(
+        'input',
+        help='path of file to sort')
+    parser.add_argument(
+        'output',
+        help='path of sorted file, may be the same as input')
+    parser.add_argument(
+        '--chunk_size', '-c',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help='sort {c} items in memory at once')
+    parser.add_argument(
+        '--fan_in', '-f',
+        type=int,
+        default=DEFAULT_FAN_IN,
+        help='merge {f} runs at once')
+    parser.add_argument(
+        '--temp_dir', '-t',
+        help='directory to spill sorted runs to, if not the system temp directory')
+    args = parser.parse_args()
+
+    io_stats = external_merge_sort(
+        args.input, args.output, args.chunk_size, args.fan_in, temp_dir=args.temp_dir)
+    print '{} runs, {} merge passes: read {} bytes, wrote {} bytes'.format(
+        io_stats.num_runs, io_stats.num_merge_passes, io_stats.bytes_read,
+        io_stats.bytes_written)
@@ -1,49 +1,176 @@
+from collections import namedtuple
+import heapq
+import itertools
 import math
+import multiprocessing
+import random
 from random import randint
 
 from randomize_list_in_place import randomize_list_in_place
 
 
-def _should_hire_candidate(candidate_index, score, num_candidates):
+# interview without hiring the first {cutoff ratio} of candidates: 1/e is optimal
+DEFAULT_CUTOFF_RATIO = 1 / math.e
+
+SIMULATION_EXECUTORS = ('serial', 'process', 'numpy')
+NUM_PROCESSES = multiprocessing.cpu_count()
+
+# the numpy executor simulates this many trials at a time, to bound memory
+NUMPY_BATCH_SIZE = 10000
+
+# z-score of a two-sided 95% confidence interval
+DEFAULT_Z_SCORE = 1.96
+
+SimulationResult = namedtuple('SimulationResult', (
+    'cutoff_ratio', 'num_trials', 'num_successes', 'probability', 'lower', 'upper'))
+
+
+HireResult = namedtuple('HireResult', ('index', 'score', 'is_best'))
+
+
+class SecretaryPolicy(object):
     """
-    Decide if candidate {candidate_index} should be hired.
+    Interview the first {cutoff_ratio} of candidates without hiring, then hire the first
+    candidate better than all before. If none is, hire the last candidate.
 
     Optimal solution for variation of problem where we only care about hiring the best
     possible candidate (i.e. hiring the second-best is considered a failure).
+    """
+
+    def __init__(self, num_candidates, cutoff_ratio=DEFAULT_CUTOFF_RATIO):
+        """
+        :param num_candidates: int - total candidates
+        :param cutoff_ratio: float - fraction of candidates to interview without hiring
+        """
+        self.num_candidates = num_candidates
+        self.cutoff_ratio = cutoff_ratio
+
+        # index of the first candidate that may be hired, and of the last resort
+        self.num_test_candidates = int(math.ceil(num_candidates * cutoff_ratio))
+        self.last_index = num_candidates - 1
+        self.reset()
+
+    def reset(self):
+        """
+        Forget every candidate seen, to hire from a new list of the same length.
+        """
+        self._index = -1  # index of the last candidate seen
+        self.best_score = float('-inf')
 
-    :param candidate_index: int - candidate's position in list of candidates
-    :param score: int|float - number representing candidate quality
-    :param num_candidates: int - total candidates
-    :return: bool
+    def should_hire(self, score):
+        """
+        Decide if the next candidate should be hired.
+
+        :param score: int|float - number representing candidate quality
+        :return: bool
+        """
+        self._index += 1
+        candidate_index = self._index
+
+        if score > self.best_score:
+            self.best_score = score
+            if candidate_index >= self.num_test_candidates:
+                return True
+
+        return candidate_index == self.last_index
+
+
+class TopKSecretaryPolicy(SecretaryPolicy):
+    """
+    Interview the first {cutoff_ratio} of candidates without hiring, then hire the first
+    candidate better than the {k}th best of them. If none is, hire the last candidate.
+
+    A lower bar than SecretaryPolicy: hires sooner and more often settles for one of the
+    top {k} candidates.
     """
-    global best_score
-    num_test_candidates = num_candidates / math.e
 
-    if score > best_score:
-        best_score = score
-        if candidate_index >= num_test_candidates:
-            return True
+    def __init__(self, num_candidates, k, cutoff_ratio=DEFAULT_CUTOFF_RATIO):
+        """
+        :param num_candidates: int - total candidates
+        :param k: int - hire candidates better than the {k}th best test candidate
+        :param cutoff_ratio: float - fraction of candidates to interview without hiring
+        """
+        self.k = k
+        super(TopKSecretaryPolicy, self).__init__(num_candidates, cutoff_ratio)
+
+    def reset(self):
+        super(TopKSecretaryPolicy, self).reset()
+        self._top_scores = []  # min-heap of the best {k} test scores
+        self._bar = float('-inf')
+
+    def should_hire(self, score):
+        self._index += 1
+        candidate_index = self._index
 
-    if candidate_index == num_candidates - 1:
-        return True
+        if candidate_index >= self.num_test_candidates:
+            return score > self._bar or candidate_index == self.last_index
 
-    return False
+        if len(self._top_scores) < self.k:
+            heapq.heappush(self._top_scores, score)
+        elif score > self._top_scores[0]:
+            heapq.heapreplace(self._top_scores, score)
 
+        # the bar is fixed once the {k}th best test candidate is known
+        if len(self._top_scores) == self.k:
+            self._bar = self._top_scores[0]
 
-def _assess_hired_candidate(number_list, number):
+        return candidate_index == self.last_index
+
+
+class ThresholdPolicy(SecretaryPolicy):
     """
-    Return 1 if best possible candidate was hired, else 0.
+    Hire the first candidate scoring at least {threshold}. If none does, hire the last
+    candidate.
 
-    :param number_list: int[] | float[]
-    :param number: int | float
-    :return: int
+    Needs no test candidates, given the distribution of scores is known.
     """
-    if max(number_list) == number:
-        return 1
-    return 0
 
+    def __init__(self, num_candidates, threshold):
+        """
+        :param num_candidates: int - total candidates
+        :param threshold: int|float - lowest acceptable score
+        """
+        self.threshold = threshold
+        super(ThresholdPolicy, self).__init__(num_candidates, cutoff_ratio=0)
 
-def hire_candidate(candidates_list):
+    def should_hire(self, score):
+        self._index += 1
+        candidate_index = self._index
+        return score >= self.threshold or candidate_index == self.last_index
+
+
+def hire_from_stream(candidates, policy, assess=True):
+    """
+    Offer the job to candidates one at a time, until {policy} hires one.
+
+    :param candidates: iterable - candidate "quality scores", e.g. a live stream
+    :param policy: SecretaryPolicy - sized for the number of candidates, reset if reused
+    :param assess: bool - if True, consume the remaining candidates to decide whether the
+        best was hired: the running maximum is tracked, so nothing is stored
+    :return: HireResult - is_best is None if not assessed
+    """
+    candidates = iter(candidates)
+    best_score = float('-inf')
+
+    for index, score in enumerate(candidates):
+        if policy.should_hire(score):
+            break
+        if score > best_score:
+            best_score = score
+    else:
+        raise Exception('Failed to hire a candidate!')
+
+    if not assess:
+        return HireResult(index, score, None)
+    if score < best_score:
+        return HireResult(index, score, False)
+
+    # the rest of the candidates are only compared to the hired one, in C rather than a
+    # python loop: hires often come early, leaving most of the stream to scan
+    return HireResult(index, score, max(itertools.chain(candidates, (score,))) == score)
+
+
+def hire_candidate(candidates_list, cutoff_ratio=DEFAULT_CUTOFF_RATIO):
     """
     Simulates the "hiring problem" where the goal is to hire the best possible candidate.
 
@@ -54,17 +181,177 @@ def hire_candidate(candidates_list):
     candidate is considered a failure.
 
     :param candidates_list: int[]|float[] - list of candidate "quality scores"
+    :param cutoff_ratio: float - fraction of candidates to interview without hiring
     :return: int - 1 or 0 whether best possible candidate was hired
     """
-    global best_score
-    best_score = float('-inf')
+    policy = SecretaryPolicy(len(candidates_list), cutoff_ratio)
+    return int(hire_from_stream(candidates_list, policy).is_best)
+
+
+def wilson_interval(num_successes, num_trials, z_score=DEFAULT_Z_SCORE):
+    """
+    Return the Wilson score confidence interval of a success probability.
+
+    Unlike the normal approximation, it stays within [0, 1] and is accurate for
+    probabilities near 0 or 1.
+
+    :param num_successes: int
+    :param num_trials: int
+    :param z_score: float - e.g. 1.96 for a 95% interval
+    :return: (float, float) - lower and upper bounds
+    """
+    if num_trials == 0:
+        return 0.0, 1.0
+
+    probability = float(num_successes) / num_trials
+    z_squared = z_score ** 2
+    denominator = 1 + z_squared / num_trials
+    center = (probability + z_squared / (2 * num_trials)) / denominator
+    half_width = z_score * math.sqrt(
+        probability * (1 - probability) / num_trials
+        + z_squared / (4 * num_trials ** 2)) / denominator
+
+    return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+
+def _count_successes(args):
+    """
+    Run trials in python and return how many hired the best candidate.
+
+    Candidates are a shuffled permutation of 0-{num_candidates - 1}, so the best score is
+    known without searching for it.
 
-    for index, score in enumerate(candidates_list):
-        is_hired = _should_hire_candidate(index, score, len(candidates_list))
-        if is_hired:
-            return _assess_hired_candidate(candidates_list, score)
+    :param args: (SecretaryPolicy, int, hashable) - policy, num trials and seed: a single
+        tuple, so it can be mapped over a process pool
+    :return: int
+    """
+    policy, num_trials, seed = args
+    random_state = random.Random(seed)
+    candidates_list = range(policy.num_candidates)
+
+    num_successes = 0
+    for _ in xrange(num_trials):
+        randomize_list_in_place(candidates_list, random_state)
+        policy.reset()
+        hired = hire_from_stream(candidates_list, policy, assess=False)
+        if hired.score == policy.num_candidates - 1:
+            num_successes += 1
+
+    return num_successes
+
+
+def _count_successes_numpy(num_candidates, num_trials, cutoff_ratio, seed):
+    """
+    Run trials as rows of a trials x candidates matrix of random scores, and return how
+    many hired the best candidate.
+
+    The best candidate is hired if it comes after the cutoff and the best of those before
+    it was interviewed before the cutoff: otherwise an earlier candidate would be hired.
+    """
+    # numpy is only needed for this executor: only import it if necessary
+    import numpy as np
+
+    # numpy < 1.17 has no Generator: fall back to the legacy RandomState
+    if hasattr(np.random, 'default_rng'):
+        random_scores = np.random.default_rng(seed).random
+    else:
+        random_scores = np.random.RandomState(seed).random_sample
+
+    # index of the first candidate that may be hired
+    num_test_candidates = int(math.ceil(num_candidates * cutoff_ratio))
+    columns = np.arange(num_candidates)
+
+    num_successes = 0
+    for batch_start in xrange(0, num_trials, NUMPY_BATCH_SIZE):
+        batch_size = min(NUMPY_BATCH_SIZE, num_trials - batch_start)
+        scores = random_scores((batch_size, num_candidates))
+
+        best_idx = scores.argmax(axis=1)
+        earlier_scores = np.where(columns < best_idx[:, np.newaxis], scores, -1)
+        best_earlier_idx = earlier_scores.argmax(axis=1)
+
+        is_success = (best_idx >= num_test_candidates) & (
+            (best_idx == 0) | (best_earlier_idx < num_test_candidates))
+        num_successes += int(is_success.sum())
+
+    return num_successes
+
+
+def simulate_hiring(num_candidates, num_trials, cutoff_ratio=DEFAULT_CUTOFF_RATIO,
+                    executor='serial', num_workers=None, seed=None,
+                    z_score=DEFAULT_Z_SCORE, policy=None):
+    """
+    Estimate how often the best of {num_candidates} is hired, by Monte Carlo simulation.
+
+    :param num_candidates: int
+    :param num_trials: int
+    :param cutoff_ratio: float - fraction of candidates to interview without hiring
+    :param executor: str - ["serial"|"process"|"numpy"]: "process" splits trials across
+        {num_workers} processes, "numpy" vectorizes batches of trials
+    :param num_workers: int|None - number of processes, if None one per CPU
+    :param seed: hashable|None - if given, results are reproducible: the numpy executor
+        needs an int
+    :param z_score: float - width of the confidence interval
+    :param policy: SecretaryPolicy|None - if None, a SecretaryPolicy with {cutoff_ratio}:
+        other policies are not supported by the numpy executor
+    :return: SimulationResult
+    """
+    if executor not in SIMULATION_EXECUTORS:
+        raise ValueError('executor must be one of {}'.format(SIMULATION_EXECUTORS))
+
+    if policy is None:
+        policy = SecretaryPolicy(num_candidates, cutoff_ratio)
+    elif executor == 'numpy':
+        raise ValueError('the numpy executor only simulates the default policy')
+    elif policy.num_candidates != num_candidates:
+        raise ValueError(
+            'policy is sized for {} candidates'.format(policy.num_candidates))
+
+    if executor == 'numpy':
+        num_successes = _count_successes_numpy(
+            num_candidates, num_trials, cutoff_ratio, seed)
+
+    elif executor == 'process':
+        num_workers = num_workers or NUM_PROCESSES
+
+        # seed each worker separately, so workers never repeat each other's trials
+        tasks = [
+            (policy, num_trials // num_workers + (idx < num_trials % num_workers),
+             None if seed is None else '{}:{}'.format(seed, idx))
+            for idx in xrange(num_workers)]
 
-    raise Exception('Failed to hire a candidate!')
+        pool = multiprocessing.Pool(processes=num_workers)
+        try:
+            num_successes = sum(pool.map(_count_successes, tasks))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    else:
+        num_successes = _count_successes((policy, num_trials, seed))
+
+    lower, upper = wilson_interval(num_successes, num_trials, z_score)
+    return SimulationResult(
+        policy.cutoff_ratio, num_trials, num_successes,
+        float(num_successes) / num_trials if num_trials else 0.0, lower, upper)
+
+
+def sweep_cutoff_ratios(num_candidates, num_trials, cutoff_ratios, **kwargs):
+    """
+    Simulate hiring with each of {cutoff_ratios}.
+
+    :param num_candidates: int
+    :param num_trials: int - trials per cutoff ratio
+    :param cutoff_ratios: float[]
+    :param kwargs: passed to simulate_hiring
+    :return: SimulationResult[]
+    """
+    return [
+        simulate_hiring(num_candidates, num_trials, cutoff_ratio, **kwargs)
+        for cutoff_ratio in cutoff_ratios]
 
 
 class Test(object):
@@ -88,3 +375,71 @@ class Test(object):
         # the best candidate will be hired more than 1/3 of the time
         average_score = sum(results) / float(num_trials)
         assert average_score > float(1) / 3
+
+    def test_simulate_hiring__executors_agree(self):
+        """Assert every executor estimates the known success probability, about 1/e."""
+        for executor in SIMULATION_EXECUTORS:
+            result = simulate_hiring(100, 20000, executor=executor, seed=0)
+
+            assert result.num_trials == 20000
+            assert result.lower < 0.371 < result.upper, (executor, result)
+
+    def test_simulate_hiring__seed(self):
+        assert simulate_hiring(20, 1000, seed=1) == simulate_hiring(20, 1000, seed=1)
+
+    def test_sweep_cutoff_ratios(self):
+        """Assert hiring the first candidate succeeds 1/n of the time."""
+        results = sweep_cutoff_ratios(10, 20000, (0, 0.5), executor='numpy', seed=0)
+
+        assert results[0].lower < 0.1 < results[0].upper
+        assert results[1].probability > results[0].probability
+
+    def test_wilson_interval(self):
+        lower, upper = wilson_interval(0, 100)
+        assert lower == 0 and 0 < upper < 0.05
+
+        lower, upper = wilson_interval(50, 100)
+        assert abs((lower + upper) / 2 - 0.5) < 1e-9
+        assert abs(lower - 0.4038) < 1e-4
+
+    def test_hire_from_stream__matches_max(self):
+        """Assert the incremental assessment agrees with max() of the whole list."""
+        import random
+        for _ in xrange(500):
+            candidates_list = [random.randint(0, 20) for _ in xrange(15)]
+            policy = SecretaryPolicy(len(candidates_list))
+            result = hire_from_stream(iter(candidates_list), policy)
+
+            assert result.score == candidates_list[result.index]
+            assert result.is_best == (result.score == max(candidates_list))
+
+    def test_secretary_policy__reset(self):
+        policy = SecretaryPolicy(4, cutoff_ratio=0.5)
+        assert policy.num_test_candidates == 2
+        assert [policy.should_hire(score) for score in (5, 3, 4, 6)] == [
+            False, False, False, True]
+
+        policy.reset()
+        assert [policy.should_hire(score) for score in (1, 3, 4)] == [False, False, True]
+
+    def test_top_k_secretary_policy(self):
+        policy = TopKSecretaryPolicy(6, k=2, cutoff_ratio=0.5)
+        assert [policy.should_hire(score) for score in (5, 9, 3, 4, 7)] == [
+            False, False, False, False, True]
+
+        # the first candidate is hired if there are no test candidates
+        assert TopKSecretaryPolicy(3, k=2, cutoff_ratio=0).should_hire(0)
+
+    def test_threshold_policy(self):
+        result = hire_from_stream(iter([3, 8, 9, 2]), ThresholdPolicy(4, threshold=7))
+        assert result == HireResult(1, 8, False)
+
+        result = hire_from_stream(iter([3, 1, 2]), ThresholdPolicy(3, threshold=7))
+        assert result == HireResult(2, 2, False)
+
+    def test_simulate_hiring__policies(self):
+        """Assert a lower bar than the best test candidate hires the best less often."""
+        secretary = simulate_hiring(20, 5000, seed=0)
+        top_k = simulate_hiring(20, 5000, seed=0, policy=TopKSecretaryPolicy(20, k=3))
+
+        assert top_k.upper < secretary.lower
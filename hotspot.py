@@ -0,0 +1,298 @@
+import argparse
+import cgi
+from collections import namedtuple
+import linecache
+import os
+
+import complexity
+import input_provider
+import profiler
+
+
+"""
+Hot-spot report: find the lines that dominate a function's cost, and how each one scales.
+
+Per-line statement counts from the profiler's "lines" measure are fit line by line with
+the complexity fitter, then written out as annotated source: each executed line with its
+count at the largest input size, its share of all executed statements, and its best-fit
+complexity class.
+"""
+
+
+# lines whose share of executed statements is at least this are marked as hot spots
+HOT_SHARE = 0.1
+
+# lines of unexecuted source shown around executed lines in reports
+NUM_CONTEXT_LINES = 2
+
+LineHotspot = namedtuple('LineHotspot', ('filename', 'lineno', 'count', 'share', 'fit'))
+
+
+def fit_lines(profile_results):
+    """
+    Fit the growth of each line counted in {profile_results}, hottest line first.
+
+    Lines missing from a result executed zero times at that input size.
+
+    :param profile_results: ProfileResult[] - with line_counts, from the "lines" measure
+    :return: LineHotspot[] - counts and shares are at the largest input size
+    """
+    profile_results = sorted(
+        (result for result in profile_results if result.line_counts is not None),
+        key=lambda result: result.input_size)
+    if len(profile_results) < 2:
+        raise ValueError('need at least two results with line counts to fit')
+
+    largest = profile_results[-1]
+    total = float(sum(largest.line_counts.values())) or 1.0
+    keys = set(key for result in profile_results for key in result.line_counts)
+
+    hotspots = []
+    for key in keys:
+        line_results = [
+            profiler.ProfileResult(result.input_size, result.line_counts.get(key, 0))
+            for result in profile_results]
+        count = largest.line_counts.get(key, 0)
+        filename, lineno = profiler.parse_line_key(key)
+        hotspots.append(LineHotspot(
+            filename, lineno, count, count / total,
+            complexity.fit_complexity(line_results)))
+
+    return sorted(hotspots, key=lambda hotspot: (
+        -hotspot.count, hotspot.filename, hotspot.lineno))
+
+
+def profile_hotspots(func, num_runs, step, sort_order='random', executor='process',
+                     **kwargs):
+    """
+    Profile {func} counting statements per line, and fit the growth of each line.
+
+    :param func: function - must accept an integer list as only argument
+    :param num_runs: int
+    :param step: int
+    :param sort_order: str - one of input_provider.INPUT_ORDERS
+    :param executor: str - ["serial"|"thread"|"process"]
+    :param kwargs: keyword arguments to profiler.profile, e.g. seed or input_sizes
+    :return: LineHotspot[] - hottest line first
+    """
+    kwargs['measures'] = ('lines',)
+    results = profiler.profile(func, num_runs, step, sort_order, executor, **kwargs)
+    return fit_lines(results)
+
+
+def _iter_source_blocks(hotspots):
+    """
+    Group {hotspots} by file into blocks of source lines, with context around each line.
+
+    :param hotspots: LineHotspot[]
+    :return: generator - (filename, [(lineno, source, LineHotspot|None)]) blocks, in order
+    """
+    by_file = {}
+    for hotspot in hotspots:
+        by_file.setdefault(hotspot.filename, {})[hotspot.lineno] = hotspot
+
+    for filename in sorted(by_file):
+        line_hotspots = by_file[filename]
+        shown = set()
+        for lineno in line_hotspots:
+            shown.update(xrange(
+                max(lineno - NUM_CONTEXT_LINES, 1), lineno + NUM_CONTEXT_LINES + 1))
+
+        block = []
+        for lineno in sorted(shown):
+            source = linecache.getline(filename, lineno)
+            if not source:
+                continue
+            if block and lineno != block[-1][0] + 1:
+                yield filename, block
+                block = []
+            block.append((lineno, source.rstrip(), line_hotspots.get(lineno)))
+        if block:
+            yield filename, block
+
+
+def format_text(hotspots, title=None):
+    """
+    Return {hotspots} as annotated source, with hot spots marked by "*".
+
+    :param hotspots: LineHotspot[]
+    :param title: str|None - first line of the report
+    :return: str
+    """
+    lines = [title] if title else []
+    prev_filename = None
+
+    for filename, block in _iter_source_blocks(hotspots):
+        if filename != prev_filename:
+            header = '{:>12} {:>6} {:<8} {:>5}'.format('count', 'share', 'growth', 'line')
+            lines.extend(['', os.path.basename(filename), header])
+            prev_filename = filename
+        else:
+            lines.append('{:>12}'.format('...'))
+
+        for lineno, source, hotspot in block:
+            if hotspot is None:
+                lines.append('{:>12} {:>6} {:<8} {:>5}  {}'.format(
+                    '', '', '', lineno, source).rstrip())
+                continue
+            lines.append('{:>12} {:>5.1f}% {:<8} {:>5}{} {}'.format(
+                hotspot.count, 100 * hotspot.share, hotspot.fit.complexity, lineno,
+                '*' if hotspot.share >= HOT_SHARE else ' ', source))
+
+    return '\n'.join(lines) + '\n'
+
+
+def format_html(hotspots, title=None):
+    """
+    Return {hotspots} as an html page of annotated source, shaded by share.
+
+    :param hotspots: LineHotspot[]
+    :param title: str|None - page heading
+    :return: str
+    """
+    title = cgi.escape(title or 'Hot spots')
+    parts = [
+        '<!DOCTYPE html>',
+        '<html><head><meta charset="utf-8"><title>{}</title>'.format(title),
+        '<style>body {font-family: monospace} td {padding: 0 8px; white-space: pre}'
+        ' .num {text-align: right}</style></head>',
+        '<body><h1>{}</h1>'.format(title),
+    ]
+    prev_filename = None
+
+    for filename, block in _iter_source_blocks(hotspots):
+        if filename != prev_filename:
+            if prev_filename is not None:
+                parts.append('</table>')
+            parts.append('<h2>{}</h2><table>'.format(cgi.escape(filename)))
+            parts.append(
+                '<tr><th>count</th><th>share</th><th>growth</th><th>line</th><th></th>'
+                '</tr>')
+            prev_filename = filename
+        else:
+            parts.append('<tr><td colspan="5">...</td></tr>')
+
+        for lineno, source, hotspot in block:
+            if hotspot is None:
+                parts.append(
+                    '<tr><td></td><td></td><td></td><td class="num">{}</td><td>{}</td>'
+                    '</tr>'.format(lineno, cgi.escape(source)))
+                continue
+            # shade from white to red by share, so the dominant loops stand out
+            shade = int(255 * (1 - min(hotspot.share / HOT_SHARE / 2, 1) * 0.6))
+            parts.append(
+                '<tr style="background: rgb(255, {0}, {0})"><td class="num">{1}</td>'
+                '<td class="num">{2:.1f}%</td><td>{3}</td><td class="num">{4}</td>'
+                '<td>{5}</td></tr>'.format(
+                    shade, hotspot.count, 100 * hotspot.share,
+                    cgi.escape(hotspot.fit.complexity), lineno, cgi.escape(source)))
+
+    if prev_filename is not None:
+        parts.append('</table>')
+    parts.append('</body></html>')
+    return '\n'.join(parts) + '\n'
+
+
+class Tests(object):
+
+    def _hotspots(self, func_name, sort_order='descending'):
+        func = profiler._get_function_from_module(func_name)
+        return func, profile_hotspots(func, 8, 16, sort_order, 'serial')
+
+    def test_profile_hotspots__insertion_sort(self):
+        """Assert the inner while loop is the hottest line, and grows as n^2."""
+        func, hotspots = self._hotspots('insertion_sort')
+        hottest = hotspots[0]
+
+        assert 'while' in linecache.getline(hottest.filename, hottest.lineno)
+        assert hottest.fit.complexity == 'O(n^2)'
+        assert hottest.share > HOT_SHARE
+        assert abs(sum(hotspot.share for hotspot in hotspots) - 1) < 1e-9
+
+        # the function's own def line only runs once per call
+        def_hotspot = [hotspot for hotspot in hotspots
+                       if hotspot.lineno == func.__code__.co_firstlineno]
+        assert [hotspot.fit.complexity for hotspot in def_hotspot] in ([], ['O(1)'])
+
+    def test_profile_hotspots__merge_sort(self):
+        """Assert the merge loop dominates merge_sort, and grows as nlgn."""
+        func = profiler._get_function_from_module('merge_sort')
+
+        # lg(n) grows from 6 to 11, so nlgn cannot pass for linear growth
+        hotspots = profile_hotspots(
+            func, 0, 0, 'random', 'serial', seed=1,
+            input_sizes=profiler.geometric_input_sizes(6, 2048, 64))
+        hottest = hotspots[0]
+
+        assert linecache.getline(hottest.filename, hottest.lineno).strip().startswith(
+            ('while', 'for', 'if'))
+        assert hottest.fit.complexity == 'O(nlgn)'
+
+    def test_fit_lines__missing_lines_count_zero(self):
+        results = [
+            profiler.ProfileResult(10, 1, line_counts={'a.py:1': 1}),
+            profiler.ProfileResult(20, 3, line_counts={'a.py:1': 1, 'a.py:2': 2}),
+            profiler.ProfileResult(30, 5, line_counts={'a.py:1': 1, 'a.py:2': 4}),
+        ]
+        hotspots = fit_lines(results)
+
+        line_counts = [(hotspot.lineno, hotspot.count) for hotspot in hotspots]
+        assert line_counts == [(2, 4), (1, 1)]
+        assert hotspots[0].fit.complexity == 'O(n)'
+        assert hotspots[1].fit.complexity == 'O(1)'
+
+    def test_format_text_and_html(self):
+        func, hotspots = self._hotspots('insertion_sort')
+        text = format_text(hotspots, 'insertion_sort')
+        html = format_html(hotspots, 'insertion_sort')
+
+        assert text.startswith('insertion_sort\n')
+        hot_lines = [line for line in text.splitlines() if '*' in line[:40]]
+        assert any('while prev_item > item' in line for line in hot_lines)
+        assert 'O(n^2)' in text
+        assert html.count('<table>') == html.count('</table>') == 1
+        assert '&gt;' in html  # source is escaped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Report which lines of {function} in {module} dominate, and how each '
+                    'one scales.')
+    parser.add_argument(
+        'module',
+        help='name of module to import')
+    parser.add_argument(
+        '--function', '-f',
+        help='name of function to profile, if not same as module')
+    parser.add_argument(
+        '--path', '-p',
+        help='path to directory of module, if not same as script')
+    parser.add_argument(
+        '--num_runs', '-n',
+        type=int,
+        default=profiler.DEFAULT_NUM_RUNS,
+        help='run profiler {n} times')
+    parser.add_argument(
+        '--step', '-s',
+        type=int,
+        default=profiler.DEFAULT_STEP_SIZE,
+        help='increase input size by {s} each run')
+    parser.add_argument(
+        '--sort_order', '-o',
+        choices=input_provider.INPUT_ORDERS,
+        default='random',
+        help='order of profiler input')
+    parser.add_argument(
+        '--html',
+        help='write an html report to this path, rather than text to stdout')
+    args = parser.parse_args()
+
+    func = profiler._get_function_from_module(args.module, args.function, args.path)
+    line_hotspots = profile_hotspots(func, args.num_runs, args.step, args.sort_order)
+    report_title = '{} ({} input)'.format(func.__name__, args.sort_order)
+
+    if args.html:
+        with open(args.html, 'w') as html_file:
+            html_file.write(format_html(line_hotspots, report_title))
+    else:
+        print format_text(line_hotspots, report_title),
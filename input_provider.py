@@ -0,0 +1,346 @@
+from array import array
+from collections import OrderedDict
+import itertools
+import random
+import threading
+
+
+"""
+Input provider: generate profiler inputs from compact buffers shared across input sizes.
+
+Random and nearly sorted inputs are defined by one random key per value: the input of
+length n is the values 0-{n - 1} ordered by their keys. Keys are drawn in order of value
+from a seeded stream, so the input of each length never depends on which other lengths
+were generated first, and every input is filtered from one base permutation of the
+largest length requested. Ascending and descending inputs are prefixes and suffixes of
+one base range.
+
+Unseeded providers need not repeat any input, so they shuffle a new random input on every
+call, as fast as a shuffle of the range, and keep no keys or base permutations.
+"""
+
+
+INPUT_ORDERS = (
+    'random', 'ascending', 'descending', 'nearly_sorted', 'few_unique', 'sawtooth')
+
+# "list" and "array" inputs are copies, "numpy" prefixes and suffixes are read-only views
+BUFFER_TYPES = ('list', 'array', 'numpy')
+DEFAULT_BUFFER_TYPE = 'array'
+
+# array typecode of base buffers: a C long, as numpy.int_
+BASE_TYPECODE = 'l'
+
+# nearly sorted inputs move each value up to this many places from its sorted position
+NEARLY_SORTED_MAX_DISPLACEMENT = 8
+
+# few unique inputs are random inputs of this many distinct values
+FEW_UNIQUE_NUM_VALUES = 8
+
+# sawtooth inputs are this many ascending runs of equal length
+SAWTOOTH_NUM_TEETH = 4
+
+# seeded providers kept by get_input_provider, least recently used dropped first
+MAX_SHARED_PROVIDERS = 8
+
+# orders whose inputs are filtered from a base permutation sorted by random keys
+_KEYED_ORDERS = ('random', 'nearly_sorted')
+
+
+class InputProvider(object):
+    """
+    Seeded source of integer lists of any length and order, safe to share across threads.
+
+    Base buffers only ever grow (at least doubling) by being replaced, never modified, so
+    numpy views of them stay valid.
+    """
+
+    def __init__(self, seed=None, buffer_type=DEFAULT_BUFFER_TYPE):
+        """
+        :param seed: hashable|None - if None, seed from the system
+        :param buffer_type: str - ["list"|"array"|"numpy"]
+        """
+        if buffer_type not in BUFFER_TYPES:
+            raise ValueError('buffer_type must be one of {}'.format(BUFFER_TYPES))
+
+        self.seed = seed
+        self.buffer_type = buffer_type
+        self._lock = threading.Lock()
+        self._bases = {}
+
+        # each keyed order draws keys from its own stream, so orders are independent.
+        # Unseeded providers share the random module's stream: seeding a new one from the
+        # system costs more than shuffling a short input
+        self._keys = dict((order, array('d')) for order in _KEYED_ORDERS)
+        self._random_states = dict.fromkeys(_KEYED_ORDERS, random)
+        if seed is not None:
+            for order in _KEYED_ORDERS:
+                self._random_states[order] = random.Random('{}:{}'.format(seed, order))
+
+    def _extend_keys(self, order, length):
+        keys = self._keys[order]
+        random_value = self._random_states[order].random
+
+        if order == 'random':
+            keys.extend(random_value() for _ in xrange(len(keys), length))
+        else:
+            keys.extend(
+                value + random_value() * NEARLY_SORTED_MAX_DISPLACEMENT
+                for value in xrange(len(keys), length))
+
+    def _get_base(self, order, length):
+        """
+        Return the base buffer of {order}, with at least {length} values.
+
+        :param order: str - "random", "nearly_sorted", "ascending" or "descending"
+        :param length: int
+        :return: array.array
+        """
+        with self._lock:
+            base = self._bases.get(order)
+            if base is not None and len(base) >= length:
+                return base
+
+            # grow geometrically, so a linear sweep rebuilds the base O(lg n) times
+            length = max(length, 2 * len(base or ()), 1)
+
+            if order in _KEYED_ORDERS:
+                self._extend_keys(order, length)
+                keys = self._keys[order]
+                base = array(BASE_TYPECODE, sorted(xrange(length), key=keys.__getitem__))
+            elif order == 'ascending':
+                base = array(BASE_TYPECODE, xrange(length))
+            else:
+                base = array(BASE_TYPECODE, xrange(length - 1, -1, -1))
+
+            self._bases[order] = base
+            return base
+
+    def _get_keyed(self, order, length):
+        """
+        Return the values 0-{length - 1} ordered by random keys, as {order}.
+        """
+        if self.seed is not None:
+            return self._filter(order, length)
+
+        random_state = self._random_states[order]
+        if order == 'random':
+            values = range(length)
+            random_state.shuffle(values)
+        else:
+            random_value = random_state.random
+            keys = [
+                value + random_value() * NEARLY_SORTED_MAX_DISPLACEMENT
+                for value in xrange(length)]
+            values = sorted(xrange(length), key=keys.__getitem__)
+
+        if self.buffer_type == 'list':
+            return values
+        return self._from_values(values)
+
+    def _filter(self, order, length):
+        """
+        Return the values 0-{length - 1}, in the order of the base buffer of {order}.
+
+        Filters the base, unless {length} is short enough that sorting its keys, in about
+        length lg(length) steps, is cheaper than a step per value of the base.
+        """
+        base = self._get_base(order, length)
+        if length * length.bit_length() < len(base):
+            return self._sort_by_keys(order, length)
+
+        if self.buffer_type == 'numpy':
+            base_array = _as_numpy(base)
+            return base_array[base_array < length]
+        if self.buffer_type == 'array':
+            return array(BASE_TYPECODE, (value for value in base if value < length))
+        return [value for value in base if value < length]
+
+    def _sort_by_keys(self, order, length):
+        """
+        Return the values 0-{length - 1} sorted by their keys: the same as _filter.
+        """
+        keys = self._keys[order]
+        if self.buffer_type == 'numpy':
+            # numpy is only needed for numpy buffers: only import it if necessary
+            import numpy as np
+
+            # view a copy: another thread may grow the keys, moving their memory
+            key_array = np.frombuffer(keys[:length], dtype=keys.typecode)
+            return np.argsort(key_array, kind='mergesort').astype(BASE_TYPECODE)
+
+        values = sorted(xrange(length), key=keys.__getitem__)
+        if self.buffer_type == 'array':
+            return array(BASE_TYPECODE, values)
+        return values
+
+    def _slice(self, base, start_idx, end_idx):
+        """
+        Return base[start_idx:end_idx]: a read-only view if numpy, else a copy.
+        """
+        if self.buffer_type == 'numpy':
+            view = _as_numpy(base)[start_idx:end_idx]
+            view.flags.writeable = False
+            return view
+
+        values = base[start_idx:end_idx]
+        if self.buffer_type == 'list':
+            return values.tolist()
+        return values
+
+    def _from_values(self, values):
+        if self.buffer_type == 'list':
+            return list(values)
+        if self.buffer_type == 'array':
+            return array(BASE_TYPECODE, values)
+
+        # numpy is only needed for numpy buffers: only import it if necessary
+        import numpy as np
+        return np.fromiter(values, dtype=BASE_TYPECODE)
+
+    def get(self, length, order='random'):
+        """
+        Return an input of {length} integers, ordered by {order}.
+
+        Every order but "few_unique" and "sawtooth" is a permutation of 0-{length - 1}.
+        Callers that modify the input in place should copy it first.
+
+        :param length: int
+        :param order: str - one of INPUT_ORDERS
+        :return: list|array.array|numpy.ndarray - as {buffer_type}
+        """
+        if order not in INPUT_ORDERS:
+            raise ValueError('order must be one of {}'.format(INPUT_ORDERS))
+
+        if order in _KEYED_ORDERS:
+            return self._get_keyed(order, length)
+
+        if order == 'ascending':
+            return self._slice(self._get_base(order, length), 0, length)
+
+        if order == 'descending':
+            base = self._get_base(order, length)
+            return self._slice(base, len(base) - length, len(base))
+
+        if order == 'few_unique':
+            values = self._get_keyed('random', length)
+            if self.buffer_type == 'numpy':
+                return values % FEW_UNIQUE_NUM_VALUES
+            return self._from_values(value % FEW_UNIQUE_NUM_VALUES for value in values)
+
+        # sawtooth
+        tooth_length = max(-(-length // SAWTOOTH_NUM_TEETH), 1)
+        return self._from_values(idx % tooth_length for idx in xrange(length))
+
+
+def _as_numpy(base):
+    """
+    Return a numpy view of the array.array {base}, sharing its memory.
+    """
+    # numpy is only needed for numpy buffers: only import it if necessary
+    import numpy as np
+    return np.frombuffer(base, dtype=base.typecode)
+
+
+# one provider per seed, shared by every thread of the process, most recently used last
+_providers = OrderedDict()
+_providers_lock = threading.Lock()
+
+
+def get_input_provider(seed=None, buffer_type=DEFAULT_BUFFER_TYPE):
+    """
+    Return the shared InputProvider for {seed} and {buffer_type}, creating it if needed.
+
+    At most MAX_SHARED_PROVIDERS are kept, so a sweep over many seeds does not keep every
+    provider's base buffers.
+
+    :param seed: hashable|None - if None, a new provider seeded from the system, so
+        unseeded inputs are random on every call
+    :param buffer_type: str - ["list"|"array"|"numpy"]
+    :return: InputProvider
+    """
+    if seed is None:
+        return InputProvider(seed, buffer_type)
+
+    with _providers_lock:
+        key = (seed, buffer_type)
+        provider = _providers.pop(key, None) or InputProvider(seed, buffer_type)
+        _providers[key] = provider
+        if len(_providers) > MAX_SHARED_PROVIDERS:
+            _providers.popitem(last=False)
+        return provider
+
+
+class Tests(object):
+
+    def test_get__permutations(self):
+        for buffer_type, seed in itertools.product(BUFFER_TYPES, (0, None)):
+            provider = InputProvider(seed, buffer_type)
+            for order in ('random', 'ascending', 'descending', 'nearly_sorted'):
+                for length in (0, 1, 10, 100, 37):
+                    values = list(provider.get(length, order))
+                    assert sorted(values) == range(length), (buffer_type, seed, order)
+
+            assert list(provider.get(5, 'ascending')) == [0, 1, 2, 3, 4]
+            assert list(provider.get(5, 'descending')) == [4, 3, 2, 1, 0]
+
+    def test_get__unseeded_is_new_on_every_call(self):
+        provider = InputProvider()
+        assert list(provider.get(100)) != list(provider.get(100))
+        nearly_sorted = list(provider.get(100, 'nearly_sorted'))
+        assert nearly_sorted != list(provider.get(100, 'nearly_sorted'))
+        assert all(
+            abs(value - idx) <= NEARLY_SORTED_MAX_DISPLACEMENT
+            for idx, value in enumerate(nearly_sorted))
+
+    def test_get__independent_of_other_lengths(self):
+        """Assert an input only depends on the seed and its length, across buffers."""
+        provider = InputProvider(1, 'list')
+        expected = dict((order, provider.get(30, order)) for order in INPUT_ORDERS)
+
+        for buffer_type in BUFFER_TYPES:
+            provider = InputProvider(1, buffer_type)
+            for length in (5, 1000, 31):
+                for order in INPUT_ORDERS:
+                    provider.get(length, order)
+            for order in INPUT_ORDERS:
+                assert list(provider.get(30, order)) == expected[order], order
+
+    def test_get__random_is_uniform(self):
+        counts = dict.fromkeys(itertools.permutations(range(3)), 0)
+        for seed in xrange(1200):
+            counts[tuple(InputProvider(seed).get(3))] += 1
+
+        # chi-square critical value for 5 degrees of freedom at p = 0.001
+        chi_square = sum((count - 200.0) ** 2 / 200 for count in counts.values())
+        assert chi_square < 20.515, counts
+
+    def test_get__shapes(self):
+        provider = InputProvider(2, 'list')
+
+        nearly_sorted = provider.get(200, 'nearly_sorted')
+        assert all(abs(value - idx) <= NEARLY_SORTED_MAX_DISPLACEMENT
+                   for idx, value in enumerate(nearly_sorted))
+        assert nearly_sorted != range(200)
+
+        few_unique = provider.get(200, 'few_unique')
+        assert sorted(set(few_unique)) == range(FEW_UNIQUE_NUM_VALUES)
+
+        assert provider.get(8, 'sawtooth') == [0, 1, 0, 1, 0, 1, 0, 1]
+
+    def test_get_input_provider__shared_by_seed(self):
+        provider = get_input_provider(4)
+        assert get_input_provider(4) is provider
+        assert get_input_provider(None) is not get_input_provider(None)
+
+        for seed in xrange(100, 100 + MAX_SHARED_PROVIDERS):
+            get_input_provider(seed)
+        assert len(_providers) == MAX_SHARED_PROVIDERS
+        assert get_input_provider(4) is not provider  # least recently used
+
+    def test_get__numpy_views_are_read_only(self):
+        provider = InputProvider(3, 'numpy')
+        ascending = provider.get(10, 'ascending')
+        provider.get(1000, 'ascending')  # replaces, rather than resizes, the base
+
+        assert not ascending.flags.writeable
+        assert ascending.tolist() == range(10)
@@ -1,5 +1,12 @@
 
 
+# adaptive_insertion_sort extends runs shorter than this by binary insertion
+MIN_RUN_LENGTH = 32
+
+# merging switches to galloping after this many consecutive items are taken from one run
+MIN_GALLOP = 7
+
+
 def insertion_sort(int_list):
     """
     Sort a list of integers, moving left to right, shifting items left as needed.
@@ -24,6 +31,234 @@ def insertion_sort(int_list):
     return int_list
 
 
+def _bisect_right(int_list, item, low_idx, high_idx):
+    """
+    Return the index after the last item in sorted int_list[low_idx:high_idx] <= {item}.
+    """
+    while low_idx < high_idx:
+        mid_idx = (low_idx + high_idx) // 2
+        if item < int_list[mid_idx]:
+            high_idx = mid_idx
+        else:
+            low_idx = mid_idx + 1
+    return low_idx
+
+
+def _binary_insertion_sort(int_list, low_idx, start_idx, high_idx):
+    """
+    Sort int_list[low_idx:high_idx] in place, given int_list[low_idx:start_idx] is sorted.
+    """
+    for idx in xrange(max(start_idx, low_idx + 1), high_idx):
+        item = int_list[idx]
+        insert_idx = _bisect_right(int_list, item, low_idx, idx)
+
+        # shift greater items right in one slice assignment rather than one by one
+        if insert_idx < idx:
+            int_list[insert_idx + 1:idx + 1] = int_list[insert_idx:idx]
+            int_list[insert_idx] = item
+
+
+def binary_insertion_sort(int_list):
+    """
+    Sort a list of integers, finding where each item belongs by binary search.
+
+    Makes O(nlgn) comparisons. Shifting items is still quadratic, but each shift is a
+    single slice assignment. Stable: equal items are inserted after each other.
+
+    Runtime: f(n) = O(n^2)
+    """
+    _binary_insertion_sort(int_list, 0, 1, len(int_list))
+    return int_list
+
+
+def _gallop_right(item, int_list, low_idx, high_idx):
+    """
+    Return the index after the last item in sorted int_list[low_idx:high_idx] <= {item}.
+
+    Searches from low_idx at exponentially growing offsets before bisecting, so finding an
+    index k items from low_idx takes O(lg k) comparisons.
+    """
+    last_offset = 0
+    offset = 1
+    while low_idx + offset < high_idx and int_list[low_idx + offset - 1] <= item:
+        last_offset = offset
+        offset = offset * 2 + 1
+
+    # the index is after int_list[low_idx + last_offset - 1]
+    search_low_idx = low_idx + last_offset
+    search_high_idx = min(low_idx + offset, high_idx)
+    while search_low_idx < search_high_idx:
+        mid_idx = (search_low_idx + search_high_idx) // 2
+        if item < int_list[mid_idx]:
+            search_high_idx = mid_idx
+        else:
+            search_low_idx = mid_idx + 1
+    return search_low_idx
+
+
+def _gallop_left(item, int_list, low_idx, high_idx):
+    """
+    Return the index of the first item in sorted int_list[low_idx:high_idx] >= {item}.
+
+    Like _gallop_right, takes O(lg k) comparisons to find an index k items from low_idx.
+    """
+    last_offset = 0
+    offset = 1
+    while low_idx + offset < high_idx and int_list[low_idx + offset - 1] < item:
+        last_offset = offset
+        offset = offset * 2 + 1
+
+    search_low_idx = low_idx + last_offset
+    search_high_idx = min(low_idx + offset, high_idx)
+    while search_low_idx < search_high_idx:
+        mid_idx = (search_low_idx + search_high_idx) // 2
+        if int_list[mid_idx] < item:
+            search_low_idx = mid_idx + 1
+        else:
+            search_high_idx = mid_idx
+    return search_low_idx
+
+
+def _count_run(int_list, low_idx, high_idx):
+    """
+    Return the end index of the run starting at low_idx, reversing it if descending.
+
+    A run is non-descending, or strictly descending so reversing it keeps sort stable.
+    """
+    run_end_idx = low_idx + 1
+    if run_end_idx >= high_idx:
+        return high_idx
+
+    if int_list[run_end_idx] < int_list[low_idx]:
+        while (run_end_idx < high_idx and
+               int_list[run_end_idx] < int_list[run_end_idx - 1]):
+            run_end_idx += 1
+        int_list[low_idx:run_end_idx] = int_list[low_idx:run_end_idx][::-1]
+    else:
+        while (run_end_idx < high_idx and
+               int_list[run_end_idx] >= int_list[run_end_idx - 1]):
+            run_end_idx += 1
+
+    return run_end_idx
+
+
+def _merge_runs(int_list, low_idx, mid_idx, high_idx):
+    """
+    Merge sorted runs int_list[low_idx:mid_idx] and int_list[mid_idx:high_idx] in place.
+
+    Items of either run already in their final place are found by galloping and skipped,
+    so merging a run with a few late arrivals costs little more than finding them.
+    """
+    # left items <= the first right item, and right items >= the last left item, stay put
+    low_idx = _gallop_right(int_list[mid_idx], int_list, low_idx, mid_idx)
+    if low_idx == mid_idx:
+        return
+    high_idx = _gallop_left(int_list[mid_idx - 1], int_list, mid_idx, high_idx)
+
+    # merge from the front: copy the left run out, so the right run can be read in place
+    left_run = int_list[low_idx:mid_idx]
+    left_idx = 0
+    right_idx = mid_idx
+    dst_idx = low_idx
+    num_left_wins = 0
+    num_right_wins = 0
+
+    while left_idx < len(left_run) and right_idx < high_idx:
+        if int_list[right_idx] < left_run[left_idx]:
+            if num_right_wins >= MIN_GALLOP:
+                # take every right item less than the next left item in one step
+                end_idx = _gallop_left(left_run[left_idx], int_list, right_idx, high_idx)
+                num_taken = end_idx - right_idx
+                int_list[dst_idx:dst_idx + num_taken] = int_list[right_idx:end_idx]
+                dst_idx += num_taken
+                right_idx = end_idx
+                num_right_wins = 0
+                continue
+
+            int_list[dst_idx] = int_list[right_idx]
+            right_idx += 1
+            num_right_wins += 1
+            num_left_wins = 0
+        else:
+            if num_left_wins >= MIN_GALLOP:
+                # take every left item less than or equal to the next right item
+                end_idx = _gallop_right(
+                    int_list[right_idx], left_run, left_idx, len(left_run))
+                num_taken = end_idx - left_idx
+                int_list[dst_idx:dst_idx + num_taken] = left_run[left_idx:end_idx]
+                dst_idx += num_taken
+                left_idx = end_idx
+                num_left_wins = 0
+                continue
+
+            int_list[dst_idx] = left_run[left_idx]
+            left_idx += 1
+            num_left_wins += 1
+            num_right_wins = 0
+        dst_idx += 1
+
+    # remaining right items are already in place: only remaining left items must move
+    int_list[dst_idx:dst_idx + len(left_run) - left_idx] = left_run[left_idx:]
+
+
+def adaptive_insertion_sort(int_list):
+    """
+    Sort a list of integers by finding runs that are already sorted and merging them.
+
+    Descending runs are reversed, and runs shorter than MIN_RUN_LENGTH are extended by
+    binary insertion. Runs are merged pairwise with galloping, so nearly sorted input
+    (e.g. an append-only log with a few late arrivals) sorts in about linear time.
+
+    Runtime: f(n) = O(nlgn)
+    """
+    num_items = len(int_list)
+    runs = []
+
+    low_idx = 0
+    while low_idx < num_items:
+        high_idx = _count_run(int_list, low_idx, num_items)
+        if high_idx - low_idx < MIN_RUN_LENGTH:
+            forced_high_idx = min(low_idx + MIN_RUN_LENGTH, num_items)
+            _binary_insertion_sort(int_list, low_idx, high_idx, forced_high_idx)
+            high_idx = forced_high_idx
+        runs.append((low_idx, high_idx))
+        low_idx = high_idx
+
+    while len(runs) > 1:
+        merged_runs = []
+        for (low_idx, mid_idx), (_, high_idx) in zip(runs[::2], runs[1::2]):
+            _merge_runs(int_list, low_idx, mid_idx, high_idx)
+            merged_runs.append((low_idx, high_idx))
+        if len(runs) % 2:
+            merged_runs.append(runs[-1])
+        runs = merged_runs
+
+    return int_list
+
+
+def insert_sorted(sorted_list, items):
+    """
+    Insert {items} into {sorted_list} in place, keeping it sorted.
+
+    Costs O(k lg k) comparisons to sort k items, plus O(k + lg n) to merge them in.
+
+    :param sorted_list: int[] - must already be sorted
+    :param items: iterable - of integers, in any order
+    :return: int[] - {sorted_list}
+    """
+    num_sorted = len(sorted_list)
+    sorted_list.extend(items)
+    if num_sorted == 0 or num_sorted == len(sorted_list):
+        return adaptive_insertion_sort(sorted_list)
+
+    # sort the new items where they are, then merge them in as a single run
+    batch = adaptive_insertion_sort(sorted_list[num_sorted:])
+    sorted_list[num_sorted:] = batch
+    _merge_runs(sorted_list, 0, num_sorted, len(sorted_list))
+
+    return sorted_list
+
+
 class Tests():
 
     def test_sort__increasing(self):
@@ -43,3 +278,59 @@ class Tests():
         expected = [1, 1, 2, 7, 7, 9]
 
         assert insertion_sort(int_list) == expected
+
+    def _comparisons(self, sort_function, int_list):
+        """Return sorted {int_list} and the number of comparisons made to sort it."""
+        num_comparisons = [0]
+
+        class Counted(int):
+            def __lt__(self, other):
+                num_comparisons[0] += 1
+                return int(self) < int(other)
+
+            def __le__(self, other):
+                num_comparisons[0] += 1
+                return int(self) <= int(other)
+
+            def __gt__(self, other):
+                num_comparisons[0] += 1
+                return int(self) > int(other)
+
+            def __ge__(self, other):
+                num_comparisons[0] += 1
+                return int(self) >= int(other)
+
+        result = sort_function([Counted(item) for item in int_list])
+        return [int(item) for item in result], num_comparisons[0]
+
+    def test_sort_variants__match_sorted(self):
+        import random
+        int_lists = [[], [1], [2, 1], range(100), range(100, 0, -1)]
+        int_lists += [[random.randint(0, 20) for _ in xrange(n)] for n in (31, 33, 500)]
+
+        for int_list in int_lists:
+            expected = sorted(int_list)
+            assert binary_insertion_sort(list(int_list)) == expected
+            assert adaptive_insertion_sort(list(int_list)) == expected
+
+    def test_binary_insertion_sort__comparisons(self):
+        """Assert descending input takes O(nlgn) rather than O(n^2) comparisons."""
+        _, num_comparisons = self._comparisons(binary_insertion_sort, range(1024, 0, -1))
+        assert num_comparisons <= 1024 * 10
+
+    def test_adaptive_insertion_sort__nearly_sorted(self):
+        """Assert a few late arrivals in sorted input take about linear comparisons."""
+        int_list = range(10000)
+        for late_idx in (1000, 5000, 9000):
+            int_list.insert(late_idx + 50, int_list.pop(late_idx))
+
+        result, num_comparisons = self._comparisons(adaptive_insertion_sort, int_list)
+        assert result == range(10000)
+        assert num_comparisons < 10000 * 1.5
+
+    def test_insert_sorted(self):
+        sorted_list = range(0, 1000, 2)
+        insert_sorted(sorted_list, [999, 1, 501, 1, -5])
+
+        assert sorted_list == sorted(range(0, 1000, 2) + [999, 1, 501, 1, -5])
+        assert insert_sorted([], [3, 1, 2]) == [1, 2, 3]
@@ -0,0 +1,292 @@
+from collections import namedtuple
+import inspect
+
+
+"""
+Operation counting: measure sort cost in comparisons, reads, writes and swaps.
+
+The input is wrapped in a CountingList of CountedInts, so the algorithm runs unchanged
+and untraced. Every comparison between items, and every read or write of the input (or
+of a list sliced from it, e.g. int_list[:0] as an empty buffer), is counted as it
+happens. Lists the algorithm builds itself are not counted: if it returns one, its
+reads, writes and swaps are None rather than an undercount. Comparisons made by a
+builtin type's own method, e.g. float('inf') > item, are not counted either.
+
+Algorithms that sort keys derived from their input, rather than its items, take their
+sort backend as a {SORT_ALGORITHM_ARG} argument: it is replaced by one that sorts counted
+keys, so their comparisons are counted too.
+"""
+
+
+# name of the argument through which algorithms take the function that sorts their keys
+SORT_ALGORITHM_ARG = 'sort_algorithm'
+
+
+
+# reads, writes and swaps are None if the algorithm returned a list it built itself
+OperationCounts = namedtuple(
+    'OperationCounts', ('comparisons', 'reads', 'writes', 'swaps'))
+
+
+class OperationCounter(object):
+    """
+    Running totals of the operations on one instrumented input.
+    """
+
+    def __init__(self):
+        self.comparisons = 0
+        self.reads = 0
+        self.writes = 0
+        self.swaps = 0
+
+    def counts(self):
+        """
+        :return: OperationCounts
+        """
+        return OperationCounts(self.comparisons, self.reads, self.writes, self.swaps)
+
+
+class CountedInt(int):
+    """
+    int that counts each comparison with it in the counter of its class.
+
+    Each counter gets its own subclass from counted_int_type, so values need no storage
+    beyond an int and concurrent runs count separately. Arithmetic returns plain ints.
+    """
+
+    __slots__ = ()
+    counter = None
+
+    def __lt__(self, other):
+        self.counter.comparisons += 1
+        return int(self) < _uncounted(other)
+
+    def __le__(self, other):
+        self.counter.comparisons += 1
+        return int(self) <= _uncounted(other)
+
+    def __gt__(self, other):
+        self.counter.comparisons += 1
+        return int(self) > _uncounted(other)
+
+    def __ge__(self, other):
+        self.counter.comparisons += 1
+        return int(self) >= _uncounted(other)
+
+    def __eq__(self, other):
+        self.counter.comparisons += 1
+        return int(self) == _uncounted(other)
+
+    def __ne__(self, other):
+        self.counter.comparisons += 1
+        return int(self) != _uncounted(other)
+
+    __hash__ = int.__hash__
+
+
+def _uncounted(item):
+    # compare CountedInts as plain ints, else the other item counts the comparison again
+    return int(item) if isinstance(item, CountedInt) else item
+
+
+def counted_int_type(counter):
+    """
+    Return a subclass of CountedInt that counts comparisons in {counter}.
+
+    :param counter: OperationCounter
+    :return: type
+    """
+    return type('CountedInt', (CountedInt,), {'__slots__': (), 'counter': counter})
+
+
+# unbound list methods, looked up once rather than on every access
+_list_getitem = list.__getitem__
+_list_setitem = list.__setitem__
+
+# placeholder for "no previous write", never an item of a list
+_NO_ITEM = object()
+
+
+class CountingList(list):
+    """
+    list that counts reads and writes of its items, and swaps of two items.
+
+    A swap is a write that puts back the item overwritten by the previous write, in
+    place of the item that write copied, e.g. int_list[i], int_list[j] = int_list[j],
+    int_list[i]. Slices are CountingLists sharing the same counter.
+    """
+
+    def __init__(self, iterable=(), counter=None):
+        """
+        :param iterable: iterable - initial items, not counted as writes
+        :param counter: OperationCounter|None - if None, a new counter
+        """
+        super(CountingList, self).__init__(iterable)
+        self.counter = counter or OperationCounter()
+
+        # the item written and the item overwritten by the previous write
+        self._last_written = self._last_overwritten = _NO_ITEM
+
+    def __getitem__(self, idx):
+        if idx.__class__ is slice:
+            items = _list_getitem(self, idx)
+            self.counter.reads += len(items)
+            return CountingList(items, self.counter)
+
+        self.counter.reads += 1
+        return _list_getitem(self, idx)
+
+    def __setitem__(self, idx, item):
+        if idx.__class__ is slice:
+            items = list(item)
+            self.counter.writes += len(items)
+            self._last_written = self._last_overwritten = _NO_ITEM
+            return _list_setitem(self, idx, items)
+
+        overwritten = _list_getitem(self, idx)
+        counter = self.counter
+        if item is self._last_overwritten and overwritten is self._last_written:
+            counter.swaps += 1
+            self._last_written = self._last_overwritten = _NO_ITEM
+        else:
+            self._last_written = item
+            self._last_overwritten = overwritten
+
+        counter.writes += 1
+        _list_setitem(self, idx, item)
+
+    # python 2 calls these for simple slices, rather than __getitem__ and __setitem__
+    def __getslice__(self, low_idx, high_idx):
+        return self.__getitem__(slice(low_idx, high_idx))
+
+    def __setslice__(self, low_idx, high_idx, items):
+        self.__setitem__(slice(low_idx, high_idx), items)
+
+    def __iter__(self):
+        counter = self.counter
+        for item in list.__iter__(self):
+            counter.reads += 1
+            yield item
+
+    def append(self, item):
+        self.counter.writes += 1
+        list.append(self, item)
+
+
+def _get_sort_algorithm(func):
+    """
+    Return the default sort backend of {func}, or None if it takes no SORT_ALGORITHM_ARG.
+    """
+    try:
+        arg_spec = inspect.getargspec(func)
+    except TypeError:
+        return None  # a builtin, e.g. sorted
+
+    defaults = dict(zip(reversed(arg_spec.args), reversed(arg_spec.defaults or ())))
+    return defaults.get(SORT_ALGORITHM_ARG)
+
+
+def counting_sort_algorithm(sort_algorithm, counter):
+    """
+    Return a sort backend that runs {sort_algorithm} on a counted copy of its keys.
+
+    :param sort_algorithm: function - returns a sorted list of integers
+    :param counter: OperationCounter - counts the operations on the keys
+    :return: function
+    """
+    key_type = counted_int_type(counter)
+
+    def sort_counted_keys(keys):
+        return sort_algorithm(CountingList((key_type(key) for key in keys), counter))
+
+    return sort_counted_keys
+
+
+def count_operations(func, func_args):
+    """
+    Call {func} with an instrumented copy of {func_args} and count its operations.
+
+    If {func} takes a SORT_ALGORITHM_ARG, the operations of its default sort backend on
+    the keys it sorts are counted as well.
+
+    :param func: function - must accept an integer list as only argument
+    :param func_args: int[]
+    :return: OperationCounts
+    """
+    counter = OperationCounter()
+    item_type = counted_int_type(counter)
+    func_kwargs = {}
+    sort_algorithm = _get_sort_algorithm(func)
+    if sort_algorithm is not None:
+        func_kwargs[SORT_ALGORITHM_ARG] = counting_sort_algorithm(sort_algorithm, counter)
+
+    result = func(
+        CountingList((item_type(item) for item in func_args), counter), **func_kwargs)
+
+    if isinstance(result, list) and not isinstance(result, CountingList):
+        # the output was written to a list that was not counted
+        return OperationCounts(counter.comparisons, None, None, None)
+    return counter.counts()
+
+
+class Tests(object):
+
+    def test_count_operations__insertion_sort(self):
+        """Assert a reversed list takes n(n - 1) / 2 shifts, plus one write per item."""
+        from insertion_sort import insertion_sort
+        counts = count_operations(insertion_sort, range(10, 0, -1))
+
+        # each shifted item also compares with int_list[-1], once it reaches the front
+        assert counts.comparisons == 45 + 9
+        assert counts.writes == 45 + 9
+
+        counts = count_operations(insertion_sort, range(10))
+        assert counts == OperationCounts(9, 19, 9, 0)
+
+    def test_count_operations__merge_sort(self):
+        """Assert merge_sort copies and merges every item at each of its lg(n) levels."""
+        from merge_sort import merge_sort
+        counts = count_operations(merge_sort, range(64, 0, -1))
+
+        # each level slices every item, then reads two items to merge each one
+        assert counts.comparisons == 64 * 6
+        assert counts.reads == 64 * 6 * 3
+        # each of the 63 merges also appends an infinite sentinel to both halves
+        assert counts.writes == 64 * 6 + 63 * 2
+        assert counts.swaps == 0
+
+    def test_count_operations__randomize_list_sort(self):
+        """Assert the ranks' comparisons are counted, and a new list's writes are not."""
+        from randomize_list_sort import randomize_list_sort
+        for num_items, num_levels in ((64, 6), (512, 9)):
+            counts = count_operations(randomize_list_sort, range(num_items))
+
+            # the default merge_sort merges every rank at each of its lg(n) levels, but
+            # comparisons made by an infinite sentinel's float method are not counted:
+            # until one half runs out, at least half of the ranks of a merge are compared
+            max_comparisons = num_items * num_levels
+            assert max_comparisons / 2 <= counts.comparisons <= max_comparisons
+            assert counts.reads is counts.writes is counts.swaps is None
+
+    def test_count_operations__randomize_list_in_place(self):
+        """Assert every step of the shuffle is one swap, and no item is compared."""
+        from randomize_list_in_place import randomize_list_in_place
+        counts = count_operations(randomize_list_in_place, range(50))
+        assert counts == OperationCounts(0, 98, 98, 49)
+
+    def test_counting_list__swaps(self):
+        int_list = CountingList(range(5))
+        int_list[0], int_list[4] = int_list[4], int_list[0]
+        int_list[1] = int_list[2]
+
+        assert int_list == [4, 2, 2, 3, 0]
+        assert int_list.counter.counts() == OperationCounts(0, 3, 3, 1)
+
+    def test_counted_int__separate_counters(self):
+        counter_1 = OperationCounter()
+        counter_2 = OperationCounter()
+        item_1 = counted_int_type(counter_1)(1)
+        item_2 = counted_int_type(counter_2)(2)
+
+        assert item_1 < 2 and 1 < item_2 and item_1 < item_2
+        assert (counter_1.comparisons, counter_2.comparisons) == (2, 1)
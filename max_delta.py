@@ -1,5 +1,7 @@
 from collections import namedtuple
 
+from segment_tree import SegmentTree
+
 
 MaxDelta = namedtuple('MaxDelta', ('delta', 'start_idx', 'end_idx'))
 
@@ -13,39 +15,221 @@ def max_delta(int_list):
     if len(int_list) == 1:
         return MaxDelta(delta=0, start_idx=0, end_idx=0)
 
+    # start with the first two elements, so max_delta is found even if all are decreasing
     current_low_idx = 0
-    current_high_idx = 1
+    max_delta = MaxDelta(int_list[1] - int_list[0], 0, 1)
 
-    start_delta = int_list[current_high_idx] - int_list[current_low_idx]
-    max_delta = MaxDelta(start_delta, current_low_idx, current_high_idx)
+    for current_idx in xrange(1, len(int_list)):
+        val = int_list[current_idx]
 
-    for current_idx, val in enumerate(int_list):
+        # the best delta ending here starts at the lowest value seen before it
+        current_delta = val - int_list[current_low_idx]
+        if current_delta > max_delta.delta:
+            max_delta = MaxDelta(current_delta, current_low_idx, current_idx)
 
-        # skip the first two iterations, we've already compared the first two elements
-        if current_idx <= current_high_idx:
-            continue
+        # if value is lower than any we've seen before, later deltas should start here
+        if val < int_list[current_low_idx]:
+            current_low_idx = current_idx
 
-        # if value is greater than one we've seen before, update current_high_idx
-        if val > int_list[current_high_idx]:
-            current_high_idx = current_idx
+    return max_delta
 
-            # if we've found a new current_high_idx, check if we've found a new max_delta
-            current_delta = int_list[current_high_idx] - int_list[current_low_idx]
-            if current_delta > max_delta.delta:
-                max_delta = MaxDelta(current_delta, current_low_idx, current_high_idx)
 
-        # if value is lower than one we've seen before, update current_low_idx
-        elif val < int_list[current_low_idx]:
-            current_low_idx = current_idx
+class OnlineMaxDelta(object):
+    """
+    Track the max delta of a stream of integers, one value at a time, in O(1) memory.
 
-            # ensure max_delta is found even if all elements are decreasing
-            # to allow max_deltas where start_idx and end_idx are the same, where delta
-            # would always be 0, don't subtract 1 from currend_idx below
-            incremental_delta = int_list[current_idx] - int_list[current_idx - 1]
-            if incremental_delta > max_delta.delta:
-                max_delta = MaxDelta(incremental_delta, current_idx - 1, current_idx)
+    After each value, max_delta is the same as max_delta() of every value so far. Before
+    the first value, like OnlineMaxSubarray, every field of max_delta is None.
+    """
 
-    return max_delta
+    def __init__(self, int_iterable=()):
+        """
+        :param int_iterable: iterable - initial values, e.g. a generator or file reader
+        """
+        self.num_values = 0
+        self.max_delta = MaxDelta(None, None, None)
+        self._low_val = None
+        self._low_idx = None
+        self.extend(int_iterable)
+
+    def update(self, val):
+        """
+        Add the next value of the stream.
+
+        :param val: int
+        :return: MaxDelta - of every value so far
+        """
+        current_idx = self.num_values
+        self.num_values += 1
+
+        if current_idx == 0:
+            self.max_delta = MaxDelta(delta=0, start_idx=0, end_idx=0)
+            self._low_val = val
+            self._low_idx = 0
+            return self.max_delta
+
+        # the first delta replaces the single-value result, even if negative
+        current_delta = val - self._low_val
+        if current_idx == 1 or current_delta > self.max_delta.delta:
+            self.max_delta = MaxDelta(current_delta, self._low_idx, current_idx)
+
+        if val < self._low_val:
+            self._low_val = val
+            self._low_idx = current_idx
+
+        return self.max_delta
+
+    def extend(self, int_iterable):
+        """
+        Add every value of {int_iterable}, consuming it lazily.
+
+        :param int_iterable: iterable
+        :return: MaxDelta - of every value so far
+        """
+        for val in int_iterable:
+            self.update(val)
+        return self.max_delta
+
+
+def iter_max_delta(int_iterable):
+    """
+    Yield the max delta of the values so far, after each value of {int_iterable}.
+
+    :param int_iterable: iterable - e.g. an unbounded stream of ticks
+    :return: generator - MaxDeltas
+    """
+    tracker = OnlineMaxDelta()
+    for val in int_iterable:
+        yield tracker.update(val)
+
+
+def max_delta_batch(int_array):
+    """
+    Find the max delta of each row of a 2-D array at once, with the same result as
+    max_delta.
+
+    Uses vectorized running minima and argmax rather than a python loop over each item.
+
+    :param int_array: numpy.ndarray - 2-D, one series per row, at least one column
+    :return: MaxDelta - of numpy arrays, with one delta, start_idx and end_idx per row
+    """
+    # numpy is only needed for batches: only import it if necessary
+    import numpy as np
+
+    int_array = np.asarray(int_array)
+    if int_array.ndim != 2 or int_array.shape[1] == 0:
+        raise ValueError('expected a 2-D array with at least one column')
+
+    num_rows, num_cols = int_array.shape
+    if num_cols == 1:
+        zeros = np.zeros(num_rows, dtype=np.intp)
+        return MaxDelta(np.zeros(num_rows, dtype=int_array.dtype), zeros, zeros.copy())
+
+    # the best delta ending at each column starts at the lowest value before it, where
+    # that value first occurred: a new minimum is strictly lower than those before it
+    lowest_values = int_array[:, :-1]
+    running_min = np.minimum.accumulate(lowest_values, axis=1)
+    is_new_min = np.ones(lowest_values.shape, dtype=bool)
+    is_new_min[:, 1:] = lowest_values[:, 1:] < running_min[:, :-1]
+    min_idx = np.maximum.accumulate(
+        np.where(is_new_min, np.arange(num_cols - 1), 0), axis=1)
+
+    deltas = int_array[:, 1:] - running_min
+
+    # argmax returns the first maximum, as max_delta keeps the first delta found
+    rows = np.arange(num_rows)
+    best_idx = np.argmax(deltas, axis=1)
+    return MaxDelta(deltas[rows, best_idx], min_idx[rows, best_idx], best_idx + 1)
+
+
+def _delta_rank(result):
+    # max_delta keeps the greatest delta that ends first, from the first lowest value
+    return -result.delta, result.end_idx, result.start_idx
+
+
+def _delta_leaf(idx, val):
+    # (min value, its first idx, max value, its first idx, best delta): one item has none
+    return val, idx, val, idx, None
+
+
+def _combine_deltas(left, right):
+    """
+    Summarize two adjacent ranges: the best delta is in the left, in the right, or runs
+    from the left's lowest value to the right's highest.
+    """
+    left_min, left_min_idx, left_max, left_max_idx, left_best = left
+    right_min, right_min_idx, right_max, right_max_idx, right_best = right
+
+    candidates = [MaxDelta(right_max - left_min, left_min_idx, right_max_idx)]
+    candidates += [best for best in (left_best, right_best) if best is not None]
+
+    # on ties, keep the first occurrence of the lowest and highest values
+    if right_min < left_min:
+        left_min, left_min_idx = right_min, right_min_idx
+    if right_max > left_max:
+        left_max, left_max_idx = right_max, right_max_idx
+
+    best = min(candidates, key=_delta_rank)
+    return left_min, left_min_idx, left_max, left_max_idx, best
+
+
+class MaxDeltaIndex(object):
+    """
+    Segment tree over a list of integers, for many max delta queries on one series.
+
+    Each node stores the lowest value, highest value and best delta of its range, so any
+    range is answered from O(lg n) nodes instead of rescanning the slice. query(i, j) is
+    the same as max_delta(int_list[i:j + 1]), with indices into int_list.
+
+    Runtime: build f(n) = O(n), query and update f(n) = O(lgn)
+    """
+
+    def __init__(self, int_list):
+        """
+        :param int_list: list - at least one integer
+        """
+        if not int_list:
+            raise ValueError('cannot index an empty list')
+        self._tree = SegmentTree(
+            [_delta_leaf(idx, val) for idx, val in enumerate(int_list)], _combine_deltas)
+
+    def __len__(self):
+        return self._tree.num_leaves
+
+    def query(self, start_idx, end_idx):
+        """
+        Find the max delta of items start_idx to end_idx, inclusive.
+
+        :param start_idx: int
+        :param end_idx: int
+        :return: MaxDelta
+        """
+        best = self._tree.query(start_idx, end_idx)[4]
+        if best is None:
+            return MaxDelta(delta=0, start_idx=start_idx, end_idx=start_idx)
+        return best
+
+    def update(self, idx, val):
+        """
+        Replace the item at {idx}.
+
+        :param idx: int
+        :param val: int
+        """
+        self._tree.update(idx, _delta_leaf(idx, val))
+
+    def iter_windows(self, width):
+        """
+        Yield the max delta of every window of {width} consecutive items, left to right.
+
+        :param width: int - between 1 and the number of items
+        :return: generator - MaxDeltas
+        """
+        if not 0 < width <= len(self):
+            raise ValueError('window width must be between 1 and {}'.format(len(self)))
+
+        for start_idx in xrange(len(self) - width + 1):
+            yield self.query(start_idx, start_idx + width - 1)
 
 
 class Tests():
@@ -77,3 +261,70 @@ class Tests():
 
         result = max_delta(int_list)
         assert result == expected_1 or result == expected_2
+
+    def test_max_delta__low_after_high(self):
+        """Assert a new low after the high so far can start the max delta."""
+        int_list = [5, 10, 1, 9]
+        expected = MaxDelta(8, 2, 3)
+        assert max_delta(int_list) == expected
+
+    def test_max_delta_batch__matches_max_delta(self):
+        import numpy as np
+        rows = [
+            [-2, -1, 0, 2, 9],
+            [9, 4, 2, 0, -1],
+            [3, 5, 1, 1, 6],
+            [5, 10, 1, 9, 0],
+            [4, 4, 4, 4, 4],
+        ]
+        rows += np.random.RandomState(0).randint(-50, 50, size=(50, 5)).tolist()
+        result = max_delta_batch(np.array(rows))
+
+        for row_idx, row in enumerate(rows):
+            expected = max_delta(row)
+            assert (result.delta[row_idx], result.start_idx[row_idx],
+                    result.end_idx[row_idx]) == expected
+
+    def test_max_delta_batch__one_column(self):
+        import numpy as np
+        result = max_delta_batch(np.array([[3], [-1]]))
+
+        assert result.delta.tolist() == [0, 0]
+        assert result.start_idx.tolist() == result.end_idx.tolist() == [0, 0]
+
+    def test_online_max_delta__matches_max_delta(self):
+        import random
+        int_list = [random.randint(-10, 10) for _ in xrange(200)]
+        int_list = [9, 4, 2] + int_list
+
+        results = list(iter_max_delta(iter(int_list)))
+        for end_idx, result in enumerate(results):
+            assert result == max_delta(int_list[:end_idx + 1])
+
+        assert OnlineMaxDelta(iter(int_list)).max_delta == results[-1]
+        assert OnlineMaxDelta().max_delta == MaxDelta(None, None, None)
+
+    def test_max_delta_index__matches_max_delta(self):
+        """Assert range queries match max_delta of the slice, also after updates."""
+        import random
+        int_list = [random.randint(-5, 5) for _ in xrange(40)]
+        index = MaxDeltaIndex(int_list)
+
+        for _ in xrange(3):
+            for start_idx in xrange(len(int_list)):
+                for end_idx in xrange(start_idx, len(int_list)):
+                    expected = max_delta(int_list[start_idx:end_idx + 1])
+                    assert index.query(start_idx, end_idx) == (
+                        expected.delta, expected.start_idx + start_idx,
+                        expected.end_idx + start_idx)
+
+            idx = random.randrange(len(int_list))
+            int_list[idx] = random.randint(-5, 5)
+            index.update(idx, int_list[idx])
+
+    def test_max_delta_index__iter_windows(self):
+        int_list = [5, 10, 1, 9, 0]
+        windows = list(MaxDeltaIndex(int_list).iter_windows(2))
+
+        assert windows == [
+            MaxDelta(5, 0, 1), MaxDelta(-9, 1, 2), MaxDelta(8, 2, 3), MaxDelta(-9, 3, 4)]
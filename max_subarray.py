@@ -1,5 +1,7 @@
 from collections import namedtuple
 
+from segment_tree import SegmentTree
+
 
 MaxSubarray = namedtuple('MaxSubarray', ('sum', 'start_idx', 'end_idx'))
 
@@ -39,6 +41,206 @@ def max_subarray(int_list):
     return MaxSubarray(max_sum, max_start_idx, max_end_idx)
 
 
+class OnlineMaxSubarray(object):
+    """
+    Track the max subarray of a stream of integers, one value at a time, in O(1) memory.
+
+    After each value, max_subarray is the same as max_subarray() of every value so far.
+    """
+
+    def __init__(self, int_iterable=()):
+        """
+        :param int_iterable: iterable - initial values, e.g. a generator or file reader
+        """
+        self.num_values = 0
+        self.max_subarray = MaxSubarray(None, None, None)
+        self._current_sum = 0
+        self._current_start_idx = None
+        self.extend(int_iterable)
+
+    def update(self, val):
+        """
+        Add the next value of the stream.
+
+        :param val: int
+        :return: MaxSubarray - of every value so far
+        """
+        current_idx = self.num_values
+        self.num_values += 1
+        self._current_sum += val
+
+        if self._current_start_idx is None:
+            self._current_start_idx = current_idx
+
+        if self._current_sum > self.max_subarray.sum or self.max_subarray.sum is None:
+            self.max_subarray = MaxSubarray(
+                self._current_sum, self._current_start_idx, current_idx)
+
+        if self._current_sum < 0:
+            self._current_sum = 0
+            self._current_start_idx = None
+
+        return self.max_subarray
+
+    def extend(self, int_iterable):
+        """
+        Add every value of {int_iterable}, consuming it lazily.
+
+        :param int_iterable: iterable
+        :return: MaxSubarray - of every value so far
+        """
+        for val in int_iterable:
+            self.update(val)
+        return self.max_subarray
+
+
+def iter_max_subarray(int_iterable):
+    """
+    Yield the max subarray of the values so far, after each value of {int_iterable}.
+
+    :param int_iterable: iterable - e.g. an unbounded stream of ticks
+    :return: generator - MaxSubarrays
+    """
+    tracker = OnlineMaxSubarray()
+    for val in int_iterable:
+        yield tracker.update(val)
+
+
+def max_subarray_batch(int_array):
+    """
+    Find the max subarray of each row of a 2-D array at once, with the same result as
+    max_subarray.
+
+    The sum of items i to j is prefix_sums[j + 1] - prefix_sums[i], so the best subarray
+    ending at j starts at the lowest prefix sum up to j. Taking the first strictly lower
+    prefix sum matches max_subarray, which only resets when its sum drops below zero.
+
+    :param int_array: numpy.ndarray - 2-D, one series per row, at least one column
+    :return: MaxSubarray - of numpy arrays, with one sum, start_idx and end_idx per row
+    """
+    # numpy is only needed for batches: only import it if necessary
+    import numpy as np
+
+    int_array = np.asarray(int_array)
+    if int_array.ndim != 2 or int_array.shape[1] == 0:
+        raise ValueError('expected a 2-D array with at least one column')
+
+    num_rows, num_cols = int_array.shape
+    prefix_sums = np.zeros(
+        (num_rows, num_cols + 1), dtype=np.result_type(int_array.dtype, np.int64))
+    np.cumsum(int_array, axis=1, out=prefix_sums[:, 1:])
+
+    # running minimum of prefix sums before each end column, and where it first occurred:
+    # a new minimum is strictly lower than those before it
+    lowest_prefix = prefix_sums[:, :-1]
+    running_min = np.minimum.accumulate(lowest_prefix, axis=1)
+    is_new_min = np.ones(lowest_prefix.shape, dtype=bool)
+    is_new_min[:, 1:] = lowest_prefix[:, 1:] < running_min[:, :-1]
+    min_idx = np.maximum.accumulate(
+        np.where(is_new_min, np.arange(num_cols), 0), axis=1)
+
+    sums = prefix_sums[:, 1:] - running_min
+
+    # argmax returns the first maximum, as max_subarray keeps the first max found
+    rows = np.arange(num_rows)
+    end_idx = np.argmax(sums, axis=1)
+    return MaxSubarray(sums[rows, end_idx], min_idx[rows, end_idx], end_idx)
+
+
+def _subarray_rank(result):
+    # max_subarray keeps the greatest sum that ends first, started as early as possible
+    return -result.sum, result.end_idx, result.start_idx
+
+
+def _subarray_leaf(idx, val):
+    # (total, best prefix sum, its end_idx, best suffix sum, its start_idx, best)
+    return val, val, idx, val, idx, MaxSubarray(val, idx, idx)
+
+
+def _combine_subarrays(left, right):
+    """
+    Summarize two adjacent ranges: the best subarray is in the left, in the right, or is
+    the left's best suffix followed by the right's best prefix.
+    """
+    (left_total, left_prefix, left_prefix_end, left_suffix, left_suffix_start,
+     left_best) = left
+    (right_total, right_prefix, right_prefix_end, right_suffix, right_suffix_start,
+     right_best) = right
+
+    # on ties, prefer the prefix that ends first and the suffix that starts first
+    prefix, prefix_end = left_prefix, left_prefix_end
+    if left_total + right_prefix > left_prefix:
+        prefix, prefix_end = left_total + right_prefix, right_prefix_end
+
+    suffix, suffix_start = left_suffix + right_total, left_suffix_start
+    if right_suffix > left_suffix + right_total:
+        suffix, suffix_start = right_suffix, right_suffix_start
+
+    crossing = MaxSubarray(
+        left_suffix + right_prefix, left_suffix_start, right_prefix_end)
+    best = min(left_best, crossing, right_best, key=_subarray_rank)
+
+    return left_total + right_total, prefix, prefix_end, suffix, suffix_start, best
+
+
+class MaxSubarrayIndex(object):
+    """
+    Segment tree over a list of integers, for many max subarray queries on one series.
+
+    Each node stores the total, best prefix, best suffix and best subarray of its range,
+    so any range is answered from O(lg n) nodes instead of rescanning the slice.
+    query(i, j) is the same as max_subarray(int_list[i:j + 1]), with indices into
+    int_list.
+
+    Runtime: build f(n) = O(n), query and update f(n) = O(lgn)
+    """
+
+    def __init__(self, int_list):
+        """
+        :param int_list: list - at least one integer
+        """
+        if not int_list:
+            raise ValueError('cannot index an empty list')
+        self._tree = SegmentTree(
+            [_subarray_leaf(idx, val) for idx, val in enumerate(int_list)],
+            _combine_subarrays)
+
+    def __len__(self):
+        return self._tree.num_leaves
+
+    def query(self, start_idx, end_idx):
+        """
+        Find the max subarray of items start_idx to end_idx, inclusive.
+
+        :param start_idx: int
+        :param end_idx: int
+        :return: MaxSubarray
+        """
+        return self._tree.query(start_idx, end_idx)[5]
+
+    def update(self, idx, val):
+        """
+        Replace the item at {idx}.
+
+        :param idx: int
+        :param val: int
+        """
+        self._tree.update(idx, _subarray_leaf(idx, val))
+
+    def iter_windows(self, width):
+        """
+        Yield the max subarray of each window of {width} consecutive items, left to right.
+
+        :param width: int - between 1 and the number of items
+        :return: generator - MaxSubarrays
+        """
+        if not 0 < width <= len(self):
+            raise ValueError('window width must be between 1 and {}'.format(len(self)))
+
+        for start_idx in xrange(len(self) - width + 1):
+            yield self.query(start_idx, start_idx + width - 1)
+
+
 class Tests():
 
     def test_max_subarray__all_positive(self):
@@ -68,3 +270,58 @@ class Tests():
 
         result = max_subarray(int_list)
         assert result == expected_1 or result == expected_2
+
+    def test_max_subarray_batch__matches_max_subarray(self):
+        import numpy as np
+        rows = [
+            [5, 1, 5, 2, 9, 8, 1, 1, 1],
+            [-6, -2, -1, -5, -4, -9, -9, -9, -9],
+            [1, 2, -9, 3, 4, -9, 5, 6, -9],
+            [1, 2, -5, 1, 2, 0, 0, -1, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0, 0],
+        ]
+        rows += np.random.RandomState(0).randint(-9, 9, size=(50, 9)).tolist()
+        result = max_subarray_batch(np.array(rows))
+
+        for row_idx, row in enumerate(rows):
+            expected = max_subarray(row)
+            assert (result.sum[row_idx], result.start_idx[row_idx],
+                    result.end_idx[row_idx]) == expected
+
+    def test_online_max_subarray__matches_max_subarray(self):
+        import random
+        int_list = [random.randint(-10, 10) for _ in xrange(200)]
+        int_list += [-1, -2, 0, 0, -3]
+
+        results = list(iter_max_subarray(iter(int_list)))
+        for end_idx, result in enumerate(results):
+            assert result == max_subarray(int_list[:end_idx + 1])
+
+        assert OnlineMaxSubarray(iter(int_list)).max_subarray == results[-1]
+        assert OnlineMaxSubarray().max_subarray == max_subarray([])
+
+    def test_max_subarray_index__matches_max_subarray(self):
+        """Assert range queries match max_subarray of the slice, also after updates."""
+        import random
+        int_list = [random.randint(-5, 5) for _ in xrange(40)]
+        index = MaxSubarrayIndex(int_list)
+
+        for _ in xrange(3):
+            for start_idx in xrange(len(int_list)):
+                for end_idx in xrange(start_idx, len(int_list)):
+                    expected = max_subarray(int_list[start_idx:end_idx + 1])
+                    assert index.query(start_idx, end_idx) == (
+                        expected.sum, expected.start_idx + start_idx,
+                        expected.end_idx + start_idx)
+
+            idx = random.randrange(len(int_list))
+            int_list[idx] = random.randint(-5, 5)
+            index.update(idx, int_list[idx])
+
+    def test_max_subarray_index__iter_windows(self):
+        int_list = [1, 2, -9, 3, 4, -9, 5, 6, -9]
+        windows = list(MaxSubarrayIndex(int_list).iter_windows(3))
+
+        assert len(windows) == 7
+        assert windows[0] == MaxSubarray(3, 0, 1)
+        assert windows[-1] == MaxSubarray(11, 6, 7)
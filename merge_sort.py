@@ -1,10 +1,16 @@
+import unittest
+
+
+# merge_sort_bottom_up insertion sorts runs of this length before merging them
+INSERTION_SORT_RUN_LENGTH = 32
 
 
 def _merge(left_list, right_list):
     """
     Combine two pre-sorted lists of integers into one sorted list.
     """
-    merged_lists = []
+    # an empty list of the same type as the input, so instrumented inputs count its writes
+    merged_lists = left_list[:0]
 
     # avoid IndexError by appending infinity to each subarray as a sentinal
     # the loop below will never increment past this and values will always be in range
@@ -52,6 +58,118 @@ def merge_sort(int_list):
     return _merge(left_list, right_list)
 
 
+def _insertion_sort_run(items, keys, low_idx, high_idx):
+    """
+    Insertion sort items[low_idx:high_idx] in place, comparing the matching keys.
+
+    {keys} may be {items} itself, in which case each shift is harmlessly written twice.
+    """
+    for idx in xrange(low_idx + 1, high_idx):
+        item = items[idx]
+        item_key = keys[idx]
+        prev_idx = idx - 1
+
+        # shift greater items right: strict comparison keeps equal items in order
+        while prev_idx >= low_idx and keys[prev_idx] > item_key:
+            items[prev_idx + 1] = items[prev_idx]
+            keys[prev_idx + 1] = keys[prev_idx]
+            prev_idx -= 1
+
+        items[prev_idx + 1] = item
+        keys[prev_idx + 1] = item_key
+
+
+def _merge_runs(src_items, src_keys, dst_items, dst_keys, low_idx, mid_idx, high_idx):
+    """
+    Merge sorted runs src[low_idx:mid_idx] and src[mid_idx:high_idx] into dst[low_idx:].
+
+    Ties are taken from the left run, so merging is stable. {src_keys} and {dst_keys} may
+    be {src_items} and {dst_items} themselves when sorting without a key.
+    """
+    # runs already in order (e.g. nearly sorted input) are copied in one step, through a
+    # temporary slice: faster than copying item by item
+    if mid_idx >= high_idx or src_keys[mid_idx - 1] <= src_keys[mid_idx]:
+        dst_items[low_idx:high_idx] = src_items[low_idx:high_idx]
+        if dst_keys is not dst_items:
+            dst_keys[low_idx:high_idx] = src_keys[low_idx:high_idx]
+        return
+
+    left_idx = low_idx
+    right_idx = mid_idx
+    dst_idx = low_idx
+    has_keys = dst_keys is not dst_items
+
+    while left_idx < mid_idx and right_idx < high_idx:
+        if src_keys[right_idx] < src_keys[left_idx]:
+            dst_items[dst_idx] = src_items[right_idx]
+            if has_keys:
+                dst_keys[dst_idx] = src_keys[right_idx]
+            right_idx += 1
+        else:
+            dst_items[dst_idx] = src_items[left_idx]
+            if has_keys:
+                dst_keys[dst_idx] = src_keys[left_idx]
+            left_idx += 1
+        dst_idx += 1
+
+    # one run is exhausted: copy the remainder of the other
+    if left_idx < mid_idx:
+        remaining_idx, remaining_end_idx = left_idx, mid_idx
+    else:
+        remaining_idx, remaining_end_idx = right_idx, high_idx
+    dst_end_idx = dst_idx + remaining_end_idx - remaining_idx
+
+    dst_items[dst_idx:dst_end_idx] = src_items[remaining_idx:remaining_end_idx]
+    if has_keys:
+        dst_keys[dst_idx:dst_end_idx] = src_keys[remaining_idx:remaining_end_idx]
+
+
+def merge_sort_bottom_up(int_list, key=None):
+    """
+    Sort a list in place by merging sorted runs of doubling width, without recursion.
+
+    Runs of INSERTION_SORT_RUN_LENGTH are insertion sorted first. Merges alternate between
+    the list and a single auxiliary buffer (plus a buffer of keys, if {key} is given), so
+    no buffer is allocated per merge, but runs already in order and the remainder of a
+    merge are copied through a temporary slice, of up to n items. Stable, and never
+    modifies items.
+
+    Runtime: f(n) = O(nlgn)
+    """
+    num_items = len(int_list)
+    keys = int_list if key is None else [key(item) for item in int_list]
+
+    for low_idx in xrange(0, num_items, INSERTION_SORT_RUN_LENGTH):
+        high_idx = min(low_idx + INSERTION_SORT_RUN_LENGTH, num_items)
+        _insertion_sort_run(int_list, keys, low_idx, high_idx)
+
+    if num_items <= INSERTION_SORT_RUN_LENGTH:
+        return int_list
+
+    # a copy rather than a new list, so the buffer has the same type as the input
+    src_items, src_keys = int_list, keys
+    dst_items = int_list[:]
+    dst_keys = dst_items if key is None else [None] * num_items
+
+    width = INSERTION_SORT_RUN_LENGTH
+    while width < num_items:
+        for low_idx in xrange(0, num_items, 2 * width):
+            mid_idx = min(low_idx + width, num_items)
+            high_idx = min(low_idx + 2 * width, num_items)
+            _merge_runs(
+                src_items, src_keys, dst_items, dst_keys, low_idx, mid_idx, high_idx)
+
+        # the merged runs become the source of the next pass
+        src_items, dst_items = dst_items, src_items
+        src_keys, dst_keys = dst_keys, src_keys
+        width *= 2
+
+    if src_items is not int_list:
+        int_list[:] = src_items
+
+    return int_list
+
+
 class Tests(unittest.TestCase):
 
     def test_sort__six_element_list(self):
@@ -71,3 +189,23 @@ class Tests(unittest.TestCase):
         expected = [1]
 
         assert merge_sort(int_list) == expected
+
+    def test_sort_bottom_up__matches_sorted(self):
+        import random
+        for length in (0, 1, 2, 31, 32, 33, 64, 100, 1000):
+            int_list = [random.randint(-50, 50) for _ in xrange(length)]
+            expected = sorted(int_list)
+
+            assert merge_sort_bottom_up(int_list) == expected
+            assert int_list == expected  # sorted in place
+
+    def test_sort_bottom_up__does_not_add_floats(self):
+        int_list = range(100, 0, -1)
+
+        assert all(type(item) is int for item in merge_sort_bottom_up(int_list))
+
+    def test_sort_bottom_up__key_is_stable(self):
+        pairs = [(i % 7, i) for i in xrange(200, 0, -1)]
+        expected = sorted(pairs, key=lambda pair: pair[0])  # sorted is stable
+
+        assert merge_sort_bottom_up(pairs, key=lambda pair: pair[0]) == expected
@@ -0,0 +1,208 @@
+import ctypes
+import multiprocessing
+
+from merge_sort import _merge, merge_sort_bottom_up
+
+
+"""
+Parallel merge sort: sort a large list of integers across a pool of processes.
+
+The list is copied once into a shared-memory buffer of int64s. Each process sorts one
+chunk of it with merge_sort_bottom_up, then rounds of merges combine pairs of sorted runs
+into a second shared buffer, and the buffers swap roles each round. Every merge is split
+at balanced "co-ranks" into one slice per process, so all processes keep working even in
+the last round, when only one pair of runs is left. Only slice bounds are pickled: items
+never are.
+"""
+
+
+NUM_PROCESSES = multiprocessing.cpu_count()
+
+# lists shorter than this are sorted serially: the pool costs more than it saves
+DEFAULT_PARALLEL_THRESHOLD = 100000
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+# the two shared buffers, set once per process by _init_worker
+_shared_buffers = None
+
+
+def _init_worker(buffer_0, buffer_1):
+    """
+    Keep the shared buffers inherited from the parent. Run once in each child process.
+    """
+    global _shared_buffers
+    _shared_buffers = (buffer_0, buffer_1)
+
+
+def _sort_chunk(args):
+    """
+    Sort shared_buffer[low_idx:high_idx] in place.
+
+    :param args: (int, int, int) - buffer index, low_idx and high_idx
+    """
+    buffer_idx, low_idx, high_idx = args
+    shared_buffer = _shared_buffers[buffer_idx]
+    shared_buffer[low_idx:high_idx] = merge_sort_bottom_up(
+        shared_buffer[low_idx:high_idx])
+
+
+def _merge_slices(args):
+    """
+    Merge two sorted slices of the source buffer into a slice of the other buffer.
+
+    :param args: (int, (int, int), (int, int), int) - source buffer index, left and right
+        slice bounds, and the index of the first merged item in the other buffer
+    """
+    src_idx, (left_low, left_high), (right_low, right_high), dst_low = args
+    src = _shared_buffers[src_idx]
+    dst = _shared_buffers[1 - src_idx]
+
+    merged = _merge(src[left_low:left_high], src[right_low:right_high])
+    dst[dst_low:dst_low + len(merged)] = merged
+
+
+def _co_rank(shared_buffer, num_merged, left_low, left_high, right_low, right_high):
+    """
+    Return how many of the first {num_merged} items of a merge come from the left run.
+
+    Found by binary search, with ties taken from the left run first, as _merge does.
+
+    :return: int
+    """
+    low = max(0, num_merged - (right_high - right_low))
+    high = min(num_merged, left_high - left_low)
+
+    while low < high:
+        num_left = (low + high) // 2
+        num_right = num_merged - num_left
+        if shared_buffer[left_low + num_left] <= shared_buffer[right_low + num_right - 1]:
+            low = num_left + 1
+        else:
+            high = num_left
+
+    return low
+
+
+def _get_merge_tasks(src_idx, shared_buffer, runs, num_workers):
+    """
+    Split the merge of each pair of {runs} into slices, about {num_workers} in total.
+
+    :param runs: (int, int)[] - bounds of sorted runs, in order
+    :return: (list, (int, int)[]) - _merge_slices tasks, and the bounds of merged runs
+    """
+    tasks = []
+    merged_runs = []
+    num_pairs = (len(runs) + 1) // 2
+    num_splits = max(num_workers // num_pairs, 1)
+
+    for pair_idx in xrange(0, len(runs), 2):
+        left_low, left_high = runs[pair_idx]
+        right_low, right_high = runs[pair_idx + 1] if pair_idx + 1 < len(runs) else (
+            left_high, left_high)
+        merged_runs.append((left_low, right_high))
+
+        num_items = right_high - left_low
+        prev_num_left = prev_num_right = 0
+        for split_idx in xrange(1, num_splits + 1):
+            num_merged = num_items * split_idx // num_splits
+            num_left = _co_rank(
+                shared_buffer, num_merged, left_low, left_high, right_low, right_high)
+            num_right = num_merged - num_left
+
+            tasks.append((
+                src_idx,
+                (left_low + prev_num_left, left_low + num_left),
+                (right_low + prev_num_right, right_low + num_right),
+                left_low + prev_num_left + prev_num_right))
+            prev_num_left, prev_num_right = num_left, num_right
+
+    return tasks, merged_runs
+
+
+def parallel_merge_sort(int_list, num_workers=None,
+                        parallel_threshold=DEFAULT_PARALLEL_THRESHOLD):
+    """
+    Sort a list of int64s by merge sorting chunks in parallel, then merging them in
+    parallel rounds.
+
+    Falls back to merge_sort_bottom_up if {int_list} is shorter than {parallel_threshold}.
+
+    Runtime: f(n) = O(nlgn)
+
+    :param int_list: int[] - every item must fit in a signed 64 bit integer
+    :param num_workers: int|None - number of processes, if None one per CPU
+    :param parallel_threshold: int
+    :return: int[] - a new, sorted list
+    """
+    num_workers = num_workers or NUM_PROCESSES
+    num_items = len(int_list)
+    if num_items < max(parallel_threshold, 2) or num_workers < 2:
+        return merge_sort_bottom_up(list(int_list))
+
+    if min(int_list) < INT64_MIN or max(int_list) > INT64_MAX:
+        raise ValueError('every item must fit in a signed 64 bit integer')
+
+    # copy the input to shared memory once: workers only exchange slice bounds
+    shared_buffers = (
+        multiprocessing.RawArray(ctypes.c_int64, num_items),
+        multiprocessing.RawArray(ctypes.c_int64, num_items))
+    shared_buffers[0][:] = list(int_list)
+
+    pool = multiprocessing.Pool(
+        processes=num_workers, initializer=_init_worker, initargs=shared_buffers)
+    try:
+        chunk_bounds = [num_items * idx // num_workers for idx in xrange(num_workers + 1)]
+        runs = zip(chunk_bounds[:-1], chunk_bounds[1:])
+        pool.map(_sort_chunk, [(0, low_idx, high_idx) for low_idx, high_idx in runs])
+
+        src_idx = 0
+        while len(runs) > 1:
+            tasks, runs = _get_merge_tasks(
+                src_idx, shared_buffers[src_idx], runs, num_workers)
+            pool.map(_merge_slices, tasks)
+            src_idx = 1 - src_idx
+
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    return shared_buffers[src_idx][:]
+
+
+class Tests(object):
+
+    def test_parallel_merge_sort(self):
+        import random
+        int_lists = [
+            [random.randint(-100, 100) for _ in xrange(1000)],
+            [random.randint(INT64_MIN, INT64_MAX) for _ in xrange(777)],
+            [5] * 50 + [1] * 50,
+            range(300, 0, -1),
+            [2, 1],
+        ]
+        for int_list in int_lists:
+            for num_workers in (2, 3, 5):
+                result = parallel_merge_sort(
+                    int_list, num_workers=num_workers, parallel_threshold=0)
+                assert result == sorted(int_list), num_workers
+
+    def test_parallel_merge_sort__serial_fallback(self):
+        int_list = [3, 1, 2]
+        assert parallel_merge_sort(int_list, num_workers=4) == [1, 2, 3]
+        assert parallel_merge_sort([], parallel_threshold=0) == []
+        assert int_list == [3, 1, 2]
+
+    def test_get_merge_tasks__balanced(self):
+        """Assert one pair of runs is merged in {num_workers} equal slices."""
+        shared_buffer = [1, 3, 5, 7, 2, 4, 6, 8]
+        tasks, runs = _get_merge_tasks(0, shared_buffer, [(0, 4), (4, 8)], 4)
+
+        assert runs == [(0, 8)]
+        assert [task[3] for task in tasks] == [0, 2, 4, 6]
+        assert [task[1][1] - task[1][0] + task[2][1] - task[2][0] for task in tasks] == [
+            2, 2, 2, 2]
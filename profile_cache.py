@@ -0,0 +1,296 @@
+import hashlib
+import json
+import marshal
+import os
+import shutil
+import sys
+
+import profiler
+
+
+"""
+On-disk cache of ProfileResults, so unchanged algorithms are not profiled twice.
+
+Entries are stored as {cache_dir}/{module}.{function}/{fingerprint}/{key}.json, where the
+fingerprint hashes the function's code object and the source of its module. Writing an
+entry for a new fingerprint deletes the entries of every other fingerprint of the same
+function, so editing a module invalidates only that module's results. The least recently
+used entries are evicted once the cache holds more than {max_entries}.
+
+Only reproducible results are cached: those profiled with a seed, and without measures
+that depend on machine load, like time.
+"""
+
+
+DEFAULT_CACHE_DIR = '.profile_cache'
+DEFAULT_MAX_ENTRIES = 100000
+
+# measures that differ between runs on the same input, so are never cached
+UNCACHEABLE_MEASURES = ('time', 'memory')
+
+
+def is_cacheable(options):
+    """
+    Return whether results profiled with {options} are the same every run.
+
+    :param options: dict - keyword arguments to profiler._profile_input_size
+    :return: bool
+    """
+    if options.get('seed') is None:
+        return False  # random input differs every run
+    return not any(
+        measure in UNCACHEABLE_MEASURES for measure in options.get('measures', ()))
+
+
+def function_fingerprint(func):
+    """
+    Return a hash that changes whenever {func} or any code in its module changes.
+
+    Hashing the whole module catches edits to helpers, e.g. merge_sort's _merge.
+
+    :param func: function
+    :return: str
+    """
+    digest = hashlib.sha1(marshal.dumps(func.__code__))
+
+    module_path = getattr(sys.modules.get(func.__module__), '__file__', None)
+    if module_path is not None:
+        source_path = os.path.splitext(module_path)[0] + '.py'
+        if os.path.exists(source_path):
+            with open(source_path, 'rb') as source_file:
+                digest.update(source_file.read())
+
+    return digest.hexdigest()
+
+
+class ProfileCache(object):
+    """
+    Size-bounded, least-recently-used store of ProfileResults on disk.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param cache_dir: str - created if it does not exist
+        :param max_entries: int - evict least recently used entries beyond this many
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._fingerprints = {}  # functions are fingerprinted once per cache instance
+        self._num_entries = None  # counted on the first put, then kept up to date
+
+    def _function_dir(self, func):
+        module_name, function_name, _ = profiler._get_function_location(func)
+        return os.path.join(self.cache_dir, '{}.{}'.format(module_name, function_name))
+
+    def _fingerprint(self, func):
+        if func not in self._fingerprints:
+            self._fingerprints[func] = function_fingerprint(func)
+        return self._fingerprints[func]
+
+    def _entry_path(self, func, input_size, sort_order, options):
+        """
+        Return the path of the entry for {func} run with the given input and options.
+
+        :param options: dict - keyword arguments to profiler._profile_input_size
+        :return: str
+        """
+        key = json.dumps(
+            [sys.version_info[:2], input_size, sort_order, sorted(options.items())])
+        filename = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+        return os.path.join(self._function_dir(func), self._fingerprint(func), filename)
+
+    def get(self, func, input_size, sort_order, options):
+        """
+        Return the cached ProfileResult, or None if there is none or {options} are not
+        cacheable.
+
+        :param func: function
+        :param input_size: int
+        :param sort_order: str - ["random"|"ascending"|"descending"]
+        :param options: dict - keyword arguments to profiler._profile_input_size
+        :return: ProfileResult|None
+        """
+        if not is_cacheable(options):
+            return None
+
+        path = self._entry_path(func, input_size, sort_order, options)
+        try:
+            with open(path) as entry_file:
+                result = profiler.profile_result_from_dict(json.load(entry_file))
+        except (IOError, OSError, ValueError):
+            return None
+
+        # mark entry as recently used
+        os.utime(path, None)
+        return result
+
+    def put(self, func, sort_order, options, result):
+        """
+        Cache {result}, invalidating results for old versions of {func}.
+
+        Does nothing if {options} are not cacheable. Evicts least recently used entries
+        if the cache is then over {max_entries}.
+
+        :param func: function
+        :param sort_order: str - ["random"|"ascending"|"descending"]
+        :param options: dict - keyword arguments to profiler._profile_input_size
+        :param result: ProfileResult
+        """
+        if not is_cacheable(options):
+            return
+
+        path = self._entry_path(func, result.input_size, sort_order, options)
+        entry_dir = os.path.dirname(path)
+
+        if not os.path.isdir(entry_dir):
+            self._invalidate(func)
+            self._num_entries = None  # recount, rather than count what was deleted
+            try:
+                os.makedirs(entry_dir)
+            except OSError:
+                if not os.path.isdir(entry_dir):  # another process may have made it
+                    raise
+
+        # write then rename, so concurrent readers never see a partial entry
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'w') as entry_file:
+            json.dump(profiler.profile_result_to_dict(result), entry_file)
+        is_new_entry = not os.path.exists(path)
+        os.rename(temp_path, path)
+
+        if self._num_entries is None:
+            self._num_entries = sum(1 for _ in self._entry_paths())
+        elif is_new_entry:
+            self._num_entries += 1
+        if self._num_entries > self.max_entries:
+            self.evict()
+
+    def _invalidate(self, func):
+        """
+        Delete cached results of every version of {func} other than the current one.
+        """
+        function_dir = self._function_dir(func)
+        if not os.path.isdir(function_dir):
+            return
+
+        current = self._fingerprint(func)
+        for fingerprint in os.listdir(function_dir):
+            if fingerprint != current:
+                shutil.rmtree(os.path.join(function_dir, fingerprint), ignore_errors=True)
+
+    def _entry_paths(self):
+        for dir_path, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith('.json'):
+                    yield os.path.join(dir_path, filename)
+
+    def evict(self):
+        """
+        Delete least recently used entries until at most {max_entries} remain.
+
+        :return: int - number of entries deleted
+        """
+        entries = []
+        for path in self._entry_paths():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue  # deleted by another process
+
+        num_evicted = max(len(entries) - self.max_entries, 0)
+        for _, path in sorted(entries)[:num_evicted]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        self._num_entries = len(entries) - num_evicted
+        return num_evicted
+
+    def clear(self):
+        """
+        Delete every cached result.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._num_entries = 0
+
+
+class Tests(object):
+
+    def _cache(self, max_entries=DEFAULT_MAX_ENTRIES):
+        import tempfile
+        return ProfileCache(tempfile.mkdtemp(), max_entries)
+
+    def test_get__roundtrip(self):
+        cache = self._cache()
+        func = profiler._get_function_from_module('insertion_sort')
+        result = profiler.ProfileResult(10, 123)
+
+        assert cache.get(func, 10, 'random', {'seed': 1}) is None
+        cache.put(func, 'random', {'seed': 1}, result)
+
+        assert cache.get(func, 10, 'random', {'seed': 1}) == result
+        assert cache.get(func, 10, 'random', {'seed': 2}) is None
+        assert cache.get(func, 10, 'ascending', {'seed': 1}) is None
+        cache.clear()
+
+    def test_put__skips_unreproducible_results(self):
+        """Assert results without a seed, or timed, are neither stored nor returned."""
+        cache = self._cache()
+        func = profiler._get_function_from_module('insertion_sort')
+        timed = {'seed': 1, 'measures': ('time',)}
+        for options in ({}, {'seed': None}, timed):
+            cache.put(func, 'random', options, profiler.ProfileResult(10, 123))
+            assert cache.get(func, 10, 'random', options) is None
+
+        assert list(cache._entry_paths()) == []
+        cache.clear()
+
+    def test_put__invalidates_changed_function(self):
+        cache = self._cache()
+        func = profiler._get_function_from_module('insertion_sort')
+        cache.put(func, 'random', {'seed': 1}, profiler.ProfileResult(10, 123))
+
+        # simulate an edit to the source
+        cache._fingerprints[func] = 'edited'
+        assert cache.get(func, 10, 'random', {'seed': 1}) is None
+        cache.put(func, 'random', {'seed': 1}, profiler.ProfileResult(20, 456))
+
+        assert os.listdir(cache._function_dir(func)) == ['edited']
+        cache.clear()
+
+    def test_put__evicts_least_recently_used(self):
+        cache = self._cache(max_entries=2)
+        func = profiler._get_function_from_module('insertion_sort')
+        for input_size in (1, 2, 3):
+            cache.put(
+                func, 'random', {'seed': 1},
+                profiler.ProfileResult(input_size, input_size))
+            path = cache._entry_path(func, input_size, 'random', {'seed': 1})
+            os.utime(path, (input_size, input_size))
+
+        assert len(list(cache._entry_paths())) == 2
+        assert cache.get(func, 1, 'random', {'seed': 1}) is None
+        assert cache.get(func, 3, 'random', {'seed': 1}) == profiler.ProfileResult(3, 3)
+
+        # rewriting an entry does not count it twice
+        cache.put(func, 'random', {'seed': 1}, profiler.ProfileResult(3, 3))
+        assert cache.get(func, 2, 'random', {'seed': 1}) == profiler.ProfileResult(2, 2)
+        cache.clear()
+
+    def test_profile__uses_cache(self):
+        """Assert profile() only runs input sizes missing from the cache."""
+        cache = self._cache()
+        func = profiler._get_function_from_module('insertion_sort')
+        results = profiler.profile(
+            func, 3, 10, 'descending', 'serial', seed=1, cache=cache)
+
+        fake_result = profiler.ProfileResult(20, -1)
+        options = profiler._get_profile_options(seed=1)
+        cache.put(func, 'descending', options, fake_result)
+        new_results = profiler.profile(
+            func, 4, 10, 'descending', 'serial', seed=1, cache=cache)
+
+        assert new_results[:3] == [results[0], fake_result, results[2]]
+        assert new_results[3].num_executed_statements > results[2].num_executed_statements
+        cache.clear()
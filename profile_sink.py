@@ -0,0 +1,267 @@
+import csv
+import json
+import os
+
+import profiler
+
+
+"""
+Append-only files of ProfileResults, written as each result completes.
+
+A sink can be watched (e.g. with tail -f) while a long sweep runs, and read back to resume
+an interrupted sweep. Each result is labelled with a case, e.g. its sort order. A line
+left partially written by an interrupted sweep is cut before the next result is appended.
+"""
+
+
+# bytes read at a time when searching back for the end of the last complete line
+_TAIL_BLOCK_SIZE = 4096
+
+
+def _truncate_partial_line(path):
+    """
+    Cut the last line of {path} if it does not end in a newline, e.g. after an interrupt.
+
+    Otherwise the next result would be appended to the partial line and lost with it.
+
+    :param path: str
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, 'rb+') as sink_file:
+        sink_file.seek(0, os.SEEK_END)
+        end_offset = sink_file.tell()
+        if end_offset == 0:
+            return
+        sink_file.seek(end_offset - 1)
+        if sink_file.read(1) == b'\n':
+            return
+
+        # search back a block at a time, for lines longer than one block
+        block_end = end_offset
+        while block_end > 0:
+            block_start = max(block_end - _TAIL_BLOCK_SIZE, 0)
+            sink_file.seek(block_start)
+            newline_idx = sink_file.read(block_end - block_start).rfind(b'\n')
+            if newline_idx != -1:
+                sink_file.truncate(block_start + newline_idx + 1)
+                return
+            block_end = block_start
+        sink_file.truncate(0)
+
+
+class JsonLinesSink(object):
+    """
+    Write one json object per line, flushed after every result.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, result, case=None):
+        """
+        Append {result} to the file.
+
+        :param result: ProfileResult
+        :param case: str|None - label, e.g. the sort order
+        """
+        row = profiler.profile_result_to_dict(result)
+        row[profiler.CASE_NAME] = case
+        _truncate_partial_line(self.path)
+        with open(self.path, 'a') as sink_file:
+            sink_file.write(json.dumps(row, sort_keys=True) + '\n')
+
+    def read(self, case=None):
+        """
+        Yield results labelled {case}, skipping a partially written last line.
+
+        :param case: str|None - if None, yield every result
+        :return: generator - ProfileResults
+        """
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as sink_file:
+            for line in sink_file:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # interrupted mid-write
+                if case is None or row.get(profiler.CASE_NAME) == case:
+                    yield profiler.profile_result_from_dict(row)
+
+
+class CsvSink(object):
+    """
+    Write one csv row per result, with a header of every ProfileResult field.
+    """
+
+    FIELDS = profiler.ProfileResult._fields + (profiler.CASE_NAME,)
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, result, case=None):
+        """
+        Append {result} to the file, writing the header first if the file is new or only
+        held a partial header.
+
+        :param result: ProfileResult
+        :param case: str|None - label, e.g. the sort order
+        """
+        _truncate_partial_line(self.path)
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        row = profiler.profile_result_to_dict(result)
+        row[profiler.CASE_NAME] = case
+
+        # dict fields, e.g. line counts, are written as json objects
+        for field, value in row.items():
+            if isinstance(value, dict):
+                row[field] = json.dumps(value, sort_keys=True)
+
+        with open(self.path, 'a') as sink_file:
+            writer = csv.DictWriter(sink_file, self.FIELDS)
+            if is_new:
+                writer.writeheader()
+            writer.writerow(row)
+
+    def read(self, case=None):
+        """
+        Yield results labelled {case}, skipping a partially written last row.
+
+        :param case: str|None - if None, yield every result
+        :return: generator - ProfileResults
+        """
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as sink_file:
+            for row in csv.DictReader(sink_file):
+                if case is not None and row.get(profiler.CASE_NAME) != case:
+                    continue
+                try:
+                    values = dict(
+                        (field, _parse_number(row[field]))
+                        for field in profiler.ProfileResult._fields)
+                except (KeyError, TypeError, ValueError):
+                    continue  # interrupted mid-write
+                yield profiler.ProfileResult(**values)
+
+
+def _parse_number(value):
+    """
+    Parse a csv cell written from a ProfileResult field: empty cells are None.
+
+    :param value: str
+    :return: int|float|dict|None
+    """
+    if value == '':
+        return None
+    if value.startswith('{'):
+        return json.loads(value)
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def open_sink(path):
+    """
+    Return a CsvSink if {path} ends in ".csv", else a JsonLinesSink.
+
+    :param path: str
+    :return: CsvSink|JsonLinesSink
+    """
+    if path.endswith('.csv'):
+        return CsvSink(path)
+    return JsonLinesSink(path)
+
+
+class Tests(object):
+
+    def _path(self, extension):
+        import tempfile
+        file_descriptor, path = tempfile.mkstemp(extension)
+        os.close(file_descriptor)
+        return path
+
+    def test_sinks__roundtrip(self):
+        results = [
+            profiler.ProfileResult(1, 10),
+            profiler.ProfileResult(2, None, wall_time_min=5, wall_time_median=5.5),
+            profiler.ProfileResult(4, 3, line_counts={'a.py:1': 1, 'a.py:2': 2}),
+        ]
+        for extension in ('.jsonl', '.csv'):
+            sink = open_sink(self._path(extension))
+            for result in results:
+                sink.write(result, 'random')
+            sink.write(profiler.ProfileResult(3, 30), 'ascending')
+
+            assert list(sink.read('random')) == results
+            assert len(list(sink.read())) == 4
+            os.remove(sink.path)
+
+    def test_json_lines_sink__skips_partial_line(self):
+        sink = JsonLinesSink(self._path('.jsonl'))
+        sink.write(profiler.ProfileResult(1, 10))
+        with open(sink.path, 'a') as sink_file:
+            sink_file.write('{"input_size": 2, "num_exec')
+
+        assert list(sink.read()) == [profiler.ProfileResult(1, 10)]
+        os.remove(sink.path)
+
+    def test_sinks__write_after_partial_line(self):
+        """Assert a result written after an interrupted one is kept, and not misread."""
+        partial_lines = {
+            '.jsonl': '{"input_size": 2, "num_exec',
+            '.csv': '2,23,3',
+        }
+        for extension, partial_line in partial_lines.items():
+            sink = open_sink(self._path(extension))
+            sink.write(profiler.ProfileResult(1, 10))
+            with open(sink.path, 'a') as sink_file:
+                sink_file.write(partial_line)
+            sink.write(profiler.ProfileResult(3, 30))
+
+            assert list(sink.read()) == [
+                profiler.ProfileResult(1, 10), profiler.ProfileResult(3, 30)], extension
+            os.remove(sink.path)
+
+    def test_csv_sink__partial_header(self):
+        sink = CsvSink(self._path('.csv'))
+        with open(sink.path, 'w') as sink_file:
+            sink_file.write('input_size,num_exec')
+        sink.write(profiler.ProfileResult(1, 10))
+
+        assert list(sink.read()) == [profiler.ProfileResult(1, 10)]
+        os.remove(sink.path)
+
+    def test_iter_profile__resume(self):
+        """Assert a resumed sweep yields saved results and only profiles the rest."""
+        sink = JsonLinesSink(self._path('.jsonl'))
+        func = profiler._get_function_from_module('insertion_sort')
+        saved_result = profiler.ProfileResult(20, -1)
+        sink.write(saved_result, 'random')
+
+        results = list(profiler.iter_profile(
+            func, 3, 10, 'random', 'serial', sink=sink, resume=True))
+
+        assert results[0] == saved_result
+        assert sorted(result.input_size for result in results) == [10, 20, 30]
+        assert sorted(sink.read('random')) == sorted(results)
+        os.remove(sink.path)
+
+    def test_iter_profile__resume_ignores_unrequested_sizes(self):
+        """Assert saved results for sizes outside the sweep are not yielded."""
+        sink = JsonLinesSink(self._path('.jsonl'))
+        func = profiler._get_function_from_module('insertion_sort')
+        sink.write(profiler.ProfileResult(20, -1), 'random')
+        sink.write(profiler.ProfileResult(25, -1), 'random')
+
+        results = list(profiler.iter_profile(
+            func, 0, 0, 'random', 'serial', input_sizes=[10, 20], sink=sink, resume=True))
+
+        assert sorted(result.input_size for result in results) == [10, 20]
+        assert profiler.ProfileResult(20, -1) in results
+        os.remove(sink.path)
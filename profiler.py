@@ -1,31 +1,141 @@
 import argparse
+import collections
 from collections import namedtuple
+import functools
+import gc
 import imp
+import itertools
+import marshal
+import multiprocessing
 import Queue
 import random
+import subprocess
+import sys
 import threading
-import trace
+import time
+import timeit
 import os
 
+import input_provider
+import instrumentation
+
+try:
+    import resource
+except ImportError:
+    resource = None  # windows
+
 
 """
 Algorithm profiler: measure how runtime complexity varies with size of input.
 
 CAUTION: counts lines of executed code, NOT actual number of computations.
 Comprehensions and builtin functions will count as a single statement.
+Measure "time" to get wall clock and CPU time of untraced runs instead, or "memory" to
+get how much a run grows peak resident memory, measured in a fresh interpreter. Python 2
+has no way to count the allocations of a run, so no allocation count is reported.
 """
 
 
 NUM_THREADS = 20
+NUM_PROCESSES = multiprocessing.cpu_count()
 DEFAULT_NUM_RUNS = 100
 DEFAULT_STEP_SIZE = 1  # increase input length by this amount each run
 
+# "serial" runs in the calling thread, "thread" shares the GIL with {NUM_THREADS} threads
+# and "process" fans input sizes out across {NUM_PROCESSES} processes
+EXECUTORS = ('serial', 'thread', 'process')
+DEFAULT_EXECUTOR = 'thread'
+
+# measures that cannot share the process with threads: threads tracing other input sizes
+# would share the GIL with timed runs, and memory is measured for the whole process
+THREAD_UNSAFE_MEASURES = ('time', 'memory')
+
+# "statements" traces a single run, "lines" also keeps the count of each line, "time"
+# times repeated untraced runs, "memory" measures the peak memory of a single run and
+# "operations" counts the comparisons, reads, writes and swaps of a single untraced run
+# on an instrumented input
+MEASURES = ('statements', 'lines', 'time', 'memory', 'operations')
+DEFAULT_MEASURES = ('statements',)
+DEFAULT_NUM_REPEATS = 5
+DEFAULT_NUM_WARMUPS = 1
+
+# "linear" input sizes increase by {step}, "geometric" by a constant factor
+SWEEPS = ('linear', 'geometric')
+DEFAULT_SWEEP = 'linear'
+DEFAULT_GROWTH_FACTOR = 2  # profile_until multiplies input size by this each run
+
 # labels used in metrics and charts
 INPUT_MEASURE_NAME = 'input_size'
 COMPLEXITY_MEASURE_NAME = 'num_executed_statements'
+WALL_TIME_MEASURE_NAME = 'wall_time_median'
+CPU_TIME_MEASURE_NAME = 'cpu_time_median'
+MEMORY_MEASURE_NAME = 'peak_memory_bytes'
+COMPARISONS_MEASURE_NAME = 'num_comparisons'
+LINES_MEASURE_NAME = 'line_counts'
 CASE_NAME = 'case'
 
-ProfileResult = namedtuple('ProfileResult', [INPUT_MEASURE_NAME, COMPLEXITY_MEASURE_NAME])
+# ru_maxrss is in bytes on macOS, and in kilobytes elsewhere
+MAXRSS_UNIT_BYTES = 1 if sys.platform == 'darwin' else 1024
+
+# column plotted for each measure
+MEASURE_COLUMNS = {
+    'statements': COMPLEXITY_MEASURE_NAME,
+    'lines': COMPLEXITY_MEASURE_NAME,
+    'time': WALL_TIME_MEASURE_NAME,
+    'memory': MEMORY_MEASURE_NAME,
+    'operations': COMPARISONS_MEASURE_NAME,
+}
+
+# times are in nanoseconds, peak memory is the growth of peak resident memory in bytes
+# (allocations are not counted: python 2 cannot), line counts are keyed by line_key,
+# fields of measures that were not taken are None
+ProfileResult = namedtuple('ProfileResult', [
+    INPUT_MEASURE_NAME,
+    COMPLEXITY_MEASURE_NAME,
+    'wall_time_min',
+    WALL_TIME_MEASURE_NAME,
+    'wall_time_iqr',
+    'cpu_time_min',
+    CPU_TIME_MEASURE_NAME,
+    'cpu_time_iqr',
+    MEMORY_MEASURE_NAME,
+    COMPARISONS_MEASURE_NAME,
+    'num_reads',
+    'num_writes',
+    'num_swaps',
+    LINES_MEASURE_NAME,
+])
+ProfileResult.__new__.__defaults__ = (None,) * (len(ProfileResult._fields) - 1)
+
+TimingSummary = namedtuple('TimingSummary', ('min', 'median', 'iqr'))
+
+
+def profile_result_to_dict(result):
+    """
+    :param result: ProfileResult
+    :return: dict - json serializable
+    """
+    return dict(result._asdict())
+
+
+def profile_result_from_dict(result_dict):
+    """
+    Inverse of profile_result_to_dict. Ignores unknown fields, missing fields are None.
+
+    :param result_dict: dict
+    :return: ProfileResult
+    """
+    return ProfileResult(**dict(
+        (field, value) for field, value in result_dict.items()
+        if field in ProfileResult._fields))
+
+
+def _wall_clock_ns():
+    return int(timeit.default_timer() * 1e9)
+
+
+def _cpu_clock_ns():
+    return int(time.clock() * 1e9)  # CPU time on unix
 
 
 def _get_function_from_module(module_name, function_name=None, dir_path=None):
@@ -54,63 +164,164 @@ def _get_function_from_module(module_name, function_name=None, dir_path=None):
     return getattr(module, function_name)
 
 
+def _get_function_location(func):
+    """
+    Return the (module_name, function_name, dir_path) needed to re-import {func}.
+
+    Inverse of _get_function_from_module: used to re-import {func} in child processes,
+    since functions loaded with imp are not reliably picklable.
+
+    :param func: function - must be defined at the top level of a module
+    :return: (str, str, str)
+    """
+    module = sys.modules.get(func.__module__)
+    module_path = getattr(module, '__file__', None)
+    if module_path is None or getattr(module, func.__name__, None) is None:
+        raise ValueError(
+            'cannot re-import {}: not a top level function of a module file'.format(func))
+
+    module_name = os.path.splitext(os.path.basename(module_path))[0]
+    dir_path = os.path.dirname(os.path.realpath(module_path))
+
+    return module_name, func.__name__, dir_path
+
+
+class StatementCounter(object):
+    """
+    Count executed lines of a function and everything it calls.
+
+    Counts the same events as trace.Trace(count=True) but by default keeps a single
+    integer rather than a dict keyed by (filename, lineno), so the per-event cost is one
+    C call. Like trace.Trace, only the calling thread is traced.
+    """
+
+    def __init__(self, per_line=False):
+        """
+        :param per_line: bool - if True, also count lines per (filename, lineno) in
+            line_counts, at about 1.5 times the cost per line
+        """
+        self.count = 0
+        self.line_counts = collections.defaultdict(int) if per_line else None
+
+    def runfunc(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs) and add the number of executed statements to count.
+
+        :return: return value of {func}
+        """
+        # tracers run on every event: keep them as lean as possible
+        counter = itertools.count()
+        increment = functools.partial(next, counter)
+        line_counts = self.line_counts
+
+        def local_trace(frame, event, arg):
+            if event == 'line':
+                increment()
+            return local_trace
+
+        def local_trace_per_line(frame, event, arg):
+            if event == 'line':
+                line_counts[(frame.f_code.co_filename, frame.f_lineno)] += 1
+            return local_trace_per_line
+
+        if line_counts is not None:
+            local_trace = local_trace_per_line
+
+        def global_trace(frame, event, arg):
+            # called once per new frame: the returned function receives its line events
+            return local_trace
+
+        previous_trace = sys.gettrace()
+        sys.settrace(global_trace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.settrace(previous_trace)
+            if line_counts is None:
+                self.count += next(counter)
+            else:
+                self.count = sum(line_counts.itervalues())
+
+
 def trace_function(func, *args, **kwargs):
     """
-    :return: trace.CoverageResults
+    Call func(*args, **kwargs) under a line-counting StatementCounter.
+
+    :return: StatementCounter
+    """
+    counter = StatementCounter()
+    counter.runfunc(func, *args, **kwargs)
+
+    return counter
+
+
+def line_key(filename, lineno):
+    """
+    Return the key of a line in ProfileResult.line_counts: a string, so json can store it.
+
+    :param filename: str
+    :param lineno: int
+    :return: str - e.g. "insertion_sort.py:21"
     """
-    tracer = trace.Trace(trace=False)
-    tracer.runfunc(func, *args, **kwargs)
-    trace_result = tracer.results()
+    return '{}:{}'.format(filename, lineno)
+
 
-    return trace_result
+def parse_line_key(key):
+    """
+    Inverse of line_key.
+
+    :param key: str
+    :return: (str, int) - filename and lineno
+    """
+    filename, _, lineno = key.rpartition(':')
+    return filename, int(lineno)
 
 
 def num_executed_statements(trace_result):
     """
-    Given an instance of trace.CoverageResults, return the sum of executed statements.
+    Given the StatementCounter returned by trace_function, return executed statements.
 
-    :param trace_result: trace.CoverageResults
+    :param trace_result: StatementCounter
     :return: int
     """
-    return sum(x for x in trace_result.counts.values())
+    return trace_result.count
 
 
-def get_int_list(length, sort_order='random'):
+def get_int_list(length, sort_order='random', seed=None):
     """
     Return a list of all integers, 0-{length - 1}, ordered randomly.
 
+    Lists are generated from base buffers shared by every length with the same seed: see
+    input_provider.
+
     :param length: int
-    :param sort_order: str - ["random"|"ascending"|"descending"]
+    :param sort_order: str - one of input_provider.INPUT_ORDERS, e.g. "random",
+        "ascending" or "descending"
+    :param seed: int|None - if None, a new random list on every call
     :return: int[]
     """
-    assert sort_order in ('random', 'ascending', 'descending')
-
-    int_list = range(length)
-    if sort_order == 'random':
-        random.shuffle(int_list)
-    elif sort_order == 'descending':
-        int_list.reverse()
-
-    return int_list
+    assert sort_order in input_provider.INPUT_ORDERS
+    return input_provider.get_input_provider(seed, 'list').get(length, sort_order)
 
 
 def profile_results_to_dataframe(**kwargs):
     """
     Convert profile results to dataframe for plotting.
 
+    Results are collected in a columnar ResultStore, then converted once, rather than
+    appending a frame per case. Per-line counts are not kept.
+
     :param profile_results: ProfileResult[]
     :return: pandas.DataFrame
     """
-    # pandas is a big slow mess: only import it if necessary
-    import pandas as pd
+    # result_store imports this module: import it here to avoid a circular import
+    import result_store
 
-    merged_dataframe = pd.DataFrame()
+    store = result_store.ResultStore()
     for profile_type, profile_results in kwargs.iteritems():
-        df = pd.DataFrame(profile_results)
-        df[CASE_NAME] = profile_type
-        merged_dataframe = merged_dataframe.append(df)
+        store.extend(profile_results, profile_type)
 
-    return merged_dataframe
+    return store.to_dataframe()
 
 
 def plot(result_dataframe, title=None, save_path=None, **kwargs):
@@ -137,73 +348,659 @@ def plot(result_dataframe, title=None, save_path=None, **kwargs):
     return plot
 
 
-def _profile_worker(func, input_size_queue, result_queue, sort_order):
+def _percentile(sorted_values, fraction):
+    """
+    Return the value {fraction} of the way through {sorted_values}, interpolated.
+
+    :param sorted_values: int[]|float[] - must be sorted and non-empty
+    :param fraction: float - between 0 and 1
+    :return: float
+    """
+    position = (len(sorted_values) - 1) * fraction
+    low_idx = int(position)
+    high_idx = min(low_idx + 1, len(sorted_values) - 1)
+    weight = position - low_idx
+    return sorted_values[low_idx] * (1 - weight) + sorted_values[high_idx] * weight
+
+
+def summarize_timings(timings):
+    """
+    Reduce repeated timings of the same call to their min, median and interquartile range.
+
+    :param timings: int[]
+    :return: TimingSummary
+    """
+    timings = sorted(timings)
+    return TimingSummary(
+        min=timings[0],
+        median=_percentile(timings, 0.5),
+        iqr=_percentile(timings, 0.75) - _percentile(timings, 0.25))
+
+
+def time_function(func, func_args, num_repeats=DEFAULT_NUM_REPEATS,
+                  num_warmups=DEFAULT_NUM_WARMUPS):
+    """
+    Time {num_repeats} untraced calls to {func}, each with a fresh copy of {func_args}.
+
+    Like timeit, disables garbage collection while timing. Copying the input is not timed.
+
+    :param func: function - must accept an integer list as only argument
+    :param func_args: int[]
+    :param num_repeats: int - timed calls
+    :param num_warmups: int - untimed calls made first, to warm caches
+    :return: (TimingSummary, TimingSummary) - wall clock and CPU time, in nanoseconds
+    """
+    if sys.gettrace() is not None:
+        raise RuntimeError('cannot time a function while a tracer is installed')
+
+    for _ in xrange(num_warmups):
+        func(list(func_args))
+
+    wall_times = []
+    cpu_times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in xrange(num_repeats):
+            func_input = list(func_args)
+            wall_start = _wall_clock_ns()
+            cpu_start = _cpu_clock_ns()
+            func(func_input)
+            cpu_times.append(_cpu_clock_ns() - cpu_start)
+            wall_times.append(_wall_clock_ns() - wall_start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return summarize_timings(wall_times), summarize_timings(cpu_times)
+
+
+# run by measure_memory in a fresh interpreter, with this directory and the location of
+# the function to measure as arguments
+_PEAK_RSS_CHILD_SCRIPT = (
+    'import sys; sys.path.insert(0, sys.argv[1]); import profiler; '
+    'profiler._peak_rss_child(*sys.argv[2:])')
+
+
+def measure_memory(func, func_args):
+    """
+    Measure how much a single call to {func} grows peak resident memory, in a new process.
+
+    The call runs in a fresh interpreter, so no memory freed by earlier runs is reused
+    without growing resident memory, and the input is passed in rather than regenerated.
+    Resident memory still grows a page at a time, and allocations smaller than the
+    interpreter's own free memory may measure as 0, so compare large input sizes.
+
+    :param func: function - must be defined at the top level of a module
+    :param func_args: int[]
+    :return: int - bytes
+    """
+    if resource is None:
+        raise RuntimeError('measuring peak resident memory requires the resource module')
+
+    this_dir = os.path.dirname(os.path.realpath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, '-c', _PEAK_RSS_CHILD_SCRIPT, this_dir]
+        + list(_get_function_location(func)),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    output, _ = process.communicate(marshal.dumps(list(func_args)))
+    if process.returncode != 0:
+        raise RuntimeError('{} failed while measuring memory'.format(func.__name__))
+    return int(output)
+
+
+def _get_peak_rss():
+    """
+    Return the peak resident memory of this process, in bytes.
+
+    On linux, reads the high water mark of the process's current program from /proc,
+    since ru_maxrss also counts the peak of the program that started it.
+
+    :return: int
+    """
+    try:
+        with open('/proc/self/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT_BYTES
+
+
+def _peak_rss_child(module_name, function_name, dir_path):
+    """
+    Call a function with the input on stdin, and write its peak resident memory growth.
+
+    Run by measure_memory in a child process.
+
+    :param module_name: str
+    :param function_name: str
+    :param dir_path: str
+    """
+    func = _get_function_from_module(module_name, function_name, dir_path)
+    func_input = marshal.load(sys.stdin)  # read from the pipe, without a copy in memory
+
+    start_bytes = _get_peak_rss()
+    func(func_input)
+    sys.stdout.write(str(_get_peak_rss() - start_bytes))
+
+
+def _seed_input_size(seed, input_size):
+    """
+    Seed the random module so each input size gets its own reproducible random sequence.
+
+    :param seed: int
+    :param input_size: int
+    """
+    random.seed('{}:{}'.format(seed, input_size))
+
+
+def _profile_input_size(
+        func, input_size, sort_order, measures=DEFAULT_MEASURES,
+        num_repeats=DEFAULT_NUM_REPEATS, num_warmups=DEFAULT_NUM_WARMUPS, seed=None):
+    """
+    Call {func} with an input of length {input_size} and take each of {measures}.
+
+    Every measurement is taken on a fresh list copied from the same input, which is kept
+    in a compact array shared with other input sizes. If {seed} is given, the input and
+    any random numbers drawn by {func} itself are reproducible.
+
+    :param func: function
+    :param input_size: int
+    :param sort_order: str - ["random"|"ascending"|"descending"]
+    :param measures: str[] - any of MEASURES
+    :param num_repeats: int - timed runs per input size
+    :param num_warmups: int - untimed runs per input size, before timed runs
+    :param seed: int|None - seed for the random module
+    :return: ProfileResult
+    """
+    if seed is not None:
+        _seed_input_size(seed, input_size)
+
+    func_args = input_provider.get_input_provider(seed).get(input_size, sort_order)
+    measurements = {}
+
+    if 'statements' in measures or 'lines' in measures:
+        counter = StatementCounter(per_line='lines' in measures)
+        counter.runfunc(func, list(func_args))
+        measurements[COMPLEXITY_MEASURE_NAME] = counter.count
+        if counter.line_counts is not None:
+            measurements[LINES_MEASURE_NAME] = dict(
+                (line_key(filename, lineno), count)
+                for (filename, lineno), count in counter.line_counts.iteritems())
+
+    if 'time' in measures:
+        wall_time, cpu_time = time_function(func, func_args, num_repeats, num_warmups)
+        measurements.update({
+            'wall_time_min': wall_time.min,
+            WALL_TIME_MEASURE_NAME: wall_time.median,
+            'wall_time_iqr': wall_time.iqr,
+            'cpu_time_min': cpu_time.min,
+            CPU_TIME_MEASURE_NAME: cpu_time.median,
+            'cpu_time_iqr': cpu_time.iqr,
+        })
+
+    if 'memory' in measures:
+        measurements[MEMORY_MEASURE_NAME] = measure_memory(func, func_args)
+
+    if 'operations' in measures:
+        counts = instrumentation.count_operations(func, func_args)
+        measurements.update({
+            COMPARISONS_MEASURE_NAME: counts.comparisons,
+            'num_reads': counts.reads,
+            'num_writes': counts.writes,
+            'num_swaps': counts.swaps,
+        })
+
+    return ProfileResult(input_size, **measurements)
+
+
+def _get_profile_options(
+        measures=DEFAULT_MEASURES, num_repeats=DEFAULT_NUM_REPEATS,
+        num_warmups=DEFAULT_NUM_WARMUPS, seed=None):
+    """
+    Return the keyword arguments to _profile_input_size, with defaults filled in.
+
+    :return: dict
+    """
+    return {
+        'measures': tuple(measures),
+        'num_repeats': num_repeats,
+        'num_warmups': num_warmups,
+        'seed': seed,
+    }
+
+
+def _profile_worker(func, input_sizes, input_size_lock, result_queue, stop_event,
+                    sort_order, options):
     """
     Profile a function and put ProfileResults to result_queue. Run from a child thread.
 
-    Continues to call function for different input sizes until input_size_queue is empty.
+    Continues to call function for different input sizes until input_sizes is exhausted
+    or stop_event is set, then puts None to result_queue.
 
-    :param input_size_queue: Queue.Queue - queue of integers of input size
-    :param result_queue: Queue.Queue - empty queue to put ProfileResults to
+    :param input_sizes: iterator - of integers of input size, shared between threads
+    :param input_size_lock: threading.Lock - held while taking from input_sizes
+    :param result_queue: Queue.Queue - queue to put ProfileResults to
+    :param stop_event: threading.Event - set to stop before input_sizes is exhausted
     :param sort_order: str - ["random"|"ascending"|"descending"]
+    :param options: dict - keyword arguments to _profile_input_size
     """
-    while True:
-        try:
-            input_size = input_size_queue.get(block=False)
-            func_args = get_int_list(input_size, sort_order)
-            trace_result = trace_function(func, func_args)
-            num_executed = num_executed_statements(trace_result)
-            profile_result = ProfileResult(input_size, num_executed)
+    try:
+        while not stop_event.is_set():
+            with input_size_lock:
+                input_size = next(input_sizes, None)
+            if input_size is None:
+                break
+            profile_result = _profile_input_size(func, input_size, sort_order, **options)
             result_queue.put(profile_result)
-        except Queue.Empty:
-            break
+    finally:
+        result_queue.put(None)
+
 
+# function to profile in a child process, set once per process by _init_process_worker
+_process_worker_func = None
 
-def profile(func, num_runs, step, sort_order):
+
+def _init_process_worker(module_name, function_name, dir_path):
+    """
+    Re-import the function to profile by name. Run once in each child process.
+
+    :param module_name: str
+    :param function_name: str
+    :param dir_path: str
+    """
+    global _process_worker_func
+    _process_worker_func = _get_function_from_module(module_name, function_name, dir_path)
+
+
+def _process_profile_worker(args):
+    """
+    Profile the function imported by _init_process_worker. Run from a child process.
+
+    :param args: (int, str, dict) - input size, sort order and _profile_input_size options
+    :return: ProfileResult
+    """
+    input_size, sort_order, options = args
+    return _profile_input_size(_process_worker_func, input_size, sort_order, **options)
+
+
+def _iter_profile_serial(func, input_sizes, sort_order, options):
+    """
+    Profile {func} for each of {input_sizes} in the calling thread.
+
+    :return: generator - ProfileResults
+    """
+    for input_size in input_sizes:
+        yield _profile_input_size(func, input_size, sort_order, **options)
+
+
+def _iter_profile_threads(func, input_sizes, sort_order, options, num_workers):
+    """
+    Profile {func} for each of {input_sizes} from {num_workers} child threads.
+
+    :return: generator - ProfileResults, in order of completion
+    """
+    input_size_lock = threading.Lock()
+    result_queue = Queue.Queue()
+    stop_event = threading.Event()
+    input_sizes = iter(input_sizes)
+
+    # start {num_workers} profile workers
+    for _ in xrange(num_workers):
+        thread = threading.Thread(
+            target=_profile_worker,
+            args=[func, input_sizes, input_size_lock, result_queue, stop_event,
+                  sort_order, options])
+        thread.daemon = True
+        thread.start()
+
+    # pull ProfileResults from result_queue until every worker has put None
+    num_running = num_workers
+    try:
+        while num_running:
+            result = result_queue.get()
+            if result is None:
+                num_running -= 1
+            else:
+                yield result
+    finally:
+        # stop workers early if the consumer stops iterating
+        stop_event.set()
+
+
+def _iter_profile_processes(func, input_sizes, sort_order, options, num_workers):
+    """
+    Profile {func} for each of {input_sizes} from a pool of {num_workers} processes.
+
+    Each process re-imports {func} by module and function name on startup.
+
+    :return: generator - ProfileResults, in order of completion
+    """
+    pool = multiprocessing.Pool(
+        processes=num_workers,
+        initializer=_init_process_worker,
+        initargs=_get_function_location(func))
+
+    try:
+        # input sizes vary widely in cost: hand them out one at a time to balance load
+        tasks = ((input_size, sort_order, options) for input_size in input_sizes)
+        for result in pool.imap_unordered(_process_profile_worker, tasks, chunksize=1):
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def linear_input_sizes(num_runs, step):
+    """
+    Return {num_runs} input sizes that increase by {step}, starting at {step}.
+
+    :param num_runs: int
+    :param step: int
+    :return: xrange
+    """
+    return xrange(step, num_runs * step + 1, step)
+
+
+def geometric_input_sizes(num_runs, max_input_size, min_input_size=1):
+    """
+    Return up to {num_runs} log-spaced input sizes, {min_input_size} to {max_input_size}.
+
+    Spends as many runs on small inputs as on large ones. Sizes that round to the same
+    integer are only returned once, so small ranges may return fewer than {num_runs}.
+
+    :param num_runs: int
+    :param max_input_size: int
+    :param min_input_size: int - must be at least 1
+    :return: int[]
+    """
+    if num_runs == 1:
+        return [max_input_size]
+
+    ratio = (float(max_input_size) / min_input_size) ** (1.0 / (num_runs - 1))
+    input_sizes = [int(round(min_input_size * ratio ** run)) for run in xrange(num_runs)]
+    return sorted(set(input_sizes))
+
+
+def sweep_input_sizes(sweep, num_runs, step, max_input_size=None):
+    """
+    Return input sizes for a {sweep} with the same range as a linear sweep by default.
+
+    :param sweep: str - ["linear"|"geometric"]
+    :param num_runs: int
+    :param step: int - smallest input size, and increment of a linear sweep
+    :param max_input_size: int - largest input size of a geometric sweep
+    :return: int[]
+    """
+    assert sweep in SWEEPS
+
+    if sweep == 'linear':
+        return linear_input_sizes(num_runs, step)
+    return geometric_input_sizes(num_runs, max_input_size or num_runs * step, step)
+
+
+def _iter_uncached_input_sizes(
+        cache, func, input_sizes, sort_order, options, cached_results):
+    """
+    Yield each of {input_sizes} missing from {cache}, appending cached results instead.
+
+    Lazy, so each size is only looked up when an executor asks for it, which may be from
+    a worker thread.
+
+    :param cache: profile_cache.ProfileCache
+    :param cached_results: collections.deque - ProfileResults found in {cache}
+    :return: generator - ints
+    """
+    for input_size in input_sizes:
+        result = cache.get(func, input_size, sort_order, options)
+        if result is None:
+            yield input_size
+        else:
+            cached_results.append(result)
+
+
+def _with_cached_results(results, cached_results):
+    """
+    Yield each of {results}, after any results appended to {cached_results} meanwhile.
+
+    :param results: generator - ProfileResults from an executor
+    :param cached_results: collections.deque - ProfileResults found in a cache
+    :return: generator - (ProfileResult, bool) - each result, and whether it was cached
+    """
+    try:
+        for result in results:
+            while cached_results:
+                yield cached_results.popleft(), True
+            yield result, False
+        while cached_results:
+            yield cached_results.popleft(), True
+    finally:
+        results.close()
+
+
+def default_executor(measures):
+    """
+    Return DEFAULT_EXECUTOR, or "serial" if any of {measures} cannot run in threads.
+
+    :param measures: str[] - any of MEASURES
+    :return: str
+    """
+    if any(measure in THREAD_UNSAFE_MEASURES for measure in measures):
+        return 'serial'
+    return DEFAULT_EXECUTOR
+
+
+def iter_profile(
+        func, num_runs, step, sort_order, executor=None, num_workers=None,
+        measures=DEFAULT_MEASURES, num_repeats=DEFAULT_NUM_REPEATS,
+        num_warmups=DEFAULT_NUM_WARMUPS, seed=None, input_sizes=None, cache=None,
+        sink=None, resume=False):
+    """
+    Like profile, but yield each ProfileResult as soon as it completes.
+
+    Results are not collected, so memory use does not grow with {num_runs}. Results
+    already in {sink} (when resuming) are yielded first, and results in {cache} as the
+    executor reaches their input sizes.
+
+    :param sink: profile_sink.JsonLinesSink|profile_sink.CsvSink|None - append each new
+        result to this file, labelled with {sort_order}
+    :param resume: bool - skip (but still yield) input sizes already saved to {sink};
+        saved results for other input sizes are ignored
+    :return: generator - ProfileResults, in order of completion
+    """
+    assert measures and all(measure in MEASURES for measure in measures)
+    executor = executor or default_executor(measures)
+    assert executor in EXECUTORS
+
+    for measure in THREAD_UNSAFE_MEASURES:
+        if measure in measures and executor == 'thread':
+            raise ValueError('measure "{}" requires the "serial" or "process" '
+                             'executor'.format(measure))
+    if 'memory' in measures and resource is None:
+        raise ValueError('measure "memory" requires the resource module')
+
+    if input_sizes is None:
+        input_sizes = linear_input_sizes(num_runs, step)
+
+    options = _get_profile_options(measures, num_repeats, num_warmups, seed)
+
+    if resume and sink is not None:
+        input_sizes = list(input_sizes)
+        requested_input_sizes = set(input_sizes)
+        saved_input_sizes = set()
+        for result in sink.read(sort_order):
+            if (result.input_size in requested_input_sizes
+                    and result.input_size not in saved_input_sizes):
+                saved_input_sizes.add(result.input_size)
+                yield result
+        input_sizes = (size for size in input_sizes if size not in saved_input_sizes)
+
+    cached_results = collections.deque()  # appended to from worker threads
+    if cache is not None:
+        input_sizes = _iter_uncached_input_sizes(
+            cache, func, input_sizes, sort_order, options, cached_results)
+
+    if executor == 'serial':
+        results = _iter_profile_serial(func, input_sizes, sort_order, options)
+    elif executor == 'thread':
+        num_workers = num_workers or NUM_THREADS
+        results = _iter_profile_threads(
+            func, input_sizes, sort_order, options, num_workers)
+    else:
+        num_workers = num_workers or NUM_PROCESSES
+        results = _iter_profile_processes(
+            func, input_sizes, sort_order, options, num_workers)
+
+    results = _with_cached_results(results, cached_results)
+    try:
+        for result, is_cached in results:
+            if cache is not None and not is_cached:
+                cache.put(func, sort_order, options, result)
+            if sink is not None:
+                sink.write(result, sort_order)
+            yield result
+    finally:
+        results.close()
+
+
+def profile(func, num_runs, step, sort_order, executor=None, **kwargs):
     """
     Call function {num_run} times with input that increases by len {step} each run.
 
     Calls with random, ascending, or descending input depending on sort_order.
+    Threads share the random module, so {seed} is only reproducible without the "thread"
+    executor.
 
     :param func: function
     :param num_runs: int
+    :param step: int
     :param sort_order: str - ["random"|"ascending"|"descending"]
+    :param executor: str|None - ["serial"|"thread"|"process"], if None default_executor
+    :param num_workers: int - number of threads or processes, defaults per executor
+    :param measures: str[] - any of ["statements"|"lines"|"time"|"memory"|"operations"]
+    :param num_repeats: int - timed runs per input size
+    :param num_warmups: int - untimed runs per input size, before timed runs
+    :param seed: int|None - seed for the random module, reset for each input size
+    :param input_sizes: int[] - if given, profile these sizes instead of {num_runs}
+    :param cache: profile_cache.ProfileCache|None - only profile sizes not cached here,
+        if {seed} is given and no measure is timed
+    :param sink: profile_sink.JsonLinesSink|profile_sink.CsvSink|None - see iter_profile
+    :param resume: bool - see iter_profile
     :return: ProfileResult[]
     """
-    threads = []
-    results = []
-    input_size_queue = Queue.Queue()
-    result_queue = Queue.Queue()
+    return sorted(iter_profile(func, num_runs, step, sort_order, executor, **kwargs))
 
-    # populate input_size_queue with input lengths to profile for
-    for run in xrange(1, num_runs + 1):
-        input_size = run * step
-        input_size_queue.put(input_size)
 
-    # start {NUM_THREADS} profile workers
-    for _ in xrange(NUM_THREADS):
-        thread = threading.Thread(
-            target=_profile_worker,
-            args=[func, input_size_queue, result_queue, sort_order])
-        thread.start()
-        threads.append(thread)
+def profile_until(
+        func, sort_order, time_budget, growth_factor=DEFAULT_GROWTH_FACTOR,
+        min_input_size=1, max_input_size=None, cache=None, sink=None, resume=False,
+        timer=timeit.default_timer, **kwargs):
+    """
+    Profile {func} for geometrically growing input sizes until one run takes too long.
 
-    # wait for threads to finish
-    for thread in threads:
-        thread.join()
+    Runs serially, since each input size depends on how long the last one took. The run
+    that exceeds {time_budget} is included in the results.
 
-    # pull ProfileResults from result_queue and put to list until queue is empty
-    while True:
-        try:
-            result = result_queue.get(block=False)
+    :param func: function
+    :param sort_order: str - ["random"|"ascending"|"descending"]
+    :param time_budget: float - seconds allowed to profile a single input size
+    :param growth_factor: float - multiply input size by this each run, must be > 1
+    :param min_input_size: int - first input size, must be at least 1
+    :param max_input_size: int|None - stop at this size even if within budget
+    :param cache: profile_cache.ProfileCache|None - cached sizes count as within budget
+    :param sink: profile_sink.JsonLinesSink|profile_sink.CsvSink|None - see iter_profile
+    :param resume: bool - saved sizes in {sink} count as within budget
+    :param timer: function - returns the current time in seconds
+    :param kwargs: keyword arguments to _profile_input_size, e.g. measures or seed
+    :return: ProfileResult[]
+    """
+    assert growth_factor > 1 and min_input_size >= 1
+
+    options = _get_profile_options(**kwargs)
+    saved_results = {}
+    if resume and sink is not None:
+        saved_results = dict(
+            (result.input_size, result) for result in sink.read(sort_order))
+
+    results = []
+    input_size = min_input_size
+    while max_input_size is None or input_size <= max_input_size:
+        result = saved_results.get(input_size)
+        if result is None and cache is not None:
+            result = cache.get(func, input_size, sort_order, options)
+            if result is not None and sink is not None:
+                sink.write(result, sort_order)
+
+        if result is not None:
             results.append(result)
-        except Queue.Empty:
-            break
+        else:
+            start_time = timer()
+            results.append(_profile_input_size(func, input_size, sort_order, **options))
+            elapsed_time = timer() - start_time
+            if cache is not None:
+                cache.put(func, sort_order, options, results[-1])
+            if sink is not None:
+                sink.write(results[-1], sort_order)
+            if elapsed_time > time_budget:
+                break
+
+        # always grow by at least one, or small sizes would repeat
+        input_size = max(int(input_size * growth_factor), input_size + 1)
+
+    return results
 
-    return sorted(results)
 
+def refine_profile(
+        func, profile_results, sort_order, num_points, field=COMPLEXITY_MEASURE_NAME,
+        **kwargs):
+    """
+    Profile {num_points} more input sizes where the best complexity fit is least accurate.
+
+    Fits {profile_results}, then profiles the midpoints of the gaps between neighbouring
+    input sizes whose relative residuals are largest.
 
-def profile_and_plot(func, num_runs=None, step=None, title=None, save_path=None):
+    :param func: function
+    :param profile_results: ProfileResult[]
+    :param sort_order: str - ["random"|"ascending"|"descending"]
+    :param num_points: int - maximum number of input sizes to add
+    :param field: str - name of ProfileResult field to fit
+    :param kwargs: keyword arguments to profile, e.g. executor or measures
+    :return: ProfileResult[] - {profile_results} and the new results, sorted
+    """
+    import complexity  # imports this module
+
+    profile_results = sorted(profile_results)
+    fit = complexity.fit_complexity(profile_results, field)
+
+    relative_residuals = [
+        (input_size, abs(residual) / max(abs(complexity.predict(fit, input_size)), 1))
+        for input_size, residual in complexity.residuals(fit, profile_results, field)]
+
+    # score each gap between neighbours by the worse of its two residuals
+    gaps = []
+    for (low_size, low_error), (high_size, high_error) in zip(
+            relative_residuals, relative_residuals[1:]):
+        if high_size - low_size > 1:
+            gaps.append((max(low_error, high_error), (low_size + high_size) // 2))
+
+    worst_gaps = sorted(gaps, reverse=True)[:num_points]
+    input_sizes = sorted(midpoint for _, midpoint in worst_gaps)
+    if not input_sizes:
+        return profile_results
+
+    new_results = profile(func, None, None, sort_order, input_sizes=input_sizes, **kwargs)
+    return sorted(profile_results + new_results)
+
+
+def profile_and_plot(
+        func, num_runs=None, step=None, title=None, save_path=None,
+        executor=None, measure='statements', sweep=DEFAULT_SWEEP,
+        max_input_size=None, time_budget=None, num_refinements=0, **kwargs):
     """
     Shortcut function to profile {func} and plot results.
 
@@ -212,18 +1009,39 @@ def profile_and_plot(func, num_runs=None, step=None, title=None, save_path=None)
     :param step: int
     :param title: str
     :param save_path: str - if present, plot will be saved to this path
+    :param executor: str|None - ["serial"|"thread"|"process"], if None default_executor
+    :param measure: str - ["statements"|"lines"|"time"|"memory"|"operations"] - measure
+        to profile and plot
+    :param sweep: str - ["linear"|"geometric"]
+    :param max_input_size: int - largest input size of a geometric sweep
+    :param time_budget: float|None - if given, grow input size until a run takes longer
+    :param num_refinements: int - extra input sizes to profile where the fit is worst
+    :param kwargs: passed through to profile
     :return: None
     """
-    results = {
-        'ascending': profile(func, num_runs, step, 'ascending'),
-        'descending': profile(func, num_runs, step, 'descending'),
-        'random': profile(func, num_runs, step, 'random'),
-    }
+    kwargs['measures'] = (measure,)
+
+    results = {}
+    for sort_order in ('ascending', 'descending', 'random'):
+        if time_budget is not None:
+            results[sort_order] = profile_until(
+                func, sort_order, time_budget, min_input_size=step or 1,
+                max_input_size=max_input_size, **kwargs)
+        else:
+            input_sizes = sweep_input_sizes(sweep, num_runs, step, max_input_size)
+            results[sort_order] = profile(
+                func, num_runs, step, sort_order, executor, input_sizes=input_sizes,
+                **kwargs)
+
+        if num_refinements:
+            results[sort_order] = refine_profile(
+                func, results[sort_order], sort_order, num_refinements,
+                MEASURE_COLUMNS[measure], executor=executor, **kwargs)
 
     result_dataframe = profile_results_to_dataframe(**results)
     mapping = {
         'x': INPUT_MEASURE_NAME,
-        'y': COMPLEXITY_MEASURE_NAME,
+        'y': MEASURE_COLUMNS[measure],
         'color': CASE_NAME,
     }
 
@@ -235,6 +1053,154 @@ def profile_and_plot(func, num_runs=None, step=None, title=None, save_path=None)
         print chart
 
 
+class Tests(object):
+
+    def test_profile__executors_agree(self):
+        """Assert every executor profiles the same input sizes to the same counts."""
+        func = _get_function_from_module('insertion_sort')
+        results = [profile(func, 10, 3, 'descending', executor) for executor in EXECUTORS]
+
+        assert [result.input_size for result in results[0]] == range(3, 31, 3)
+        assert results[0] == results[1] == results[2]
+
+    def test_iter_profile__streams_results(self):
+        """Assert results are yielded before the sweep finishes, for every executor."""
+        func = _get_function_from_module('insertion_sort')
+        for executor in EXECUTORS:
+            results = iter_profile(func, 10 ** 9, 1, 'random', executor, num_workers=2)
+            first_results = [next(results) for _ in xrange(3)]
+            results.close()
+
+            assert len(set(first_results)) == 3
+
+    def test_profile__time(self):
+        func = _get_function_from_module('insertion_sort')
+        results = profile(func, 3, 10, 'random', 'serial', measures=('time',))
+
+        assert [result.input_size for result in results] == [10, 20, 30]
+        for result in results:
+            assert result.num_executed_statements is None
+            assert 0 < result.wall_time_min <= result.wall_time_median
+            assert 0 <= result.cpu_time_min <= result.cpu_time_median
+            assert result.wall_time_iqr >= 0
+
+    def test_profile__time_rejects_threads(self):
+        try:
+            profile(sorted, 3, 10, 'random', 'thread', measures=('time',))
+        except ValueError:
+            return
+        raise AssertionError('expected ValueError')
+
+    def test_profile__time_default_executor(self):
+        """Assert timing without an executor runs serially, rather than in threads."""
+        assert default_executor(('statements',)) == DEFAULT_EXECUTOR
+        assert default_executor(('statements', 'time')) == 'serial'
+
+        results = profile(sorted, 2, 10, 'random', measures=('time',), num_repeats=1)
+        assert all(result.wall_time_median > 0 for result in results)
+
+    def test_profile__seed(self):
+        """Assert seeded profiles are reproducible, even if func draws random numbers."""
+        func = _get_function_from_module('randomize_list_in_place')
+        results_1 = profile(func, 5, 20, 'random', 'serial', seed=1)
+        results_2 = profile(func, 5, 20, 'random', 'process', seed=1)
+
+        assert results_1 == results_2
+
+    def test_geometric_input_sizes(self):
+        assert geometric_input_sizes(5, 10000) == [1, 10, 100, 1000, 10000]
+        assert geometric_input_sizes(3, 100, 4) == [4, 20, 100]
+        assert geometric_input_sizes(10, 3) == [1, 2, 3]  # duplicates are dropped
+
+    def test_profile_until(self):
+        func = _get_function_from_module('insertion_sort')
+        # a fake clock: each size takes twice as long as the last, from 0.01 seconds
+        times = iter([0, 0.01, 0, 0.02, 0, 0.04, 0, 0.08, 0, 0.16])
+        results = profile_until(
+            func, 'descending', 0.05, min_input_size=8, timer=lambda: next(times))
+
+        # the run over budget is included
+        assert [result.input_size for result in results] == [8, 16, 32, 64]
+
+        bounded = profile_until(func, 'random', 60, max_input_size=100)
+        assert [result.input_size for result in bounded] == [1, 2, 4, 8, 16, 32, 64]
+
+    def test_refine_profile(self):
+        """Assert refinement adds new input sizes between the existing ones."""
+        func = _get_function_from_module('insertion_sort')
+        results = profile(func, None, None, 'random', 'serial', input_sizes=[2, 16, 128])
+        refined = refine_profile(func, results, 'random', 2, executor='serial')
+        input_sizes = [result.input_size for result in refined]
+
+        assert len(refined) == 5
+        assert input_sizes == sorted(set(input_sizes))
+        assert set([2, 16, 128]) < set(input_sizes)
+
+    def test_profile__memory(self):
+        func = _get_function_from_module('merge_sort')
+
+        # large enough that resident memory grows by many pages
+        results = profile(
+            func, 0, 0, 'random', 'serial', measures=('memory',),
+            input_sizes=[50000, 200000])
+
+        # merge_sort copies its input at every level of recursion
+        assert results[1].peak_memory_bytes > results[0].peak_memory_bytes > 50000 * 8
+
+    def test_profile__operations(self):
+        func = _get_function_from_module('insertion_sort')
+        results = profile(func, 2, 10, 'descending', 'thread', measures=('operations',))
+
+        assert results[0].num_executed_statements is None
+        assert [result.num_comparisons for result in results] == [45 + 9, 190 + 19]
+        assert [result.num_writes for result in results] == [45 + 9, 190 + 19]
+
+    def test_summarize_timings(self):
+        assert summarize_timings([5, 1, 3, 2, 4]) == TimingSummary(1, 3, 2)
+        assert summarize_timings([7]) == TimingSummary(7, 7, 0)
+
+    def test_statement_counter__matches_trace_module(self):
+        """Assert StatementCounter counts exactly the lines trace.Trace would."""
+        import trace
+        func = _get_function_from_module('insertion_sort')
+
+        tracer = trace.Trace(trace=False)
+        tracer.runfunc(func, range(50, 0, -1))
+        expected = sum(tracer.results().counts.values())
+
+        assert num_executed_statements(trace_function(func, range(50, 0, -1))) == expected
+
+    def test_statement_counter__restores_previous_tracer(self):
+        counter = StatementCounter()
+        counter.runfunc(sorted, [3, 1, 2])
+
+        assert sys.gettrace() is None
+        assert counter.count == 0  # builtins execute no python lines
+
+    def test_statement_counter__per_line(self):
+        """Assert per-line counts add up to the total, and find the inner loop."""
+        func = _get_function_from_module('insertion_sort')
+        total_counter = StatementCounter()
+        total_counter.runfunc(func, range(20, 0, -1))
+        line_counter = StatementCounter(per_line=True)
+        line_counter.runfunc(func, range(20, 0, -1))
+
+        assert line_counter.count == total_counter.count
+        (filename, lineno), count = max(
+            line_counter.line_counts.items(), key=lambda item: item[1])
+        assert filename == func.__code__.co_filename
+        assert count == 20 * 19 // 2 + 19  # the while condition, once more per item
+
+    def test_profile__lines(self):
+        func = _get_function_from_module('insertion_sort')
+        results = profile(func, 2, 10, 'descending', 'serial', measures=('lines',))
+
+        for result in results:
+            assert sum(result.line_counts.values()) == result.num_executed_statements
+            assert all(parse_line_key(key)[0] == func.__code__.co_filename
+                       for key in result.line_counts)
+
+
 if __name__ == '__main__':
     input_choices = ('random_int_list',)
     parser = argparse.ArgumentParser(description='Profile {function} in {module}.')
@@ -257,8 +1223,78 @@ if __name__ == '__main__':
         type=int,
         default=DEFAULT_STEP_SIZE,
         help='increase input size by {s} each run')
+    parser.add_argument(
+        '--executor', '-e',
+        choices=EXECUTORS,
+        help='run profiler in this thread, in child threads, or in child processes '
+             '(default: threads, or this thread to measure time or memory)')
+    parser.add_argument(
+        '--measure', '-m',
+        choices=MEASURES,
+        default='statements',
+        help='count executed statements (in total, or also per line), time untraced '
+             'runs, measure peak memory, or count comparisons, reads, writes and swaps')
+    parser.add_argument(
+        '--repeat', '-r',
+        type=int,
+        default=DEFAULT_NUM_REPEATS,
+        help='time {r} runs for each input size')
+    parser.add_argument(
+        '--warmup', '-w',
+        type=int,
+        default=DEFAULT_NUM_WARMUPS,
+        help='make {w} untimed runs before timing each input size')
+    parser.add_argument(
+        '--sweep',
+        choices=SWEEPS,
+        default=DEFAULT_SWEEP,
+        help='increase input size by {step} or by a constant factor each run')
+    parser.add_argument(
+        '--max_size',
+        type=int,
+        help='largest input size of a geometric sweep, if not {num_runs} * {step}')
+    parser.add_argument(
+        '--time_budget', '-t',
+        type=float,
+        help='instead of {num_runs}, double input size until one run exceeds {t} seconds')
+    parser.add_argument(
+        '--refine',
+        type=int,
+        default=0,
+        help='profile up to {refine} extra input sizes where the complexity fit is worst')
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='seed the random module with {seed} before profiling each input size')
+    parser.add_argument(
+        '--cache_dir',
+        help='reuse results cached here for functions whose module has not changed '
+             '(only with --seed, and not for time or memory)')
+    parser.add_argument(
+        '--output', '-o',
+        help='append each result to this .jsonl or .csv file as soon as it completes')
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='skip input sizes already saved to {output}')
     args = parser.parse_args()
 
+    cache = None
+    if args.cache_dir:
+        import profile_cache
+        cache = profile_cache.ProfileCache(args.cache_dir)
+
+    sink = None
+    if args.output:
+        import profile_sink
+        sink = profile_sink.open_sink(args.output)
+
     save_path = args.module + '.png'
-    func = _get_function_from_module(args.module, args.function)
-    profile_and_plot(func, args.num_runs, args.step, args.module, save_path)
+    func = _get_function_from_module(args.module, args.function, args.path)
+    profile_and_plot(
+        func, args.num_runs, args.step, args.module, save_path,
+        executor=args.executor, measure=args.measure,
+        num_repeats=args.repeat, num_warmups=args.warmup, sweep=args.sweep,
+        max_input_size=args.max_size, time_budget=args.time_budget,
+        num_refinements=args.refine, seed=args.seed, cache=cache, sink=sink,
+        resume=args.resume)
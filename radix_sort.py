@@ -0,0 +1,194 @@
+from array import array
+
+
+# sort one byte of each integer per pass
+RADIX_BITS = 8
+RADIX = 1 << RADIX_BITS
+
+# counting sort when max - min < this many times the number of items
+COUNTING_SORT_RANGE_FACTOR = 4
+
+
+def _get_uint64_typecode():
+    """
+    Return the array typecode of an unsigned 64 bit integer: "Q" is python 3 only.
+
+    :return: str|None - None if there is no such typecode
+    """
+    for typecode in ('Q', 'L'):
+        try:
+            if array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            continue
+    return None
+
+
+UINT64_TYPECODE = _get_uint64_typecode()
+
+
+def _counting_sort(int_list, min_value, max_value):
+    """
+    Sort int_list in place by counting each value from {min_value} to {max_value}.
+    """
+    counts = [0] * (max_value - min_value + 1)
+    for item in int_list:
+        counts[item - min_value] += 1
+
+    idx = 0
+    for value, count in enumerate(counts, min_value):
+        end_idx = idx + count
+        while idx < end_idx:
+            int_list[idx] = value
+            idx += 1
+
+
+def _radix_sort_offsets(offsets, num_bits):
+    """
+    Sort non-negative integers below 2 ** {num_bits} one byte at a time, least
+    significant byte first.
+
+    Each pass is a stable counting sort of one byte into a second buffer of the same type,
+    and the two buffers swap roles between passes.
+
+    :param offsets: list|array.array
+    :param num_bits: int
+    :return: list|array.array - {offsets} or its buffer, whichever holds the result
+    """
+    src = offsets
+    dst = offsets[:]
+
+    for shift in xrange(0, num_bits, RADIX_BITS):
+        counts = [0] * RADIX
+        for offset in src:
+            counts[(offset >> shift) & (RADIX - 1)] += 1
+
+        # turn counts into the index of the first item with each digit
+        start_idx = 0
+        for digit in xrange(RADIX):
+            counts[digit], start_idx = start_idx, start_idx + counts[digit]
+
+        for offset in src:
+            digit = (offset >> shift) & (RADIX - 1)
+            dst[counts[digit]] = offset
+            counts[digit] += 1
+
+        src, dst = dst, src
+
+    return src
+
+
+def _radix_sort_array(int_array):
+    """
+    Sort a numpy array of integers in place by the same algorithm as radix_sort.
+
+    Each byte pass is a stable argsort of uint8 digits, which numpy runs as a radix sort.
+    """
+    # numpy is only needed for arrays: only import it if necessary
+    import numpy as np
+
+    if int_array.size < 2:
+        return int_array
+
+    min_value = int(int_array.min())
+    value_range = int(int_array.max()) - min_value
+
+    if value_range < COUNTING_SORT_RANGE_FACTOR * int_array.size:
+        counts = np.bincount((int_array - min_value).astype(np.intp))
+        values = np.arange(min_value, min_value + len(counts), dtype=int_array.dtype)
+        int_array[:] = np.repeat(values, counts)
+        return int_array
+
+    # offset from the minimum so every key is non-negative, wrapping as uint64 does
+    uint64_min = np.uint64(min_value % 2 ** 64)
+    offsets = int_array.astype(np.uint64) - uint64_min
+
+    for shift in xrange(0, value_range.bit_length(), RADIX_BITS):
+        digits = ((offsets >> np.uint64(shift)) & np.uint64(RADIX - 1)).astype(np.uint8)
+        offsets = offsets[np.argsort(digits, kind='mergesort')]
+
+    int_array[:] = (offsets + uint64_min).astype(int_array.dtype)
+    return int_array
+
+
+def radix_sort(int_list):
+    """
+    Sort a list of integers in place, without comparing items.
+
+    If the values span less than COUNTING_SORT_RANGE_FACTOR * n, each value is counted
+    and written back in order. Otherwise values are offset by the minimum, so negatives
+    sort correctly, and sorted one byte at a time: a pass per byte of the range.
+    Pure python passes use 64 bit array buffers when the range fits.
+    Also sorts array.array and numpy arrays of integers.
+
+    Runtime: f(n) = O(n)
+    """
+    if hasattr(int_list, 'dtype'):
+        return _radix_sort_array(int_list)
+
+    if len(int_list) < 2:
+        return int_list
+
+    min_value = min(int_list)
+    max_value = max(int_list)
+    value_range = max_value - min_value
+
+    if value_range < COUNTING_SORT_RANGE_FACTOR * len(int_list):
+        _counting_sort(int_list, min_value, max_value)
+        return int_list
+
+    offsets = [item - min_value for item in int_list]
+    if UINT64_TYPECODE is not None and value_range < 2 ** 64:
+        offsets = array(UINT64_TYPECODE, offsets)
+
+    offsets = _radix_sort_offsets(offsets, value_range.bit_length())
+
+    if isinstance(int_list, array):
+        int_list[:] = array(int_list.typecode, [offset + min_value for offset in offsets])
+    else:
+        int_list[:] = [offset + min_value for offset in offsets]
+
+    return int_list
+
+
+class Tests(object):
+
+    def _int_lists(self):
+        import random
+        yield []
+        yield [3]
+        yield range(100)
+        yield range(100, 0, -1)
+        yield [random.randint(-5, 5) for _ in xrange(200)]
+        yield [random.randint(-2 ** 40, 2 ** 40) for _ in xrange(200)]
+        yield [random.randint(0, 2 ** 70) for _ in xrange(200)]
+        yield [2 ** 63 - 1, -2 ** 63, 0, -1, 1] * 20
+
+    def test_radix_sort__lists(self):
+        for int_list in self._int_lists():
+            expected = sorted(int_list)
+            result = radix_sort(int_list)
+
+            assert result is int_list
+            assert result == expected
+
+    def test_radix_sort__arrays(self):
+        import numpy as np
+        for int_list in self._int_lists():
+            if any(not -2 ** 63 <= item < 2 ** 63 for item in int_list):
+                continue
+            expected = sorted(int_list)
+
+            typed_array = array('l', int_list)
+            assert radix_sort(typed_array).tolist() == expected
+
+            int_array = np.array(int_list, dtype=np.int64)
+            assert radix_sort(int_array).tolist() == expected
+
+    def test_radix_sort__randomize_list_sort(self):
+        from randomize_list_sort import randomize_list_sort
+        int_list = range(500)
+        random_list = randomize_list_sort(int_list, radix_sort)
+
+        assert random_list != int_list
+        assert radix_sort(random_list) == int_list
@@ -1,23 +1,100 @@
 from copy import copy
-from random import randint
+import itertools
+import random
 
 
-def randomize_list_in_place(int_list):
+def randomize_list_in_place(int_list, random_state=None):
     """
     Randomize list in place in linear time.
+
+    Each swap index is drawn with getrandbits and rejection sampling, which is unbiased
+    and much cheaper than randint.
+
+    :param int_list: list
+    :param random_state: random.Random|None - if None, use the random module's state
+    :return: list - {int_list}, shuffled
     """
+    getrandbits = (random_state or random).getrandbits
     max_index = len(int_list) - 1
 
-    for index, item in enumerate(int_list):
-        swap_index = randint(index, max_index)
-        int_list[index] = int_list[swap_index]
-        int_list[swap_index] = item
+    for index in xrange(max_index):
+        # draw uniformly from index to max_index: retry offsets beyond the range
+        num_choices = max_index - index + 1
+        num_bits = num_choices.bit_length()
+        offset = getrandbits(num_bits)
+        while offset >= num_choices:
+            offset = getrandbits(num_bits)
+
+        swap_index = index + offset
+        int_list[index], int_list[swap_index] = int_list[swap_index], int_list[index]
 
     return int_list
 
 
+def randomize_lists_in_place(int_lists, seed=None):
+    """
+    Randomize each of {int_lists} in place, reproducibly for a given seed.
+
+    :param int_lists: list[]
+    :param seed: hashable|None - if None, seed from the system
+    :return: list[] - {int_lists}, each shuffled
+    """
+    random_state = random.Random(seed)
+    for int_list in int_lists:
+        randomize_list_in_place(int_list, random_state)
+    return int_lists
+
+
+def randomize_rows_in_place(int_array, seed=None):
+    """
+    Randomize each row of a 2-D array in place, reproducibly for a given seed.
+
+    Runs Fisher-Yates on every row at once: each step draws one swap index per row, so
+    there is one python iteration per column rather than per item.
+
+    :param int_array: numpy.ndarray - 2-D
+    :param seed: int|None - if None, seed from the system
+    :return: numpy.ndarray - {int_array}, with each row shuffled
+    """
+    # numpy is only needed for arrays: only import it if necessary
+    import numpy as np
+
+    if int_array.ndim != 2:
+        raise ValueError('expected a 2-D array')
+
+    # numpy < 1.17 has no Generator: fall back to the legacy RandomState
+    if hasattr(np.random, 'default_rng'):
+        random_integers = np.random.default_rng(seed).integers
+    else:
+        random_integers = np.random.RandomState(seed).randint
+
+    num_rows, num_cols = int_array.shape
+    rows = np.arange(num_rows)
+
+    for index in xrange(num_cols - 1, 0, -1):
+        swap_index = random_integers(0, index + 1, size=num_rows)
+        swapped = int_array[rows, swap_index]
+        int_array[rows, swap_index] = int_array[:, index]
+        int_array[:, index] = swapped
+
+    return int_array
+
+
 class Test(object):
 
+    # chi-square critical values at p = 0.001, by degrees of freedom
+    CHI_SQUARE_CRITICAL_VALUES = {5: 20.515, 23: 49.728}
+
+    def _assert_uniform(self, permutations, num_items):
+        """Assert every ordering of {num_items} items is about equally likely."""
+        counts = dict.fromkeys(itertools.permutations(range(num_items)), 0)
+        for permutation in permutations:
+            counts[tuple(permutation)] += 1
+
+        expected = len(permutations) / float(len(counts))
+        chi_square = sum((count - expected) ** 2 / expected for count in counts.values())
+        assert chi_square < self.CHI_SQUARE_CRITICAL_VALUES[len(counts) - 1], counts
+
     def test_is_random(self):
         list_1 = range(999)
         list_2 = range(999)
@@ -32,3 +109,29 @@ class Test(object):
         assert original_list_1 != list_1
         assert original_list_2 != list_2
         assert list_1 != list_2
+
+    def test_randomize_list_in_place__uniform(self):
+        random_state = random.Random(0)
+        for num_items in (3, 4):
+            permutations = [
+                randomize_list_in_place(range(num_items), random_state)
+                for _ in xrange(6000)]
+            self._assert_uniform(permutations, num_items)
+
+    def test_randomize_lists_in_place__seed(self):
+        int_lists = randomize_lists_in_place([range(4) for _ in xrange(6000)], seed=1)
+
+        self._assert_uniform(int_lists, 4)
+        assert randomize_lists_in_place([range(50)], seed=1) == randomize_lists_in_place(
+            [range(50)], seed=1)
+
+    def test_randomize_rows_in_place__uniform(self):
+        import numpy as np
+        for num_items in (3, 4):
+            int_array = np.tile(np.arange(num_items), (6000, 1))
+            randomize_rows_in_place(int_array, seed=0)
+            self._assert_uniform(int_array.tolist(), num_items)
+
+        array_1 = randomize_rows_in_place(np.tile(np.arange(50), (3, 1)), seed=1)
+        array_2 = randomize_rows_in_place(np.tile(np.arange(50), (3, 1)), seed=1)
+        assert (array_1 == array_2).all()
@@ -1,37 +1,32 @@
-from collections import defaultdict
 from random import randint
 
-from merge_sort import merge_sort as sort_algorithm
+from merge_sort import merge_sort as default_sort_algorithm
 
 
-def randomize_list_sort(int_list):
+def randomize_list_sort(int_list, sort_algorithm=default_sort_algorithm):
     """
     Randomize the order of int_list.
 
-    Works by assigning "rank" to each item in {int_list} by generating a list of random
-    integers. That list is sorted, then used as a key to permute the input list.
+    Works by assigning a random "rank" to each item in {int_list}. Each rank is paired
+    with the item's position as a single integer, rank * n + position, so sorting the
+    integers orders the positions by rank with no mapping from ranks back to items.
 
     This is an inefficient, n lg(n) solution. An in-place linear alternative exists.
-    """
-    max_random_int = len(int_list) ** 3
-
-    # generate list of random "ranks" to assign to input list
-    ranks = []
-    rank_int_mapping = defaultdict(list)
-    for item in int_list:
-        random_int = randint(0, max_random_int)
-        ranks.append(random_int)
-        rank_int_mapping[random_int].append(item)
 
-    sorted_ranks = sort_algorithm(ranks)
+    :param int_list: list
+    :param sort_algorithm: function - returns a sorted list of integers, e.g. sorted,
+        merge_sort or radix_sort
+    :return: list - items of {int_list} in random order
+    """
+    num_items = len(int_list)
+    max_random_int = num_items ** 3
 
-    # use ranks to shuffle result
-    result = []
-    for rank in sorted_ranks:
-        item = rank_int_mapping[rank].pop()
-        result.append(item)
+    # decorate each position with its random rank
+    keys = [randint(0, max_random_int) * num_items + position
+            for position in xrange(num_items)]
 
-    return result
+    # undecorate the sorted keys to shuffle result
+    return [int_list[key % num_items] for key in sort_algorithm(keys)]
 
 
 class Test(object):
@@ -47,3 +42,16 @@ class Test(object):
         assert random_list_1 != list_1
         assert random_list_2 != list_2
         assert random_list_1 != random_list_2
+
+    def test_sort_algorithms(self):
+        """Assert every sort backend returns a permutation of the input."""
+        from merge_sort import merge_sort_bottom_up
+        int_list = range(100)
+
+        for sort_algorithm in (sorted, default_sort_algorithm, merge_sort_bottom_up):
+            random_list = randomize_list_sort(int_list, sort_algorithm)
+            assert random_list != int_list
+            assert sorted(random_list) == int_list
+
+        assert randomize_list_sort([]) == []
+        assert randomize_list_sort([7]) == [7]
@@ -0,0 +1,354 @@
+from array import array
+import json
+import math
+import struct
+import sys
+
+import profiler
+
+
+"""
+Result store: a columnar container of ProfileResults that grows in amortized O(1).
+
+Each numeric field is one array column: counts are C longs, with None stored as
+INTEGER_MISSING, and timings are doubles, with None stored as NaN. Each result's case
+(e.g. its sort order) is an integer code into a list of distinct cases. Appending a
+result appends one item per column, so a sweep never copies earlier rows. Columns are
+written to and read from a compact binary file as raw bytes, and are only converted to
+numpy arrays (views, not copies) or a pandas DataFrame on demand.
+"""
+
+
+# every ProfileResult field but the per-line counts, which are not scalars
+NUMERIC_FIELDS = tuple(
+    field for field in profiler.ProfileResult._fields
+    if field != profiler.LINES_MEASURE_NAME)
+
+# timings may be fractional: every other field is a count, kept exactly as an integer
+FLOAT_FIELDS = (
+    'wall_time_min', profiler.WALL_TIME_MEASURE_NAME, 'wall_time_iqr',
+    'cpu_time_min', profiler.CPU_TIME_MEASURE_NAME, 'cpu_time_iqr')
+
+FLOAT_TYPECODE = 'd'
+INTEGER_TYPECODE = 'l'  # "q" is python 3 only
+CASE_CODE_TYPECODE = 'l'
+
+# stands for None in integer columns, as NaN does in float columns
+INTEGER_MISSING = -sys.maxint - 1
+
+# first bytes of every store file, followed by the length of a json header
+FILE_MAGIC = b'RESULTS1'
+HEADER_LENGTH_FORMAT = '<I'
+
+_NAN = float('nan')
+
+
+def _column_typecode(field):
+    return FLOAT_TYPECODE if field in FLOAT_FIELDS else INTEGER_TYPECODE
+
+
+def _missing_value(field):
+    return _NAN if field in FLOAT_FIELDS else INTEGER_MISSING
+
+
+class ResultStore(object):
+    """
+    Columns of ProfileResult fields, one row per result, labelled by case.
+    """
+
+    def __init__(self, fields=NUMERIC_FIELDS):
+        """
+        :param fields: str[] - numeric ProfileResult fields to keep, in column order
+        """
+        unknown = set(fields) - set(NUMERIC_FIELDS)
+        if unknown:
+            raise ValueError('not numeric ProfileResult fields: {}'.format(
+                sorted(unknown)))
+
+        self.fields = tuple(fields)
+        self.columns = dict(
+            (field, array(_column_typecode(field))) for field in self.fields)
+        self.cases = []  # distinct case labels, in order of first appearance
+        self.case_codes = array(CASE_CODE_TYPECODE)
+        self._case_codes_by_name = {}
+
+    def __len__(self):
+        return len(self.case_codes)
+
+    def _case_code(self, case):
+        code = self._case_codes_by_name.get(case)
+        if code is None:
+            code = self._case_codes_by_name[case] = len(self.cases)
+            self.cases.append(case)
+        return code
+
+    def append(self, result, case=None):
+        """
+        Add {result} as a new row.
+
+        :param result: ProfileResult
+        :param case: str|None - label, e.g. the sort order
+        """
+        for field in self.fields:
+            value = getattr(result, field)
+            self.columns[field].append(_missing_value(field) if value is None else value)
+        self.case_codes.append(self._case_code(case))
+
+    def extend(self, results, case=None):
+        """
+        Add each of {results} as a new row, all labelled {case}.
+
+        :param results: ProfileResult[]
+        :param case: str|None
+        """
+        results = list(results)
+        if not results:
+            return
+
+        # ProfileResults are tuples: transpose them into columns in one C call
+        values_by_field = dict(zip(profiler.ProfileResult._fields, zip(*results)))
+        for field in self.fields:
+            values = values_by_field[field]
+            missing = _missing_value(field)
+            if values.count(None) == len(values):
+                # measure not taken
+                values = array(_column_typecode(field), [missing]) * len(values)
+            elif None in values:
+                values = [missing if value is None else value for value in values]
+            self.columns[field].extend(values)
+        self.case_codes.extend([self._case_code(case)] * len(results))
+
+    def merge(self, other):
+        """
+        Append every row of {other}, another store with the same fields.
+
+        Columns are extended array to array, without visiting rows in python.
+
+        :param other: ResultStore
+        """
+        if other.fields != self.fields:
+            raise ValueError('cannot merge stores with different fields')
+
+        for field in self.fields:
+            self.columns[field].extend(other.columns[field])
+        recoded = [self._case_code(case) for case in other.cases]
+        if recoded == range(len(recoded)):
+            self.case_codes.extend(other.case_codes)
+        else:
+            self.case_codes.extend(recoded[code] for code in other.case_codes)
+
+    def iter_results(self, case=None):
+        """
+        Yield the rows labelled {case} as ProfileResults, with missing values read back as
+        None.
+
+        :param case: str|None - if None, yield every row
+        :return: generator - ProfileResults
+        """
+        if case is not None and case not in self._case_codes_by_name:
+            return
+        case_code = self._case_codes_by_name.get(case)
+
+        columns = [self.columns[field] for field in self.fields]
+        for row_idx, code in enumerate(self.case_codes):
+            if case_code is not None and code != case_code:
+                continue
+            values = {}
+            for field, column in zip(self.fields, columns):
+                value = column[row_idx]
+                if column.typecode == FLOAT_TYPECODE:
+                    values[field] = None if math.isnan(value) else value
+                else:
+                    values[field] = None if value == INTEGER_MISSING else value
+            yield profiler.ProfileResult(**values)
+
+    def save(self, path):
+        """
+        Write the store to {path}: a json header, then each column as raw bytes.
+
+        :param path: str
+        """
+        header = json.dumps({
+            'fields': self.fields,
+            'cases': self.cases,
+            'num_rows': len(self),
+            'byteorder': sys.byteorder,
+            'column_typecodes': [self.columns[field].typecode for field in self.fields],
+            'integer_itemsize': self.case_codes.itemsize,
+        }, sort_keys=True).encode('utf-8')
+
+        with open(path, 'wb') as store_file:
+            store_file.write(FILE_MAGIC)
+            store_file.write(struct.pack(HEADER_LENGTH_FORMAT, len(header)))
+            store_file.write(header)
+            self.case_codes.tofile(store_file)
+            for field in self.fields:
+                self.columns[field].tofile(store_file)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Inverse of save.
+
+        :param path: str
+        :return: ResultStore
+        """
+        with open(path, 'rb') as store_file:
+            if store_file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError('{} is not a result store'.format(path))
+            header_length, = struct.unpack(
+                HEADER_LENGTH_FORMAT,
+                store_file.read(struct.calcsize(HEADER_LENGTH_FORMAT)))
+            header = json.loads(store_file.read(header_length).decode('utf-8'))
+
+            store = cls([str(field) for field in header['fields']])
+            typecodes = [store.columns[field].typecode for field in store.fields]
+            if (header['integer_itemsize'] != store.case_codes.itemsize
+                    or header['column_typecodes'] != typecodes):
+                raise ValueError('{} was saved on an incompatible platform'.format(path))
+
+            num_rows = header['num_rows']
+            store.case_codes.fromfile(store_file, num_rows)
+            for field in store.fields:
+                store.columns[field].fromfile(store_file, num_rows)
+
+        if header['byteorder'] != sys.byteorder:
+            store.case_codes.byteswap()
+            for column in store.columns.values():
+                column.byteswap()
+
+        for case in header['cases']:
+            store._case_code(case)
+        return store
+
+    def to_numpy(self):
+        """
+        Return each column, and the case codes, as numpy views of the store's memory.
+
+        Missing counts are INTEGER_MISSING and missing timings NaN, as stored. The views
+        are only valid until the next row is added: appending may move a column.
+
+        :return: dict - field name or CASE_NAME to numpy.ndarray
+        """
+        # numpy is only needed for conversion: only import it if necessary
+        import numpy as np
+
+        arrays = dict(
+            (field, np.frombuffer(column, dtype=column.typecode))
+            for field, column in self.columns.iteritems())
+        arrays[profiler.CASE_NAME] = np.frombuffer(
+            self.case_codes, dtype=CASE_CODE_TYPECODE)
+        return arrays
+
+    def to_dataframe(self):
+        """
+        Return the store as a pandas DataFrame, with cases as a categorical column.
+
+        Counts stay integers, unless some are missing: those columns are cast to floats,
+        with NaN for missing counts, as pandas does.
+
+        :return: pandas.DataFrame
+        """
+        # pandas is a big slow mess: only import it if necessary
+        import pandas as pd
+
+        arrays = self.to_numpy()
+        codes = arrays.pop(profiler.CASE_NAME)
+        for field, values in arrays.items():
+            if values.dtype.kind != 'i':
+                continue
+            is_missing = values == INTEGER_MISSING
+            if is_missing.any():
+                values = values.astype(float)
+                values[is_missing] = _NAN
+                arrays[field] = values
+        dataframe = pd.DataFrame(arrays, columns=list(self.fields))
+        dataframe[profiler.CASE_NAME] = pd.Categorical.from_codes(
+            codes, categories=[str(case) for case in self.cases])
+        return dataframe
+
+
+class Tests(object):
+
+    def _results(self):
+        return [
+            profiler.ProfileResult(1, 10),
+            profiler.ProfileResult(2, None, wall_time_min=5, wall_time_median=5.5),
+            profiler.ProfileResult(3, 30, num_comparisons=3),
+        ]
+
+    def test_append_and_extend(self):
+        results = self._results()
+        store = ResultStore()
+        store.extend(results[:2], 'random')
+        store.append(results[2], 'ascending')
+        store.extend(iter(results), 'random')
+
+        assert len(store) == 6
+        assert store.cases == ['random', 'ascending']
+        assert list(store.iter_results('random')) == results[:2] + results
+        assert list(store.iter_results('ascending')) == results[2:]
+        assert list(store.iter_results('missing')) == []
+
+    def test_merge(self):
+        store_1 = ResultStore()
+        store_1.extend(self._results(), 'random')
+        store_2 = ResultStore()
+        store_2.extend(self._results(), 'descending')
+        store_2.extend(self._results(), 'random')
+        store_1.merge(store_2)
+
+        assert store_1.cases == ['random', 'descending']
+        assert len(list(store_1.iter_results('random'))) == 6
+        assert list(store_1.iter_results('descending')) == self._results()
+
+    def test_save_and_load(self):
+        import os
+        import tempfile
+        file_descriptor, path = tempfile.mkstemp('.results')
+        os.close(file_descriptor)
+
+        store = ResultStore()
+        store.extend(self._results(), 'random')
+        store.append(profiler.ProfileResult(4, 40), u'few_unique')
+        store.save(path)
+        loaded = ResultStore.load(path)
+        os.remove(path)
+
+        assert loaded.fields == store.fields
+        assert loaded.cases == store.cases
+        assert list(loaded.iter_results()) == list(store.iter_results())
+
+    def test_iter_results__keeps_integers(self):
+        store = ResultStore()
+        store.extend(self._results(), 'random')
+        result = list(store.iter_results())[2]
+
+        assert type(result.input_size) is int
+        assert type(result.num_comparisons) is int
+        assert result.wall_time_min is None
+
+    def test_to_numpy__views(self):
+        store = ResultStore(
+            (profiler.INPUT_MEASURE_NAME, profiler.COMPLEXITY_MEASURE_NAME))
+        store.extend(self._results(), 'random')
+        arrays = store.to_numpy()
+
+        assert arrays[profiler.INPUT_MEASURE_NAME].tolist() == [1, 2, 3]
+        assert arrays[profiler.INPUT_MEASURE_NAME].dtype.kind == 'i'
+        assert arrays[profiler.COMPLEXITY_MEASURE_NAME][1] == INTEGER_MISSING
+        assert arrays[profiler.CASE_NAME].tolist() == [0, 0, 0]
+        store.columns[profiler.INPUT_MEASURE_NAME][0] = 7
+        assert arrays[profiler.INPUT_MEASURE_NAME][0] == 7  # shares memory
+
+    def test_to_dataframe(self):
+        import pytest
+        pytest.importorskip('pandas')
+
+        dataframe = profiler.profile_results_to_dataframe(
+            random=self._results(), ascending=self._results()[:1])
+
+        assert len(dataframe) == 4
+        assert sorted(set(dataframe[profiler.CASE_NAME])) == ['ascending', 'random']
+        assert dataframe[profiler.COMPLEXITY_MEASURE_NAME].isnull().sum() == 1
+        assert dataframe[profiler.INPUT_MEASURE_NAME].dtype.kind == 'i'
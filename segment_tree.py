@@ -0,0 +1,106 @@
+"""
+Segment tree: answer range queries over a list in O(lg n) with O(lg n) point updates.
+"""
+
+
+class SegmentTree(object):
+    """
+    Binary tree over a list where each node summarizes a contiguous range of items.
+
+    Nodes are combined left to right by {combine}, which must be associative but need not
+    be commutative. The tree is stored in a flat list: node i has children 2i and 2i + 1,
+    and leaves start at index {size}.
+    """
+
+    def __init__(self, leaves, combine):
+        """
+        :param leaves: list - one summary per item, e.g. built from the item and its index
+        :param combine: function - (left summary, right summary) -> summary of both
+        """
+        self.num_leaves = len(leaves)
+        self.combine = combine
+
+        self.size = 1
+        while self.size < self.num_leaves:
+            self.size *= 2
+
+        # None is the identity: padding leaves and empty ranges summarize nothing
+        self.nodes = [None] * (2 * self.size)
+        self.nodes[self.size:self.size + self.num_leaves] = leaves
+        for node_idx in xrange(self.size - 1, 0, -1):
+            self.nodes[node_idx] = self._combine(
+                self.nodes[2 * node_idx], self.nodes[2 * node_idx + 1])
+
+    def _combine(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return self.combine(left, right)
+
+    def update(self, idx, leaf):
+        """
+        Replace the summary of item {idx} and every node above it.
+
+        :param idx: int
+        :param leaf: summary of the new item
+        """
+        if not 0 <= idx < self.num_leaves:
+            raise IndexError('index out of range')
+
+        node_idx = idx + self.size
+        self.nodes[node_idx] = leaf
+        node_idx //= 2
+        while node_idx:
+            self.nodes[node_idx] = self._combine(
+                self.nodes[2 * node_idx], self.nodes[2 * node_idx + 1])
+            node_idx //= 2
+
+    def query(self, start_idx, end_idx):
+        """
+        Return the summary of items start_idx to end_idx, inclusive.
+
+        :param start_idx: int
+        :param end_idx: int
+        :return: summary, combined from O(lg n) nodes
+        """
+        if not 0 <= start_idx <= end_idx < self.num_leaves:
+            raise IndexError('invalid range [{}, {}]'.format(start_idx, end_idx))
+
+        # climb from both ends, combining the left and right halves in order
+        left_summary = None
+        right_summary = None
+        low_idx = start_idx + self.size
+        high_idx = end_idx + self.size + 1
+
+        while low_idx < high_idx:
+            if low_idx % 2:
+                left_summary = self._combine(left_summary, self.nodes[low_idx])
+                low_idx += 1
+            if high_idx % 2:
+                high_idx -= 1
+                right_summary = self._combine(self.nodes[high_idx], right_summary)
+            low_idx //= 2
+            high_idx //= 2
+
+        return self._combine(left_summary, right_summary)
+
+
+class Tests(object):
+
+    def test_query__non_commutative(self):
+        """Assert ranges are combined in order, using string concatenation."""
+        letters = list('abcdefghij')
+        tree = SegmentTree(letters, lambda left, right: left + right)
+
+        for start_idx in xrange(len(letters)):
+            for end_idx in xrange(start_idx, len(letters)):
+                assert tree.query(start_idx, end_idx) == ''.join(
+                    letters[start_idx:end_idx + 1])
+
+    def test_update(self):
+        tree = SegmentTree([1, 2, 3, 4, 5], lambda left, right: left + right)
+        tree.update(2, 10)
+
+        assert tree.query(0, 4) == 22
+        assert tree.query(2, 2) == 10